@@ -1,39 +1,134 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g
 from flask_cors import CORS
-from firebase_config import get_db, get_all_documents, add_document, get_document
-from timetable_generator import TimetableGenerator
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from firebase_config import get_all_documents, add_document, get_document, get_cache_stats, iter_documents, get_storage
+from optimizer import generate_optimized_timetable
+from portfolio import run_portfolio
+from jobs import JobManager, JobQueueFull
+from bulk_import import import_records, detect_format, ImportFormatError
+from schema import normalize_record
+from data_loader import load_dataset, DataLoadError
+from timetable_storage import load_timetable, expand_timetable
+from timetable_versions import save_version, list_versions, diff_timetables
+from export_cache import ExportCache, export_etag, parse_timestamp
+from excel_export import render_workbook, EXCEL_VIEWS, DEFAULT_VIEWS
+from pdf_export import render_pdf
+from export_bundle import stream_bundle, BUNDLE_GROUPS, BUNDLE_FORMATS
+from metrics import REGISTRY, HTTP_SECONDS, PhaseTimer, timed
+from generation_memo import input_fingerprint, load_memoized, SingleFlight, GENERATION_OUTCOMES
+from batch_generation import generate_batch, BATCH_ALGORITHMS
+from feasibility import analyze_feasibility
 import io
+import os
+import tempfile
 import json
 from datetime import datetime
 import uuid
+import time as _time
 
 app = Flask(__name__)
 CORS(app)  
 
-db = get_db()
+@app.before_request
+def start_request_timer():
+    g.request_started = _time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.get('request_started')
+    if started is not None:
+        HTTP_SECONDS.observe(_time.perf_counter() - started,
+                             endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+                             method=request.method, status=response.status_code)
+    return response
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text-format metrics: phase/request histograms, Firestore and cache counters"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'message': 'Timetable Generator API is running'})
+    return jsonify({'status': 'healthy', 'message': 'Timetable Generator API is running',
+                    'storage': get_storage().name})
+
+
+MAX_PAGE_SIZE = 1000
 
+# Listing query parameters that become database-side filters
+LIST_FILTERS = {
+    'program': ('program', '=='),
+    'faculty_id': ('faculty_id', '=='),
+    'enrolled_course': ('enrolled_courses', 'array_contains')
+}
+
+def list_documents(collection_name, expand=None):
+    """
+    Shared GET handler for collection listings.
+
+    Without query options the whole collection is returned as before.
+    ``limit`` and ``start_after`` page through it by document id (the response
+    carries ``next_cursor``), ``select=a,b.c`` projects fields, and
+    ``stream=ndjson`` (or ``Accept: application/x-ndjson``) streams one
+    document per line, page by page, without building the full list.
+    ``program``, ``faculty_id`` and ``enrolled_course`` filter in the database.
+    ``expand`` converts each stored document to its API shape; with
+    ``select`` it only runs when ``timetable`` is selected (the whole stored
+    payload is fetched for it), other projections are returned as stored.
+    """
+    args = request.args
+    filters = [(field, op, args[name]) for name, (field, op) in LIST_FILTERS.items() if args.get(name)] or None
+    select = [f.strip() for f in args.get('select', '').split(',') if f.strip()] or None
+    start_after = args.get('start_after') or None
+    limit = args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'limit must be an integer'}), 400
+        if limit < 1:
+            return jsonify({'success': False, 'message': 'limit must be positive'}), 400
+    if expand and select:
+        if 'timetable' in select:
+            # Compact timetables keep their entries under 'storage'
+            select = [field for field in select if not field.startswith('storage.')] + ['storage']
+        else:
+            expand = None
+    expand = expand or (lambda doc: doc)
+
+    wants_stream = args.get('stream') == 'ndjson' or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+    if wants_stream:
+        def generate():
+            try:
+                for doc in iter_documents(collection_name, select=select, start_after=start_after, limit=limit,
+                                          filters=filters):
+                    yield json.dumps(expand(doc), default=str) + '\n'
+            except Exception as e:
+                yield json.dumps({'success': False, 'message': str(e)}) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    if limit is not None:
+        limit = min(limit, MAX_PAGE_SIZE)
+    result = get_all_documents(collection_name, limit=limit, start_after=start_after, select=select,
+                               filters=filters)
+    if result['success']:
+        try:
+            result['data'] = [expand(doc) for doc in result['data']]
+        except Exception as e:
+            return jsonify({'success': False, 'message': str(e)}), 500
+    return jsonify(result)
 
 @app.route('/api/courses', methods=['GET', 'POST'])
 def manage_courses():
     """Get all courses or add a new course"""
     if request.method == 'GET':
-        result = get_all_documents('courses')
-        return jsonify(result)
+        return list_documents('courses')
     
     elif request.method == 'POST':
-        data = request.json
-        course_id = data.get('id', str(uuid.uuid4()))
+        try:
+            course_id, data = normalize_record('courses', request.json)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         result = add_document('courses', course_id, data)
         return jsonify(result)
 
@@ -41,12 +136,13 @@ def manage_courses():
 def manage_faculty():
     """Get all faculty or add new faculty"""
     if request.method == 'GET':
-        result = get_all_documents('faculty')
-        return jsonify(result)
+        return list_documents('faculty')
     
     elif request.method == 'POST':
-        data = request.json
-        faculty_id = data.get('id', str(uuid.uuid4()))
+        try:
+            faculty_id, data = normalize_record('faculty', request.json)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         result = add_document('faculty', faculty_id, data)
         return jsonify(result)
 
@@ -54,12 +150,13 @@ def manage_faculty():
 def manage_rooms():
     """Get all rooms or add new room"""
     if request.method == 'GET':
-        result = get_all_documents('rooms')
-        return jsonify(result)
+        return list_documents('rooms')
     
     elif request.method == 'POST':
-        data = request.json
-        room_id = data.get('id', str(uuid.uuid4()))
+        try:
+            room_id, data = normalize_record('rooms', request.json)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         result = add_document('rooms', room_id, data)
         return jsonify(result)
 
@@ -67,15 +164,41 @@ def manage_rooms():
 def manage_students():
     """Get all students or add new student"""
     if request.method == 'GET':
-        result = get_all_documents('students')
-        return jsonify(result)
+        return list_documents('students')
     
     elif request.method == 'POST':
-        data = request.json
-        student_id = data.get('id', str(uuid.uuid4()))
+        try:
+            student_id, data = normalize_record('students', request.json)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         result = add_document('students', student_id, data)
         return jsonify(result)
 
+@app.route('/api/import/<collection_name>', methods=['POST'])
+def bulk_import(collection_name):
+    """
+    Bulk-load courses, faculty, rooms or students from CSV, a JSON array or NDJSON.
+
+    The body is parsed as it streams in and written with batched commits.
+    Query options: format (csv/json/ndjson, else taken from Content-Type),
+    dry_run=true to only validate, chunk_size (<= 500) and parallel commits.
+    """
+    try:
+        fmt = detect_format(request.content_type, request.args.get('format'))
+        result = import_records(
+            collection_name,
+            request.stream,
+            fmt,
+            dry_run=request.args.get('dry_run', '').lower() in ('1', 'true', 'yes'),
+            chunk_size=request.args.get('chunk_size', 500),
+            max_parallel=request.args.get('parallel', os.getenv('IMPORT_PARALLEL_COMMITS', 4))
+        )
+        return jsonify(result)
+    except ImportFormatError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @app.route('/api/generate-timetable', methods=['POST'])
 def generate_timetable():
     """
@@ -83,306 +206,585 @@ def generate_timetable():
     Request body: {
         "program": "B.Ed.",
         "semester": "Semester 1",
-        "algorithm": "csp" or "greedy"
+        "algorithm": "csp", "greedy", "optimize" or "portfolio",
+        "start": "csp" or "greedy"           (optimize only),
+        "optimize_iterations": 20000,        (optimize only)
+        "optimize_time_limit": 5,            (optimize only, seconds)
+        "attempts": 8, "workers": 4          (portfolio only)
+        "force": true                        (solve even if identical inputs were solved before)
+    }
+    Incremental repair of a stored timetable after data changes: {
+        "algorithm": "incremental",
+        "timetable_id": "<existing id>",
+        "changed": {"courses": [...], "faculty": [...], "rooms": [...]}
     }
     """
     try:
-        data = request.json
-        program = data.get('program', 'General')
-        semester = data.get('semester', 'Current')
-        algorithm = data.get('algorithm', 'csp')
-        
-        courses_result = get_all_documents('courses')
-        faculty_result = get_all_documents('faculty')
-        rooms_result = get_all_documents('rooms')
-        students_result = get_all_documents('students')
-        
-        if not all([courses_result['success'], faculty_result['success'], 
-                   rooms_result['success'], students_result['success']]):
-            return jsonify({
+        body, status_code = run_generation(request.json)
+        with timed('serialize', endpoint='generate-timetable'):
+            response = jsonify(body)
+        return response, status_code
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error generating timetable: {str(e)}'
+        }), 500
+
+
+# Optional solver settings accepted by the generation endpoints
+SOLVER_SETTINGS = ('days', 'time_slots', 'time_limit', 'avoid_student_clashes', 'seed',
+                   'optimize_iterations', 'optimize_time_limit', 'objective_weights')
+
+# Identical generations running at the same time share one solve
+generation_flights = SingleFlight()
+
+
+def run_generation(data, job=None):
+    """
+    Fetch, solve, validate and save one timetable; returns (body, status_code).
+
+    Shared by the synchronous endpoint and background jobs. With a ``job`` the
+    engines report progress into it and stop when it is cancelled.
+
+    The loaded inputs are fingerprinted: a stored timetable with the same
+    fingerprint is returned without solving (``memoized``) unless ``force``
+    is set, and a request identical to one already running waits for that
+    run and returns its result (``deduplicated``).
+    """
+    progress = job.update if job else (lambda **fields: None)
+    algorithm = data.get('algorithm', 'csp')
+    # Per-phase timings: recorded in /api/metrics and returned in metadata['phases']
+    timer = PhaseTimer(algorithm=algorithm)
+
+    progress(phase='loading')
+    parent = None
+    with timer.span('load'):
+        if algorithm == 'incremental':
+            parent_result = load_timetable(data.get('timetable_id', ''))
+            if not parent_result['success']:
+                return {'success': False, 'message': 'Timetable not found'}, 404
+            parent = parent_result['data']
+
+        program = data.get('program', (parent or {}).get('program', 'General'))
+        semester = data.get('semester', (parent or {}).get('semester', 'Current'))
+    
+        # All four collections load concurrently; the program filter runs in the courses query
+        try:
+            dataset = load_dataset(program)
+        except DataLoadError:
+            return {
                 'success': False,
                 'message': 'Failed to fetch required data from database'
-            }), 500
-        
-        courses = courses_result['data']
-        faculty = faculty_result['data']
-        rooms = rooms_result['data']
-        students = students_result['data']
-        
-        # Filter 
-        if program != 'General':
-            courses = [c for c in courses if c.get('program') == program]
-        
-        if not courses:
-            return jsonify({
-                'success': False,
-                'message': f'No courses found for program: {program}'
-            }), 400
-        
-        # Program configuration
-        program_config = {
-            'name': program,
-            'semester': semester
+            }, 500
+    
+    if not dataset.courses:
+        return {
+            'success': False,
+            'message': f'No courses found for program: {program}'
+        }, 400
+    
+    # Program configuration
+    program_config = {
+        'name': program,
+        'semester': semester
+    }
+    # Optional solver settings: custom day x period grid, CSP budget, student clash rule
+    for key in SOLVER_SETTINGS:
+        if key in data:
+            program_config[key] = data[key]
+    
+    fingerprint = input_fingerprint(dataset, program_config, algorithm, data)
+
+    def memoized():
+        if data.get('force'):
+            return None
+        with timer.span('memo'):
+            stored = load_memoized(fingerprint)
+        if not stored:
+            return None
+        return {
+            'success': True,
+            'timetable': stored['timetable'],
+            'metadata': stored.get('metadata', {}),
+            'validation': stored.get('validation'),
+            'timetable_id': stored.get('id'),
+            'memoized': True
         }
-        
-        # Initialize time
-        generator = TimetableGenerator(courses, faculty, rooms, students, program_config)
-        
+
+    def solve():
+        # Checked again here: an identical run may have finished since the first check
+        return memoized() or solve_and_save(data, job, dataset, program_config, fingerprint, parent, timer)
+
+    result = memoized()
+    shared = False
+    if result is None:
+        result, shared = generation_flights.run(fingerprint, solve,
+                                                cancel_event=job.cancel_event if job else None,
+                                                on_wait=lambda: progress(phase='waiting'))
+    if shared:
+        GENERATION_OUTCOMES.inc(outcome='deduplicated')
+        return dict(result, deduplicated=True), 200
+    GENERATION_OUTCOMES.inc(outcome='memo_hit' if result.get('memoized') else 'solved')
+    return result, 200
+
+
+def solve_and_save(data, job, dataset, program_config, fingerprint, parent, timer):
+    """The solve, validate and save part of ``run_generation``; returns the response body"""
+    progress = job.update if job else (lambda **fields: None)
+    algorithm = data.get('algorithm', 'csp')
+    program, semester = program_config['name'], program_config['semester']
+    courses, faculty, rooms, students = dataset.courses, dataset.faculty, dataset.rooms, dataset.students
+
+    # Initialize time
+    generator = dataset.generator(program_config)
+    if job:
+        generator.progress_callback = job.update
+        generator.cancel_event = job.cancel_event
+    
+    progress(phase='solving', sessions_placed=0)
+    with timer.span('solve'):
         if algorithm == 'csp':
             result = generator.generate_timetable_csp()
+        elif algorithm == 'optimize':
+            result = generate_optimized_timetable(generator, start=data.get('start', 'csp'))
+        elif algorithm == 'portfolio':
+            result = run_portfolio(courses, faculty, rooms, students, program_config,
+                                   attempts=data.get('attempts'), workers=data.get('workers'),
+                                   algorithms=data.get('algorithms'),
+                                   progress=job.update if job else None,
+                                   cancel_event=job.cancel_event if job else None)
+        elif algorithm == 'incremental':
+            result = generator.repair_timetable(parent.get('timetable', []), data.get('changed'))
         else:
             result = generator.generate_simple_timetable()
-        
-        if result['success']:
+    
+    if result['success']:
+        result['metadata']['load_timings'] = dataset.timings
+        progress(phase='validating', sessions_placed=len(result['timetable']))
+        with timer.span('validate'):
             validation = generator.validate_timetable(result['timetable'])
-            result['validation'] = validation
-            
-            # Save to Firebase
+        result['validation'] = validation
+        result['metadata']['phases'] = timer.breakdown()
+        
+        # Save to Firebase
+        progress(phase='saving')
+        timetable_id = str(uuid.uuid4())
+        timetable_data = {
+            'id': timetable_id,
+            'program': program,
+            'semester': semester,
+            'timetable': result['timetable'],
+            'metadata': result['metadata'],
+            'validation': validation,
+            'input_fingerprint': fingerprint,
+            'created_at': datetime.now().isoformat()
+        }
+        
+        with timer.span('save'):
+            save_result = save_version(timetable_id, timetable_data, parent)
+        # The stored copy has the phases up to validation; the response also gets the save
+        result['metadata'] = dict(result['metadata'], phases=timer.breakdown())
+        
+        if save_result['success']:
+            result['timetable_id'] = timetable_id
+            result['version'] = save_result['version']
+            result['parent_id'] = save_result['parent_id']
+            if 'storage' in save_result:
+                result['storage'] = save_result['storage']
+    
+    return result
+
+
+@app.route('/api/generate-timetable/batch', methods=['POST'])
+def generate_timetable_batch():
+    """
+    Generate timetables for several programs in one consistent schedule
+    Request body: {
+        "programs": ["B.Ed.", "M.Ed."],      (omit for every program)
+        "semester": "Semester 1",
+        "algorithm": "csp", "greedy" or "optimize",
+        "workers": 4                         (parallel component solves)
+    }
+    plus the solver settings of /api/generate-timetable.
+    """
+    try:
+        body, status_code = run_batch_generation(request.json or {})
+        return jsonify(body), status_code
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error generating timetables: {str(e)}'
+        }), 500
+
+
+def run_batch_generation(data, job=None):
+    """
+    Load once, solve all requested programs together and save one timetable per program.
+
+    Programs only end up in the same solve when they share faculty or
+    students; see batch_generation. Returns (body, status_code).
+    """
+    progress = job.update if job else (lambda **fields: None)
+    algorithm = data.get('algorithm', 'csp')
+    if algorithm not in BATCH_ALGORITHMS:
+        return {'success': False, 'message': f"Batch algorithm must be one of: {', '.join(BATCH_ALGORITHMS)}"}, 400
+    programs = data.get('programs') or None
+    semester = data.get('semester', 'Current')
+    timer = PhaseTimer(algorithm=f'batch-{algorithm}')
+
+    progress(phase='loading')
+    with timer.span('load'):
+        try:
+            dataset = load_dataset()
+        except DataLoadError:
+            return {
+                'success': False,
+                'message': 'Failed to fetch required data from database'
+            }, 500
+
+    program_config = {'name': 'Batch', 'semester': semester}
+    for key in SOLVER_SETTINGS:
+        if key in data:
+            program_config[key] = data[key]
+
+    with timer.span('solve'):
+        batch = generate_batch(dataset, programs, program_config, algorithm, workers=data.get('workers'),
+                               progress=progress, cancel_event=job.cancel_event if job else None)
+    if not batch['success']:
+        return batch, 400
+
+    progress(phase='saving')
+    batch_id = str(uuid.uuid4())
+    created_at = datetime.now().isoformat()
+    timetables = {}
+    with timer.span('save'):
+        for program, result in batch['programs'].items():
             timetable_id = str(uuid.uuid4())
-            timetable_data = {
+            result['metadata']['load_timings'] = dataset.timings
+            save_result = save_version(timetable_id, {
                 'id': timetable_id,
                 'program': program,
                 'semester': semester,
                 'timetable': result['timetable'],
                 'metadata': result['metadata'],
-                'validation': validation,
-                'created_at': datetime.now().isoformat()
+                'validation': result['validation'],
+                'batch_id': batch_id,
+                'created_at': created_at
+            })
+            timetables[program] = {
+                'timetable_id': timetable_id if save_result['success'] else None,
+                'version': save_result.get('version'),
+                'total_sessions': len(result['timetable']),
+                'is_valid': result['validation']['is_valid']
             }
-            
-            save_result = add_document('timetables', timetable_id, timetable_data)
-            
-            if save_result['success']:
-                result['timetable_id'] = timetable_id
-        
-        return jsonify(result)
+
+    return {
+        'success': True,
+        'batch_id': batch_id,
+        'timetables': timetables,
+        'validation': batch['validation'],
+        'metadata': dict(batch['metadata'], load_timings=dataset.timings, phases=timer.breakdown())
+    }, 200
+
+
+# Background generation jobs
+
+job_manager = JobManager(
+    max_workers=int(os.getenv('JOB_WORKERS', 2)),
+    max_queued=int(os.getenv('JOB_QUEUE_SIZE', 8))
+)
+
+
+@app.route('/api/jobs/generate-timetable', methods=['POST'])
+def submit_generation_job():
+    """
+    Queue a timetable generation (same body as /api/generate-timetable) and
+    return its job id immediately; poll /api/jobs/<job_id> for progress.
+    """
+    try:
+        job = job_manager.submit('generate-timetable', run_generation, request.json or {})
+    except JobQueueFull as e:
+        return jsonify({'success': False, 'message': f'Generation queue is full: {e}'}), 429
     
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error generating timetable: {str(e)}'
-        }), 500
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/api/jobs/{job.id}'
+    }), 202
+
+@app.route('/api/jobs/generate-timetable/batch', methods=['POST'])
+def submit_batch_generation_job():
+    """Queue a batch generation (same body as /api/generate-timetable/batch)"""
+    try:
+        job = job_manager.submit('generate-timetable-batch', run_batch_generation, request.json or {})
+    except JobQueueFull as e:
+        return jsonify({'success': False, 'message': f'Generation queue is full: {e}'}), 429
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/api/jobs/{job.id}'
+    }), 202
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List tracked jobs (without results) and pool usage"""
+    return jsonify({'success': True, 'data': job_manager.list(), 'pool': job_manager.stats()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Job status and progress (phase, sessions placed, best objective); DELETE cancels"""
+    job = job_manager.cancel(job_id) if request.method == 'DELETE' else job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, **job.to_dict()})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, **job.to_dict(include_result=False)})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Read-through cache counters for collection reads"""
+    return jsonify({'success': True, 'data': get_cache_stats()})
 
 @app.route('/api/timetable/<timetable_id>', methods=['GET'])
 def get_timetable(timetable_id):
     """Get a specific timetable by ID"""
-    result = get_document('timetables', timetable_id)
+    result = load_timetable(timetable_id)
+    return jsonify(result)
+
+@app.route('/api/timetable/<timetable_id>/versions', methods=['GET'])
+def get_timetable_versions(timetable_id):
+    """All versions in the timetable's program/semester series, oldest first (no entries)"""
+    stored = get_document('timetables', timetable_id)
+    if not stored['success']:
+        return jsonify(stored), 404
+    result = list_versions(stored['data'].get('program'), stored['data'].get('semester'),
+                           fields=('version', 'parent_id', 'created_at', 'batch_id', 'metadata.algorithm',
+                                   'metadata.total_sessions', 'validation.is_valid', 'storage.format'))
     return jsonify(result)
 
+@app.route('/api/timetable/<timetable_id>/diff', methods=['GET'])
+def diff_timetable(timetable_id):
+    """
+    Sessions moved, added and removed between two timetables.
+
+    Query: base=<timetable id> (default: this timetable's parent) and an
+    optional faculty_id to see only that faculty member's changes.
+    """
+    target = load_timetable(timetable_id)
+    if not target['success']:
+        return jsonify(target), 404
+    base_id = request.args.get('base') or target['data'].get('parent_id')
+    if not base_id:
+        return jsonify({'success': False, 'message': 'Timetable has no parent; pass base=<timetable id>'}), 400
+    base = load_timetable(base_id)
+    if not base['success']:
+        return jsonify(base), 404
+    with timed('diff'):
+        diff = diff_timetables(base['data'].get('timetable', []), target['data'].get('timetable', []),
+                               faculty_id=request.args.get('faculty_id') or None)
+    diff.update({
+        'from': {'id': base_id, 'version': base['data'].get('version')},
+        'to': {'id': timetable_id, 'version': target['data'].get('version')}
+    })
+    return jsonify({'success': True, 'data': diff})
+
 @app.route('/api/timetables', methods=['GET'])
 def get_all_timetables():
-    """Get all generated timetables"""
-    result = get_all_documents('timetables')
-    return jsonify(result)
+    """Get all generated timetables (use select= to skip the entry arrays in history lists)"""
+    return list_documents('timetables', expand=expand_timetable)
 
 # Export Endpoints
 
+def render_excel(timetable_data, views=DEFAULT_VIEWS):
+    """Render a timetable document (JSON shape) to Excel bytes; ``views`` picks the sheets"""
+    return render_workbook(timetable_data, views=views)
+
+
+EXPORT_FORMATS = {
+    'pdf': (render_pdf, 'application/pdf', 'pdf'),
+    'excel': (render_excel, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx')
+}
+
+export_cache = ExportCache(
+    os.getenv('EXPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'timetable-exports')),
+    max_bytes=int(os.getenv('EXPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+)
+
+# Cache and job pool state, read at scrape time
+REGISTRY.gauge('collection_cache_lookups', 'Collection cache lookups by result',
+               lambda: [({'result': 'hit'}, get_cache_stats()['hits']),
+                        ({'result': 'miss'}, get_cache_stats()['misses'])])
+REGISTRY.gauge('export_cache_lookups', 'Rendered export cache lookups by format and result',
+               lambda: [({'format': kind, 'result': result}, counts[result])
+                        for kind, counts in export_cache.stats()['formats'].items()
+                        for result in ('hits', 'misses', 'not_modified')])
+REGISTRY.gauge('export_cache_bytes', 'Bytes of rendered exports on disk',
+               lambda: [({}, export_cache.stats()['bytes'])])
+REGISTRY.gauge('jobs_active', 'Background jobs running or queued',
+               lambda: [({}, job_manager.stats()['active'])])
+
+
+def export_timetable(timetable_id, kind, views=None):
+    """
+    Serve a rendered export from the content-addressed cache.
+
+    The ETag is the hash of the stored document plus the renderer version and
+    the Excel ``views``, so a client holding the current copy gets 304 without
+    any rendering, and a changed timetable gets a new cache key. Each set of
+    views is cached separately.
+    """
+    variant = '-'.join(views) if views else None
+    result = get_document('timetables', timetable_id)
+    if not result['success']:
+        return jsonify({'success': False, 'message': 'Timetable not found'}), 404
+
+    stored = result['data']
+    render, mimetype, extension = EXPORT_FORMATS[kind]
+    etag = export_etag(stored, kind, variant)
+    last_modified = parse_timestamp(stored.get('updated_at') or stored.get('created_at'))
+
+    if etag in request.if_none_match:
+        export_cache.record_not_modified(kind)
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    content = export_cache.get(kind, timetable_id, etag, variant)
+    cache_status = 'HIT'
+    if content is None:
+        cache_status = 'MISS'
+        with timed('render', format=kind):
+            content = render(expand_timetable(stored), views) if views else render(expand_timetable(stored))
+        export_cache.put(kind, timetable_id, etag, content, variant)
+
+    response = send_file(
+        io.BytesIO(content),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=f'timetable_{timetable_id}.{extension}',
+        etag=etag,
+        last_modified=last_modified,
+        conditional=True
+    )
+    response.headers['X-Cache'] = cache_status
+    return response
+
 @app.route('/api/export/pdf/<timetable_id>', methods=['GET'])
 def export_pdf(timetable_id):
     """Export timetable to PDF"""
     try:
-        result = get_document('timetables', timetable_id)
-        
-        if not result['success']:
-            return jsonify({'success': False, 'message': 'Timetable not found'}), 404
-        
-        timetable_data = result['data']
-        timetable = timetable_data['timetable']
-        metadata = timetable_data.get('metadata', {})
-        
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), 
-                              rightMargin=30, leftMargin=30, 
-                              topMargin=30, bottomMargin=18)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#1a237e'),
-            spaceAfter=30,
-            alignment=1  
-        )
-        
-        title_text = f"Timetable - {metadata.get('program', 'General')} - {metadata.get('semester', 'Current')}"
-        title = Paragraph(title_text, title_style)
-        elements.append(title)
-        
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        
-        for day in days:
-            day_entries = [e for e in timetable if e['day'] == day]
-            
-            if day_entries:
-                day_header = Paragraph(f"<b>{day}</b>", styles['Heading2'])
-                elements.append(day_header)
-                elements.append(Spacer(1, 12))
-                
-                table_data = [['Time', 'Course Code', 'Course Name', 'Faculty', 'Room', 'Type']]
-                
-                for entry in sorted(day_entries, key=lambda x: x['time']):
-                    table_data.append([
-                        entry['time'],
-                        entry['course_code'],
-                        entry['course_name'][:30],  
-                        entry['faculty_name'][:20],
-                        entry['room_number'],
-                        entry['type'].capitalize()
-                    ])
-                
-                table = Table(table_data, colWidths=[1.2*inch, 1*inch, 2.5*inch, 1.5*inch, 0.8*inch, 0.8*inch])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a237e')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('FONTSIZE', (0, 1), (-1, -1), 8),
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-                ]))
-                
-                elements.append(table)
-                elements.append(Spacer(1, 20))
-        
-        footer_text = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | NEP 2020 Compliant"
-        footer = Paragraph(footer_text, styles['Normal'])
-        elements.append(Spacer(1, 12))
-        elements.append(footer)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'timetable_{timetable_id}.pdf'
-        )
-    
+        return export_timetable(timetable_id, 'pdf')
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/export/excel/<timetable_id>', methods=['GET'])
 def export_excel(timetable_id):
-    """Export timetable to Excel"""
+    """
+    Export timetable to Excel.
+
+    Query option: views=list,grid,faculty,room picks the sheets (default
+    list,grid); faculty and room add one sheet per faculty member / room.
+    """
     try:
-        result = get_document('timetables', timetable_id)
-        
+        requested = [v.strip() for v in request.args.get('views', ','.join(DEFAULT_VIEWS)).split(',') if v.strip()]
+        unknown = [v for v in requested if v not in EXCEL_VIEWS]
+        if unknown or not requested:
+            return jsonify({'success': False, 'message': f"views must be a comma-separated subset of "
+                                                         f"{', '.join(EXCEL_VIEWS)}"}), 400
+        # Canonical order so equivalent requests share one cached render
+        views = [v for v in EXCEL_VIEWS if v in requested]
+        return export_timetable(timetable_id, 'excel', views)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/export/bundle/<timetable_id>', methods=['GET'])
+def export_bundle(timetable_id):
+    """
+    Stream a ZIP with one file per faculty member, room and student group.
+
+    Query options: formats=pdf,excel (default pdf), groups=faculty,room,students
+    (default all) and workers (render processes, default EXPORT_WORKERS or CPU count).
+    """
+    try:
+        formats = [f for f in request.args.get('formats', 'pdf').split(',') if f]
+        groups = [g for g in request.args.get('groups', ','.join(BUNDLE_GROUPS)).split(',') if g]
+        unknown = [v for v in formats if v not in BUNDLE_FORMATS] + [v for v in groups if v not in BUNDLE_GROUPS]
+        if unknown or not formats or not groups:
+            return jsonify({'success': False, 'message': f"Unknown or missing formats/groups: {', '.join(unknown)}"}), 400
+
+        result = load_timetable(timetable_id)
         if not result['success']:
             return jsonify({'success': False, 'message': 'Timetable not found'}), 404
-        
-        timetable_data = result['data']
-        timetable = timetable_data['timetable']
-        metadata = timetable_data.get('metadata', {})
-        
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Timetable"
-        
-        ws.merge_cells('A1:G1')
-        title_cell = ws['A1']
-        title_cell.value = f"Timetable - {metadata.get('program', 'General')} - {metadata.get('semester', 'Current')}"
-        title_cell.font = Font(size=16, bold=True, color="1a237e")
-        title_cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        headers = ['Day', 'Time', 'Course Code', 'Course Name', 'Faculty', 'Room', 'Type']
-        header_row = 3
-        
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=header_row, column=col)
-            cell.value = header
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="1a237e", end_color="1a237e", fill_type="solid")
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-        
-        # Data rows
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        row = header_row + 1
-        
-        for day in days:
-            day_entries = [e for e in timetable if e['day'] == day]
-            
-            for entry in sorted(day_entries, key=lambda x: x['time']):
-                ws.cell(row=row, column=1, value=entry['day'])
-                ws.cell(row=row, column=2, value=entry['time'])
-                ws.cell(row=row, column=3, value=entry['course_code'])
-                ws.cell(row=row, column=4, value=entry['course_name'])
-                ws.cell(row=row, column=5, value=entry['faculty_name'])
-                ws.cell(row=row, column=6, value=entry['room_number'])
-                ws.cell(row=row, column=7, value=entry['type'].capitalize())
-                
-                for col in range(1, 8):
-                    cell = ws.cell(row=row, column=col)
-                    cell.alignment = Alignment(horizontal='left', vertical='center')
-                    cell.border = Border(
-                        left=Side(style='thin'),
-                        right=Side(style='thin'),
-                        top=Side(style='thin'),
-                        bottom=Side(style='thin')
-                    )
-                    
-                    if row % 2 == 0:
-                        cell.fill = PatternFill(start_color="f0f0f0", end_color="f0f0f0", fill_type="solid")
-                
-                row += 1
-        
-        ws.column_dimensions['A'].width = 12
-        ws.column_dimensions['B'].width = 15
-        ws.column_dimensions['C'].width = 12
-        ws.column_dimensions['D'].width = 35
-        ws.column_dimensions['E'].width = 20
-        ws.column_dimensions['F'].width = 10
-        ws.column_dimensions['G'].width = 12
-        
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'timetable_{timetable_id}.xlsx'
-        )
-    
+        students = []
+        if 'students' in groups:
+            students_result = get_all_documents('students')
+            students = students_result.get('data', [])
+
+        workers = request.args.get('workers', os.getenv('EXPORT_WORKERS'))
+        chunks = stream_bundle(result['data'], students, groups=groups, formats=formats,
+                               workers=int(workers) if workers else None)
+        response = Response(stream_with_context(chunks), mimetype='application/zip')
+        response.headers['Content-Disposition'] = f'attachment; filename=timetable_{timetable_id}_bundle.zip'
+        return response
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/export/cache-stats', methods=['GET'])
+def export_cache_stats():
+    """Hit rate and size of the rendered export cache"""
+    return jsonify({'success': True, 'data': export_cache.stats()})
+
+# Validation errors for required collections that are empty or could not be fetched
+MISSING_DATA_ERRORS = {
+    'courses': 'No courses found. Please add courses first.',
+    'faculty': 'No faculty found. Please add faculty members first.',
+    'rooms': 'No rooms found. Please add rooms first.'
+}
+
 @app.route('/api/validate-data', methods=['POST'])
 def validate_data():
-    """Validate input data before timetable generation"""
+    """
+    Validate input data before timetable generation.
+
+    Besides the empty-collection and workload checks, runs the feasibility
+    analyzer (counting bounds and max-flow relaxations) for the requested
+    program and grid; every certificate it finds is reported as an error.
+    """
     try:
-        data = request.json
+        data = request.json or {}
         errors = []
         warnings = []
+        program = data.get('program')
         
-        courses_result = get_all_documents('courses')
-        faculty_result = get_all_documents('faculty')
-        rooms_result = get_all_documents('rooms')
-        
-        if not courses_result['success'] or len(courses_result.get('data', [])) == 0:
-            errors.append('No courses found. Please add courses first.')
-        
-        if not faculty_result['success'] or len(faculty_result.get('data', [])) == 0:
-            errors.append('No faculty found. Please add faculty members first.')
-        
-        if not rooms_result['success'] or len(rooms_result.get('data', [])) == 0:
-            errors.append('No rooms found. Please add rooms first.')
-        
-        if courses_result['success']:
-            courses = courses_result['data']
-            faculty = faculty_result.get('data', [])
+        try:
+            dataset = load_dataset(program)
+        except DataLoadError as e:
+            for name, message in e.failed.items():
+                errors.append(MISSING_DATA_ERRORS.get(name, f"Failed to fetch {name}: {message}"))
+            return jsonify({
+                'success': False,
+                'errors': errors,
+                'warnings': warnings,
+                'feasibility': None
+            })
+        
+        for name, message in MISSING_DATA_ERRORS.items():
+            if not getattr(dataset, name):
+                errors.append(message)
+        
+        feasibility = None
+        if dataset.courses:
+            courses = dataset.courses
             
             for course in courses:
                 if not course.get('faculty_id'):
@@ -396,13 +798,25 @@ def validate_data():
             
             for fid, count in faculty_course_count.items():
                 if count > 5:
-                    faculty_name = next((f['name'] for f in faculty if f['id'] == fid), 'Unknown')
+                    faculty_name = dataset.faculty_by_id.get(str(fid), {}).get('name', 'Unknown')
                     warnings.append(f"Faculty '{faculty_name}' is assigned {count} courses (high workload)")
+            
+            program_config = {'name': program or 'General'}
+            for key in SOLVER_SETTINGS:
+                if key in data:
+                    program_config[key] = data[key]
+            with timed('feasibility'):
+                feasibility = analyze_feasibility(courses, dataset.faculty, dataset.rooms, dataset.students,
+                                                  program_config)
+            errors.extend(certificate['message'] for certificate in feasibility['certificates'])
+            warnings.extend(feasibility['warnings'])
         
         return jsonify({
             'success': len(errors) == 0,
             'errors': errors,
-            'warnings': warnings
+            'warnings': warnings,
+            'feasibility': feasibility,
+            'load_timings': dataset.timings
         })
     
     except Exception as e:
@@ -0,0 +1,243 @@
+"""
+Multi-program batch generation.
+
+Courses that share a faculty member or students have to be scheduled
+together; everything else is independent. The batch is split into the
+connected components of that sharing graph, components are solved in
+parallel processes, and the merged schedule is reconciled for the resource
+every component draws on: the room pool.
+"""
+import os
+import time as _time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from timetable_generator import TimetableGenerator, ScheduleState, GenerationCancelled
+from optimizer import generate_optimized_timetable
+from schema import normalize_enrollment
+
+
+BATCH_ALGORITHMS = ('csp', 'greedy', 'optimize')
+
+
+class _UnionFind:
+    def __init__(self, items):
+        self.parent = {item: item for item in items}
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+def decompose(courses, students, couple_students=True):
+    """
+    Connected components of the course sharing graph.
+
+    Two courses are joined when they have the same faculty member or (with
+    ``couple_students``) a common student. Returns components largest first,
+    each a dict with its courses, programs, faculty ids and students.
+    """
+    course_ids = [str(c.get('id')) for c in courses]
+    known = set(course_ids)
+    groups = _UnionFind(course_ids)
+
+    first_by_faculty = {}
+    for course in courses:
+        fid = course.get('faculty_id')
+        if fid:
+            groups.union(first_by_faculty.setdefault(str(fid), str(course.get('id'))), str(course.get('id')))
+
+    relevant_students = []
+    for student in students:
+        enrolled = sorted(set(normalize_enrollment(student.get('enrolled_courses'))) & known)
+        if not enrolled:
+            continue
+        relevant_students.append((student, enrolled))
+        if couple_students:
+            for course_id in enrolled[1:]:
+                groups.union(enrolled[0], course_id)
+
+    components = {}
+    for course in courses:
+        root = groups.find(str(course.get('id')))
+        component = components.setdefault(root, {'courses': [], 'programs': set(), 'faculty': set(), 'students': []})
+        component['courses'].append(course)
+        component['programs'].add(course.get('program', 'General'))
+        if course.get('faculty_id'):
+            component['faculty'].add(str(course.get('faculty_id')))
+    # Uncoupled students are copied into every component they take courses in,
+    # so enrollment counts (room capacity) stay right
+    for student, enrolled in relevant_students:
+        for root in {groups.find(course_id) for course_id in enrolled}:
+            components[root]['students'].append(student)
+
+    return sorted(components.values(), key=lambda c: (-len(c['courses']), sorted(map(str, c['programs']))))
+
+
+def _solve_component(courses, faculty, rooms, students, program_config, algorithm):
+    """Pool task: solve one component on its own generator"""
+    started = _time.perf_counter()
+    generator = TimetableGenerator(courses, faculty, rooms, students, program_config)
+    if algorithm == 'optimize':
+        result = generate_optimized_timetable(generator, start='csp')
+    elif algorithm == 'greedy':
+        result = generator.generate_simple_timetable()
+    else:
+        result = generator.generate_timetable_csp()
+    return result['timetable'], {
+        'status': result['metadata'].get('csp_status', result['metadata'].get('algorithm')),
+        'sessions': len(result['timetable']),
+        'elapsed': round(_time.perf_counter() - started, 4),
+        'pid': os.getpid()
+    }
+
+
+def solve_components(components, faculty, rooms, program_config, algorithm, workers=None, cancel_event=None):
+    """
+    Solve every component, in a process pool when there is more than one.
+
+    Each task only carries its component's courses, faculty and students
+    (plus the room list). Returns a list of (entries, stats) in component order.
+    """
+    faculty_by_id = {str(f.get('id')): f for f in faculty}
+    tasks = [(component['courses'], [faculty_by_id[fid] for fid in sorted(component['faculty']) if fid in faculty_by_id],
+              rooms, component['students'], program_config, algorithm) for component in components]
+    workers = max(1, min(int(workers or os.cpu_count() or 1), len(tasks)))
+    if workers == 1:
+        return [_solve_component(*task) for task in tasks]
+
+    results = [None] * len(tasks)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = {executor.submit(_solve_component, *task): index for index, task in enumerate(tasks)}
+        while pending:
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled()
+            for future in done:
+                results[pending.pop(future)] = future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def reconcile_rooms(generator, component_entries, cancel_event=None):
+    """
+    Merge per-component schedules into one without room double-booking.
+
+    Components never share faculty or students, so the only possible clash
+    is two of them picking the same room at the same slot. Components are
+    replayed in order; a session whose room is taken moves to another
+    suitable free room at the same slot. Sessions left without a room go
+    through ``repair_timetable``, which keeps everything else pinned and
+    re-solves them (releasing their conflict neighbourhood if needed).
+    Returns (entries, stats).
+    """
+    generator.cancel_event = cancel_event
+    plans = generator.build_course_plans()
+    state = ScheduleState(generator)
+    placements = []
+    needs = {}
+    swaps = 0
+    for entries in component_entries:
+        mapped, unmapped = generator.entries_to_placements(entries, plans)
+        for entry in unmapped:
+            course_id = str(entry.get('course_id'))
+            needs[course_id] = needs.get(course_id, 0) + 1
+        for plan, slot, room in mapped:
+            if not state.can_place(plan, slot, room):
+                free = state.free_rooms(plan, slot)
+                if not free or state.blocked_slots(plan) >> slot & 1 or not plan['avail_mask'] >> slot & 1:
+                    needs[plan['id']] = needs.get(plan['id'], 0) + 1
+                    continue
+                room = (free & -free).bit_length() - 1
+                swaps += 1
+            state.place(plan, slot, room)
+            placements.append((plan, slot, room))
+
+    entries = generator.placements_to_entries(placements)
+    stats = {'room_swaps': swaps, 'displaced': sum(needs.values())}
+    if needs:
+        repaired = generator.repair_timetable(entries)
+        entries = repaired['timetable']
+        stats['repair'] = repaired['metadata']['repair']
+    stats['unscheduled_sessions'] = sum(plan['sessions'] for plan in plans) - len(entries)
+    return entries, stats
+
+
+def generate_batch(dataset, programs, program_config, algorithm='csp', workers=None, progress=None,
+                   cancel_event=None):
+    """
+    Schedule several programs at once with globally consistent faculty, rooms and students.
+
+    ``programs`` lists the programs to schedule (None means every program
+    with courses). Returns {'success', 'programs': {program: result}, 'validation',
+    'metadata'} where each program result has the usual timetable/metadata
+    shape and ``metadata['batch']`` describes the decomposition.
+    """
+    started = _time.perf_counter()
+    progress = progress or (lambda **fields: None)
+    wanted = set(programs) if programs else None
+    courses = [c for c in dataset.courses if wanted is None or c.get('program', 'General') in wanted]
+    if not courses:
+        return {'success': False, 'message': 'No courses found for the requested programs'}
+
+    couple_students = bool(program_config.get('avoid_student_clashes', True))
+    components = decompose(courses, dataset.students, couple_students)
+    progress(phase='solving', components=len(components))
+
+    solve_started = _time.perf_counter()
+    solved = solve_components(components, dataset.faculty, dataset.rooms, program_config, algorithm,
+                              workers=workers, cancel_event=cancel_event)
+    solve_time = round(_time.perf_counter() - solve_started, 4)
+
+    progress(phase='reconciling')
+    students = list({id(student): student for component in components for student in component['students']}.values())
+    generator = TimetableGenerator(courses, dataset.faculty, dataset.rooms, students, program_config)
+    entries, reconcile = reconcile_rooms(generator, [entries for entries, _ in solved], cancel_event)
+
+    progress(phase='validating', sessions_placed=len(entries))
+    validation = generator.validate_timetable(entries)
+
+    component_stats = []
+    for component, (_, stats) in zip(components, solved):
+        component_stats.append(dict(stats, programs=sorted(map(str, component['programs'])),
+                                    courses=len(component['courses']), faculty=len(component['faculty']),
+                                    students=len(component['students'])))
+    batch = {
+        'programs': sorted({str(c.get('program', 'General')) for c in courses}),
+        'components': len(components),
+        'coupled_programs': [stats['programs'] for stats in component_stats if len(stats['programs']) > 1],
+        'solve_time': solve_time,
+        'reconcile': reconcile,
+        'wall_time': round(_time.perf_counter() - started, 4)
+    }
+
+    program_of = {str(c.get('id')): c.get('program', 'General') for c in courses}
+    by_program = {}
+    for entry in entries:
+        by_program.setdefault(program_of[str(entry.get('course_id'))], []).append(entry)
+    courses_per_program = {}
+    for course in courses:
+        program = course.get('program', 'General')
+        courses_per_program[program] = courses_per_program.get(program, 0) + 1
+
+    results = {}
+    for program, count in courses_per_program.items():
+        result = generator.build_result(by_program.get(program, []), algorithm, {'batch': batch})
+        result['metadata'].update(program=program, total_courses=count)
+        result['validation'] = generator.validate_timetable(result['timetable'])
+        results[program] = result
+
+    return {
+        'success': True,
+        'programs': results,
+        'validation': validation,
+        'metadata': {'batch': batch, 'components': component_stats, 'total_sessions': len(entries)}
+    }
@@ -0,0 +1,560 @@
+"""
+Benchmarks for the timetable generator.
+
+Usage:
+    python benchmark.py lookups [--courses 1000] [--faculty 300] [--rooms 200]
+    python benchmark.py enrollment [--students 10000] [--courses 500]
+    python benchmark.py clashes [--students 20000] [--courses 800]
+    python benchmark.py storage [--courses 1500] [--rooms 200]
+    python benchmark.py excel [--courses 1500] [--rooms 200]
+    python benchmark.py batch [--tier medium] [--workers 4]
+    python benchmark.py suite [--tiers small,medium] [--algorithms greedy,csp,optimize]
+                              [--output results.json] [--baseline old.json]
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from openpyxl import Workbook
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+
+from timetable_generator import TimetableGenerator
+from timetable_storage import compact_timetable, expand_timetable
+from excel_export import render_workbook, EXCEL_VIEWS
+from pdf_export import render_pdf
+from optimizer import generate_optimized_timetable
+from portfolio import run_portfolio
+from synthetic import TIERS, generate_tier
+from batch_generation import generate_batch
+from data_loader import Dataset
+
+
+def build_dataset(n_courses, n_faculty, n_rooms, n_students=0, seed=42):
+    """Build a small random institution for benchmarking"""
+    rng = random.Random(seed)
+    generator = TimetableGenerator([], [], [], [], {})
+    days, time_slots = generator.days, generator.time_slots
+
+    faculty = []
+    for i in range(n_faculty):
+        if i % 3 == 0:
+            availability = None
+        elif i % 3 == 1:
+            availability = {day: [t for t in time_slots if rng.random() < 0.7] for day in days}
+        else:
+            availability = ','.join(f"{day}_{t}" for day in days for t in time_slots if rng.random() < 0.7)
+        faculty.append({'id': f"F{i}", 'name': f"Faculty {i}", 'availability': availability})
+
+    rooms = [{
+        'id': f"R{i}",
+        'number': str(100 + i),
+        'type': 'lab' if i % 5 == 0 else 'classroom',
+        'capacity': rng.choice([30, 40, 60, 80, 120])
+    } for i in range(n_rooms)]
+
+    courses = [{
+        'id': f"C{i}",
+        'code': f"EDU{i:04d}",
+        'name': f"Course {i}",
+        'credits': rng.choice([2, 3, 4]),
+        'type': rng.choice(['classroom', 'classroom', 'classroom', 'lab']),
+        'faculty_id': f"F{rng.randrange(n_faculty)}"
+    } for i in range(n_courses)]
+
+    course_ids = [c['id'] for c in courses]
+    students = [{
+        'id': f"S{i}",
+        'enrolled_courses': ','.join(rng.sample(course_ids, min(5, len(course_ids))))
+    } for i in range(n_students)]
+
+    return courses, faculty, rooms, students
+
+
+class LinearScanGenerator(TimetableGenerator):
+    """The pre-index lookups: a linear scan with str() conversions per call"""
+
+    def check_faculty_availability(self, faculty_id, day, time):
+        faculty = next((f for f in self.faculty if str(f.get('id')) == str(faculty_id)), None)
+        if not faculty:
+            return False
+        avail = faculty.get('availability')
+        if not avail:
+            return True
+        if isinstance(avail, dict):
+            return time in avail.get(day, [])
+        if isinstance(avail, str):
+            tokens = [t.strip() for t in avail.split(',') if t.strip()]
+            return f"{day}_{time}" in tokens
+        return True
+
+    def check_room_capacity(self, room_id, required_capacity):
+        room = next((r for r in self.rooms if str(r.get('id')) == str(room_id)), None)
+        if not room:
+            return False
+        return self.to_int(room.get('capacity', 0), 0) >= self.to_int(required_capacity, 0)
+
+    def check_room_type(self, room_id, required_type):
+        room = next((r for r in self.rooms if str(r.get('id')) == str(room_id)), None)
+        if not room:
+            return False
+        return str(room.get('type', 'classroom')).lower() == str(required_type or 'classroom').lower()
+
+    def get_suitable_rooms(self, required_type, required_capacity):
+        return [r for r in self.rooms
+                if self.check_room_type(r.get('id'), required_type)
+                and self.check_room_capacity(r.get('id'), required_capacity)]
+
+
+def legacy_enrolled_count(students, course_id):
+    """The pre-index count: re-split every student's enrollment per course"""
+    count = 0
+    for student in students:
+        enrolled = student.get('enrolled_courses', [])
+        if isinstance(enrolled, str):
+            enrolled = [s.strip() for s in enrolled.split(',') if s.strip()]
+        if course_id in (enrolled or []):
+            count += 1
+    return max(count, 1)
+
+
+def run_lookup_workload(generator):
+    """Replay the lookups greedy generation performs: room filtering and slot availability"""
+    all_slots = [slot.split('_', 1) for slot in generator.generate_time_slot_combinations()]
+    hits = 0
+    for course in generator.courses:
+        rooms = generator.get_suitable_rooms(course.get('type'), 1)
+        hits += len(rooms)
+        for day, time in all_slots:
+            if generator.check_faculty_availability(course.get('faculty_id'), day, time):
+                hits += 1
+    return hits
+
+
+def bench_lookups(n_courses, n_faculty, n_rooms):
+    courses, faculty, rooms, students = build_dataset(n_courses, n_faculty, n_rooms)
+    timings = {}
+    hits = {}
+    for label, cls in (('linear_scan', LinearScanGenerator), ('indexed', TimetableGenerator)):
+        started = time.perf_counter()
+        generator = cls(courses, faculty, rooms, students, {})
+        hits[label] = run_lookup_workload(generator)
+        timings[label] = time.perf_counter() - started
+
+    assert hits['linear_scan'] == hits['indexed'], "lookup results differ"
+    print(f"lookups @ {n_courses} courses / {n_faculty} faculty / {n_rooms} rooms")
+    for label, seconds in timings.items():
+        print(f"  {label:<12} {seconds:8.3f}s")
+    print(f"  speedup      {timings['linear_scan'] / max(timings['indexed'], 1e-9):8.1f}x")
+    return timings
+
+
+def bench_enrollment(n_students, n_courses):
+    courses, faculty, rooms, students = build_dataset(n_courses, 10, 10, n_students)
+
+    started = time.perf_counter()
+    legacy = [legacy_enrolled_count(students, c['id']) for c in courses]
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    generator = TimetableGenerator(courses, faculty, rooms, students, {})
+    indexed = [generator.calculate_enrolled_students(c['id']) for c in courses]
+    indexed_seconds = time.perf_counter() - started
+
+    assert legacy == indexed, "enrollment counts differ"
+    print(f"enrollment @ {n_students} students / {n_courses} courses")
+    print(f"  per_course   {legacy_seconds:8.3f}s")
+    print(f"  indexed      {indexed_seconds:8.3f}s  (includes building the index)")
+    print(f"  speedup      {legacy_seconds / max(indexed_seconds, 1e-9):8.1f}x")
+    return {'per_course': legacy_seconds, 'indexed': indexed_seconds}
+
+
+def bench_clashes(n_students, n_courses):
+    courses, faculty, rooms, students = build_dataset(n_courses, max(1, n_courses // 3), 150, n_students)
+    # Let the greedy place clashing courses together so validation has work to do
+    generator = TimetableGenerator(courses, faculty, rooms, students, {'avoid_student_clashes': False})
+    entries = generator.generate_simple_timetable()['timetable']
+
+    started = time.perf_counter()
+    validation = generator.validate_timetable(entries)
+    seconds = time.perf_counter() - started
+
+    print(f"student clash validation @ {n_students} students / {n_courses} courses / {len(entries)} sessions")
+    print(f"  validate     {seconds:8.3f}s")
+    print(f"  clashes      {validation['student_clashes']}")
+    return seconds
+
+
+def bench_storage(n_courses, n_rooms):
+    courses, faculty, rooms, students = build_dataset(n_courses, max(1, n_courses // 3), n_rooms)
+    generator = TimetableGenerator(courses, faculty, rooms, students, {})
+    entries = generator.generate_simple_timetable()['timetable']
+    document = {'id': 'bench', 'program': 'General', 'semester': '1', 'timetable': entries}
+
+    started = time.perf_counter()
+    compact, shards = compact_timetable('bench', document)
+    encode_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    expanded = expand_timetable(compact, [shard for _, shard in shards])
+    decode_seconds = time.perf_counter() - started
+    assert expanded['timetable'] == entries
+
+    stats = compact['storage']['stats']
+    json_bytes = len(json.dumps(document))
+    # A single-document read still has to download the main document in full
+    main_bytes = len(json.dumps(compact))
+    print(f"timetable storage @ {len(entries)} sessions / {n_courses} courses")
+    print(f"  json document   {json_bytes:>10,} bytes")
+    print(f"  compact stored  {stats['stored_bytes']:>10,} bytes  ({stats['ratio']}x smaller, {stats['shards']} shards)")
+    print(f"  main doc read   {main_bytes:>10,} bytes")
+    print(f"  encode {encode_seconds * 1000:8.2f}ms   decode {decode_seconds * 1000:8.2f}ms")
+    return stats
+
+
+def legacy_render_excel(timetable_data):
+    """The original export: a normal Workbook with per-cell style objects"""
+    timetable = timetable_data['timetable']
+    metadata = timetable_data.get('metadata', {})
+    
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Timetable"
+    
+    ws.merge_cells('A1:G1')
+    title_cell = ws['A1']
+    title_cell.value = f"Timetable - {metadata.get('program', 'General')} - {metadata.get('semester', 'Current')}"
+    title_cell.font = Font(size=16, bold=True, color="1a237e")
+    title_cell.alignment = Alignment(horizontal='center', vertical='center')
+    
+    headers = ['Day', 'Time', 'Course Code', 'Course Name', 'Faculty', 'Room', 'Type']
+    header_row = 3
+    
+    for col, header in enumerate(headers, start=1):
+        cell = ws.cell(row=header_row, column=col)
+        cell.value = header
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="1a237e", end_color="1a237e", fill_type="solid")
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+        cell.border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+    
+    # Data rows
+    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+    row = header_row + 1
+    
+    for day in days:
+        day_entries = [e for e in timetable if e['day'] == day]
+        
+        for entry in sorted(day_entries, key=lambda x: x['time']):
+            ws.cell(row=row, column=1, value=entry['day'])
+            ws.cell(row=row, column=2, value=entry['time'])
+            ws.cell(row=row, column=3, value=entry['course_code'])
+            ws.cell(row=row, column=4, value=entry['course_name'])
+            ws.cell(row=row, column=5, value=entry['faculty_name'])
+            ws.cell(row=row, column=6, value=entry['room_number'])
+            ws.cell(row=row, column=7, value=entry['type'].capitalize())
+            
+            for col in range(1, 8):
+                cell = ws.cell(row=row, column=col)
+                cell.alignment = Alignment(horizontal='left', vertical='center')
+                cell.border = Border(
+                    left=Side(style='thin'),
+                    right=Side(style='thin'),
+                    top=Side(style='thin'),
+                    bottom=Side(style='thin')
+                )
+                
+                if row % 2 == 0:
+                    cell.fill = PatternFill(start_color="f0f0f0", end_color="f0f0f0", fill_type="solid")
+            
+            row += 1
+    
+    ws.column_dimensions['A'].width = 12
+    ws.column_dimensions['B'].width = 15
+    ws.column_dimensions['C'].width = 12
+    ws.column_dimensions['D'].width = 35
+    ws.column_dimensions['E'].width = 20
+    ws.column_dimensions['F'].width = 10
+    ws.column_dimensions['G'].width = 12
+    
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(fn, *args, **kwargs):
+    """(result, seconds, peak traced bytes); timed and traced in separate runs"""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def bench_excel(n_courses, n_rooms):
+    courses, faculty, rooms, students = build_dataset(n_courses, max(1, n_courses // 3), n_rooms)
+    generator = TimetableGenerator(courses, faculty, rooms, students, {})
+    entries = generator.generate_simple_timetable()['timetable']
+    document = {'timetable': entries, 'metadata': {'program': 'General', 'semester': '1'}}
+
+    legacy, legacy_seconds, legacy_peak = measure(legacy_render_excel, document)
+    listing, list_seconds, list_peak = measure(render_workbook, document, views=('list',))
+    full, full_seconds, full_peak = measure(render_workbook, document, views=EXCEL_VIEWS)
+
+    print(f"excel export @ {len(entries)} sessions / {len(faculty)} faculty / {n_rooms} rooms")
+    print(f"  legacy workbook    {legacy_seconds:8.3f}s  peak {legacy_peak / 2**20:7.1f} MiB  {len(legacy):>9,} bytes")
+    print(f"  write-only list    {list_seconds:8.3f}s  peak {list_peak / 2**20:7.1f} MiB  {len(listing):>9,} bytes")
+    print(f"  write-only + grid/faculty/room sheets")
+    print(f"                     {full_seconds:8.3f}s  peak {full_peak / 2**20:7.1f} MiB  {len(full):>9,} bytes")
+    return legacy_seconds, list_seconds, full_seconds
+
+
+def bench_batch(tier, workers, time_limit, seed=42):
+    """Batch generation (decomposed, parallel) vs one run per program on the same rooms and faculty"""
+    institution = generate_tier(tier, seed=seed, faculty_by_program=True)
+    config = dict(institution['config'], name='Benchmark', semester='1', seed=seed, time_limit=time_limit)
+    dataset = Dataset(institution['courses'], institution['faculty'], institution['rooms'], institution['students'])
+    programs = sorted({c['program'] for c in institution['courses']})
+    checker = TimetableGenerator(institution['courses'], institution['faculty'], institution['rooms'],
+                                 institution['students'], config)
+
+    started = time.perf_counter()
+    separate = []
+    for program in programs:
+        courses = [c for c in institution['courses'] if c['program'] == program]
+        generator = TimetableGenerator(courses, institution['faculty'], institution['rooms'],
+                                       institution['students'], dict(config, name=program))
+        separate.extend(generator.generate_timetable_csp()['timetable'])
+    separate_seconds = time.perf_counter() - started
+    separate_conflicts = checker.validate_timetable(separate)['conflicts']
+
+    results = {}
+    for n in sorted({1, workers}):
+        started = time.perf_counter()
+        batch = generate_batch(dataset, programs, config, 'csp', workers=n)
+        results[n] = (time.perf_counter() - started, batch)
+
+    print(f"batch generation @ {tier}: {len(programs)} programs, {len(institution['courses'])} courses, "
+          f"{len(institution['rooms'])} rooms")
+    print(f"  one run per program  {separate_seconds:8.3f}s  {len(separate)} sessions  "
+          f"{sum(c['type'] != 'student_clash' for c in separate_conflicts)} cross-program room/faculty conflicts")
+    for n, (seconds, batch) in results.items():
+        stats = batch['metadata']
+        conflicts = sum(c['type'] != 'student_clash' for c in batch['validation']['conflicts'])
+        print(f"  batch, {n} worker(s)   {seconds:8.3f}s  {stats['total_sessions']} sessions  {conflicts} conflicts  "
+              f"{stats['batch']['components']} components  reconcile {stats['batch']['reconcile']}")
+    return separate_seconds, {n: seconds for n, (seconds, _) in results.items()}
+
+
+# ---------- Suite ----------
+
+SUITE_SCHEMA = 1
+REGRESSION_THRESHOLD = 1.2
+
+
+def run_algorithm(algorithm, institution, config):
+    """Generate with one algorithm; returns (generator, result, seconds)"""
+    generator = TimetableGenerator(institution['courses'], institution['faculty'],
+                                   institution['rooms'], institution['students'], config)
+    started = time.perf_counter()
+    if algorithm == 'csp':
+        result = generator.generate_timetable_csp()
+    elif algorithm == 'optimize':
+        result = generate_optimized_timetable(generator, start='greedy')
+    elif algorithm == 'portfolio':
+        result = run_portfolio(institution['courses'], institution['faculty'], institution['rooms'],
+                               institution['students'], config)
+    else:
+        result = generator.generate_simple_timetable()
+    return generator, result, time.perf_counter() - started
+
+
+def bench_tier(tier, algorithms, seed, time_limit):
+    started = time.perf_counter()
+    institution = generate_tier(tier, seed=seed)
+    dataset_seconds = time.perf_counter() - started
+    config = dict(institution['config'], name='Benchmark', semester='1', seed=seed,
+                  time_limit=time_limit, optimize_time_limit=time_limit)
+    required = sum(plan['sessions'] for plan in TimetableGenerator(
+        institution['courses'], institution['faculty'], institution['rooms'],
+        institution['students'], config).build_course_plans())
+
+    report = {
+        'dataset': {name: len(institution[name]) for name in ('courses', 'faculty', 'rooms', 'students')},
+        'dataset_seconds': round(dataset_seconds, 4),
+        'required_sessions': required,
+        'algorithms': {},
+        'exports': {}
+    }
+    best = None
+    for algorithm in algorithms:
+        generator, result, seconds = run_algorithm(algorithm, institution, config)
+        entries = result.get('timetable', [])
+        started = time.perf_counter()
+        validation = generator.validate_timetable(entries)
+        validate_seconds = time.perf_counter() - started
+        clashes = validation['student_clashes']
+        report['algorithms'][algorithm] = {
+            'seconds': round(seconds, 4),
+            'validate_seconds': round(validate_seconds, 4),
+            'sessions': len(entries),
+            'completeness': round(len(entries) / required, 4) if required else 1.0,
+            'conflicts': len(validation['conflicts']) - clashes['course_pairs'],
+            'student_clashes': clashes['total_clashes'],
+            'objective': result.get('metadata', {}).get('objective_final', {}).get('objective')
+        }
+        print(f"  {tier:<7} {algorithm:<10} {seconds:8.3f}s  "
+              f"{len(entries)}/{required} sessions  {len(validation['conflicts'])} conflicts incl. student clashes", file=sys.stderr)
+        if best is None or len(entries) > len(best['timetable']):
+            best = {'timetable': entries, 'metadata': {'program': 'Benchmark', 'semester': '1'}}
+
+    if best is not None:
+        for name, render in (('pdf', render_pdf), ('excel', render_workbook)):
+            started = time.perf_counter()
+            content = render(best)
+            report['exports'][name] = {
+                'seconds': round(time.perf_counter() - started, 4),
+                'bytes': len(content)
+            }
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def flatten_timings(report):
+    """{'tier.algorithms.csp.seconds': value, ...} for every *seconds metric"""
+    flat = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(f"{prefix}.{key}" if prefix else key, child)
+        elif prefix.endswith('seconds') and isinstance(value, (int, float)):
+            flat[prefix] = value
+
+    walk('', report['tiers'])
+    return flat
+
+
+def compare_reports(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """Timing ratios against a baseline report; returns the metrics slower than ``threshold``"""
+    current, previous = flatten_timings(report), flatten_timings(baseline)
+    regressions = []
+    for key in sorted(current.keys() & previous.keys()):
+        if previous[key] <= 0.001:
+            continue
+        ratio = current[key] / previous[key]
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"  {key:<55} {previous[key]:9.3f}s -> {current[key]:9.3f}s  x{ratio:5.2f}{flag}", file=sys.stderr)
+        if ratio > threshold:
+            regressions.append({'metric': key, 'baseline': previous[key], 'current': current[key],
+                                'ratio': round(ratio, 3)})
+    return regressions
+
+
+def bench_suite(tiers, algorithms, seed=42, time_limit=10, output=None, baseline=None):
+    """Run every algorithm, validation and both exports per tier; returns the JSON report"""
+    report = {
+        'schema': SUITE_SCHEMA,
+        'generated_at': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'time_limit': time_limit,
+        'tiers': {tier: bench_tier(tier, algorithms, seed, time_limit) for tier in tiers}
+    }
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            report['regressions'] = compare_reports(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Timetable generator benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    lookups = sub.add_parser('lookups', help='indexed vs linear-scan faculty/room lookups')
+    lookups.add_argument('--courses', type=int, default=1000)
+    lookups.add_argument('--faculty', type=int, default=300)
+    lookups.add_argument('--rooms', type=int, default=200)
+
+    enrollment = sub.add_parser('enrollment', help='inverted enrollment index vs per-course scans')
+    enrollment.add_argument('--students', type=int, default=10000)
+    enrollment.add_argument('--courses', type=int, default=500)
+
+    clashes = sub.add_parser('clashes', help='sparse student clash detection in validate_timetable')
+    clashes.add_argument('--students', type=int, default=20000)
+    clashes.add_argument('--courses', type=int, default=800)
+
+    storage = sub.add_parser('storage', help='compact columnar timetable storage vs plain JSON')
+    storage.add_argument('--courses', type=int, default=1500)
+    storage.add_argument('--rooms', type=int, default=200)
+
+    excel = sub.add_parser('excel', help='write-only streaming Excel export vs the original workbook')
+    excel.add_argument('--courses', type=int, default=1500)
+    excel.add_argument('--rooms', type=int, default=200)
+
+    batch = sub.add_parser('batch', help='multi-program batch generation vs one run per program')
+    batch.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    batch.add_argument('--workers', type=int, default=4)
+    batch.add_argument('--time-limit', type=float, default=10, help='CSP budget per solve in seconds')
+
+    suite = sub.add_parser('suite', help='every algorithm, validation and export across size tiers (JSON)')
+    suite.add_argument('--tiers', default='small,medium', help=f"comma-separated: {', '.join(TIERS)}")
+    suite.add_argument('--algorithms', default='greedy,csp,optimize',
+                       help='comma-separated: greedy, csp, optimize, portfolio')
+    suite.add_argument('--seed', type=int, default=42)
+    suite.add_argument('--time-limit', type=float, default=10, help='solver budget per run in seconds')
+    suite.add_argument('--output', help='write the JSON report here instead of stdout')
+    suite.add_argument('--baseline', help='earlier JSON report to compare timings against')
+    suite.add_argument('--fail-on-regression', action='store_true')
+
+    args = parser.parse_args()
+    if args.command == 'lookups':
+        bench_lookups(args.courses, args.faculty, args.rooms)
+    elif args.command == 'enrollment':
+        bench_enrollment(args.students, args.courses)
+    elif args.command == 'clashes':
+        bench_clashes(args.students, args.courses)
+    elif args.command == 'storage':
+        bench_storage(args.courses, args.rooms)
+    elif args.command == 'excel':
+        bench_excel(args.courses, args.rooms)
+    elif args.command == 'batch':
+        bench_batch(args.tier, args.workers, args.time_limit)
+    elif args.command == 'suite':
+        report = bench_suite(args.tiers.split(','), args.algorithms.split(','), seed=args.seed,
+                             time_limit=args.time_limit, output=args.output, baseline=args.baseline)
+        if args.fail_on_regression and report.get('regressions'):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import codecs
+import csv
+import io
+import json
+import time as _time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from firebase_config import add_documents_batch, BATCH_LIMIT
+from schema import normalize_record
+
+
+IMPORTABLE_COLLECTIONS = ('courses', 'faculty', 'rooms', 'students')
+
+MAX_REPORTED_ERRORS = 1000
+READ_CHUNK = 64 * 1024
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole cannot be parsed (not a per-row problem)"""
+
+
+# ---------- Streaming parsers ----------
+
+def detect_format(content_type, explicit=None):
+    """Pick csv / json / ndjson from an explicit ?format= or the Content-Type"""
+    if explicit:
+        fmt = explicit.lower()
+    else:
+        content_type = (content_type or '').lower()
+        if 'csv' in content_type:
+            fmt = 'csv'
+        elif 'ndjson' in content_type or 'jsonl' in content_type or 'json-seq' in content_type:
+            fmt = 'ndjson'
+        else:
+            fmt = 'json'
+    if fmt not in ('csv', 'json', 'ndjson'):
+        raise ImportFormatError(f"Unsupported format '{fmt}' (use csv, json or ndjson)")
+    return fmt
+
+
+def iter_csv(stream):
+    """Yield (row_number, record) from a CSV byte stream with a header line"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for number, row in enumerate(reader, start=1):
+        if None in row:
+            yield number, ValueError('Row has more values than the header')
+            continue
+        # Blank cells mean "not given" rather than an empty string
+        yield number, {key.strip(): value.strip() for key, value in row.items()
+                       if key and value is not None and value.strip() != ''}
+
+
+def iter_ndjson(stream):
+    """Yield (row_number, record) from newline-delimited JSON; bad lines are row errors"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    number = 0
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f"Invalid JSON: {e}")
+
+
+def iter_json_array(stream):
+    """
+    Yield (row_number, record) from a JSON array without loading it whole.
+
+    Elements are decoded one at a time with ``raw_decode`` as chunks arrive, so
+    memory stays bounded by the largest single record.
+    """
+    decoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    pos = 0
+    eof = False
+    number = 0
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(READ_CHUNK)
+        buffer = buffer[pos:] + reader.decode(chunk or b'', final=not chunk)
+        pos = 0
+        eof = not chunk
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != '[':
+        raise ImportFormatError('Expected a JSON array of records')
+    pos += 1
+
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ImportFormatError('Unexpected end of JSON array')
+        if buffer[pos] == ']':
+            return
+        if number and buffer[pos] == ',':
+            pos += 1
+            skip_whitespace()
+        elif number:
+            raise ImportFormatError(f"Expected ',' or ']' after record {number}")
+        while True:
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                break
+            except ValueError as e:
+                if eof:
+                    raise ImportFormatError(f"Invalid JSON after record {number}: {e}")
+                fill()
+        pos = end
+        number += 1
+        yield number, record
+
+
+PARSERS = {'csv': iter_csv, 'ndjson': iter_ndjson, 'json': iter_json_array}
+
+
+# ---------- Import ----------
+
+def import_records(collection_name, stream, fmt, dry_run=False, chunk_size=BATCH_LIMIT, max_parallel=4):
+    """
+    Parse, validate and write an upload while it streams in.
+
+    Valid rows are grouped into batches of ``chunk_size`` (capped at the
+    Firestore limit of 500) and committed on a small thread pool with at most
+    ``max_parallel`` commits in flight, so parsing continues while earlier
+    chunks are written. Returns a per-row error report and throughput.
+    """
+    if collection_name not in IMPORTABLE_COLLECTIONS:
+        raise ImportFormatError(f"Cannot import into '{collection_name}'")
+    chunk_size = max(1, min(int(chunk_size), BATCH_LIMIT))
+    max_parallel = max(1, int(max_parallel))
+
+    started = _time.perf_counter()
+    errors = []
+    error_count = 0
+    received = 0
+    imported = 0
+    chunks = 0
+    failed_chunks = []
+    seen_ids = set()
+    chunk = []
+    aborted = None
+
+    def record_error(row, message, document_id=None):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'row': row, 'id': document_id, 'message': message})
+
+    def collect(futures):
+        nonlocal imported
+        for future in futures:
+            rows, result = future.result()
+            if result['success']:
+                imported += result['written']
+            else:
+                failed_chunks.append({'first_row': rows[0], 'last_row': rows[-1], 'message': result['message']})
+                for row in rows:
+                    record_error(row, f"Batch write failed: {result['message']}")
+
+    executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='bulk-import')
+    in_flight = set()
+
+    def flush():
+        nonlocal chunk, chunks, in_flight, imported
+        if not chunk:
+            return
+        chunks += 1
+        rows = [row for row, _, _ in chunk]
+        items = [(document_id, data) for _, document_id, data in chunk]
+        chunk = []
+        if dry_run:
+            imported += len(rows)
+            return
+        if len(in_flight) >= max_parallel:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+        in_flight.add(executor.submit(lambda: (rows, add_documents_batch(collection_name, items))))
+
+    try:
+        for number, record in PARSERS[fmt](stream):
+            received += 1
+            if isinstance(record, Exception):
+                record_error(number, str(record))
+                continue
+            try:
+                document_id, data = normalize_record(collection_name, record)
+            except ValueError as e:
+                record_error(number, str(e), record.get('id') if isinstance(record, dict) else None)
+                continue
+            if document_id in seen_ids:
+                record_error(number, 'Duplicate id in upload', document_id)
+                continue
+            seen_ids.add(document_id)
+            chunk.append((number, document_id, data))
+            if len(chunk) >= chunk_size:
+                flush()
+        flush()
+    except ImportFormatError as e:
+        # Rows before the malformed part are still written; the report says where it stopped
+        aborted = str(e)
+        flush()
+    finally:
+        done, _ = wait(in_flight)
+        executor.shutdown(wait=True)
+    collect(done)
+
+    elapsed = _time.perf_counter() - started
+    return {
+        'success': error_count == 0 and aborted is None,
+        'data': {
+            'collection': collection_name,
+            'format': fmt,
+            'dry_run': dry_run,
+            'received': received,
+            'imported': imported,
+            'failed': error_count,
+            'aborted': aborted,
+            'errors': errors,
+            'errors_truncated': error_count > len(errors),
+            'chunks': chunks,
+            'failed_chunks': failed_chunks,
+            'elapsed': round(elapsed, 4),
+            'rows_per_second': round(received / elapsed, 1) if elapsed > 0 else None
+        }
+    }
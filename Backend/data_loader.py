@@ -0,0 +1,80 @@
+import time as _time
+from concurrent.futures import ThreadPoolExecutor
+
+from firebase_config import get_all_documents, get_documents_where
+from timetable_generator import TimetableGenerator
+
+
+COLLECTIONS = ('courses', 'faculty', 'rooms', 'students')
+
+# Shared across requests; collection fetches are I/O bound
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='data-loader')
+
+
+class DataLoadError(Exception):
+    """A collection could not be fetched; ``failed`` maps each failed collection to its error message"""
+
+    def __init__(self, failed):
+        super().__init__('Failed to fetch ' + '; '.join(f"{name}: {message}" for name, message in failed.items()))
+        self.failed = failed
+
+
+class Dataset:
+    """
+    Courses, faculty, rooms and students for one generation or validation run.
+
+    Built by ``load_dataset``; ``faculty_by_id`` serves lookups outside the
+    generator and ``timings`` records how long each collection took to fetch.
+    The generator builds its own indexes, since they depend on the requested grid.
+    """
+
+    def __init__(self, courses, faculty, rooms, students, timings=None):
+        self.courses = courses
+        self.faculty = faculty
+        self.rooms = rooms
+        self.students = students
+        self.timings = timings or {}
+        self.faculty_by_id = {str(f.get('id')): f for f in faculty}
+
+    def generator(self, program_config):
+        """A TimetableGenerator over this dataset"""
+        return TimetableGenerator(self.courses, self.faculty, self.rooms, self.students, program_config)
+
+
+def _fetch(collection_name, program):
+    started = _time.perf_counter()
+    if collection_name == 'courses' and program:
+        result = get_documents_where('courses', 'program', program)
+    else:
+        result = get_all_documents(collection_name)
+    return result, round(_time.perf_counter() - started, 4)
+
+
+def load_dataset(program=None, collections=COLLECTIONS):
+    """
+    Fetch the collections concurrently and return a Dataset.
+
+    ``program`` (other than 'General') is pushed into the courses query, so
+    only that program's courses are read. Collections not requested come back
+    empty. Raises DataLoadError if any fetch fails.
+    """
+    if program == 'General':
+        program = None
+    started = _time.perf_counter()
+    futures = {name: _executor.submit(_fetch, name, program) for name in collections}
+
+    loaded = {name: [] for name in COLLECTIONS}
+    timings = {}
+    failed = {}
+    for name, future in futures.items():
+        result, elapsed = future.result()
+        timings[name] = elapsed
+        if not result['success']:
+            failed[name] = result.get('message')
+            continue
+        loaded[name] = result['data']
+    if failed:
+        raise DataLoadError(failed)
+
+    timings['total'] = round(_time.perf_counter() - started, 4)
+    return Dataset(loaded['courses'], loaded['faculty'], loaded['rooms'], loaded['students'], timings=timings)
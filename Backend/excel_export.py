@@ -0,0 +1,165 @@
+"""
+Streaming Excel export.
+
+Workbooks are built in openpyxl write-only mode: rows are serialized as they
+are appended and every cell references one of a few registered named styles
+instead of carrying its own Font/Border/Fill objects.
+"""
+import io
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+LIST_HEADERS = ['Day', 'Time', 'Course Code', 'Course Name', 'Faculty', 'Room', 'Type']
+LIST_WIDTHS = [12, 15, 12, 35, 20, 10, 12]
+# Sheets a workbook can hold; per-faculty/per-room sheets are opt-in (hundreds
+# of sheets for a large institution)
+EXCEL_VIEWS = ('list', 'grid', 'faculty', 'room')
+DEFAULT_VIEWS = ('list', 'grid')
+
+_thin = Side(style='thin')
+_border = Border(left=_thin, right=_thin, top=_thin, bottom=_thin)
+
+
+def build_styles():
+    """The named styles every cell points at (new objects per workbook)"""
+    return [
+        NamedStyle(name='tt_title', font=Font(size=16, bold=True, color="1a237e"),
+                   alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(name='tt_header', font=Font(bold=True, color="FFFFFF"),
+                   fill=PatternFill(start_color="1a237e", end_color="1a237e", fill_type="solid"),
+                   alignment=Alignment(horizontal='center', vertical='center'), border=_border),
+        NamedStyle(name='tt_cell', alignment=Alignment(horizontal='left', vertical='center'), border=_border),
+        NamedStyle(name='tt_cell_alt', alignment=Alignment(horizontal='left', vertical='center'), border=_border,
+                   fill=PatternFill(start_color="f0f0f0", end_color="f0f0f0", fill_type="solid")),
+        NamedStyle(name='tt_grid', alignment=Alignment(horizontal='left', vertical='top', wrap_text=True),
+                   border=_border)
+    ]
+
+
+def safe_sheet_title(name, used):
+    """Excel sheet names: max 31 chars, no []:*?/\\ and unique (case-insensitive)"""
+    title = ''.join('_' if ch in '[]:*?/\\' else ch for ch in str(name)).strip() or 'Sheet'
+    title = title[:31]
+    candidate, n = title, 2
+    while candidate.lower() in used:
+        suffix = f" ({n})"
+        candidate = title[:31 - len(suffix)] + suffix
+        n += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def group_entries(timetable):
+    """
+    One pass over the entries: sort keys plus the grid, faculty and room groupings.
+
+    Days follow weekday order (unknown day names keep first-seen order after
+    them); times sort as strings like the original export.
+    """
+    day_order = {day: i for i, day in enumerate(WEEKDAYS)}
+    days, times = {}, set()
+    grid, by_faculty, by_room = {}, {}, {}
+    for entry in timetable:
+        day, time = entry.get('day'), entry.get('time')
+        if day not in days:
+            days[day] = day_order.get(day, len(WEEKDAYS) + len(days))
+        times.add(time)
+        grid.setdefault((day, time), []).append(entry)
+        by_faculty.setdefault(entry.get('faculty_name') or 'TBA', []).append(entry)
+        by_room.setdefault(entry.get('room_number') or 'Unassigned', []).append(entry)
+    ordered_days = sorted(days, key=days.get)
+    return {
+        'days': ordered_days,
+        'times': sorted(times, key=str),
+        'day_rank': {day: i for i, day in enumerate(ordered_days)},
+        'grid': grid,
+        'faculty': by_faculty,
+        'room': by_room
+    }
+
+
+def _row(ws, values, style):
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        cells.append(cell)
+    return cells
+
+
+def _write_entry_sheet(wb, title, heading, entries, day_rank):
+    ws = wb.create_sheet(title)
+    for i, width in enumerate(LIST_WIDTHS):
+        ws.column_dimensions[chr(ord('A') + i)].width = width
+    ws.merged_cells.add('A1:G1')
+    ws.append(_row(ws, [heading], 'tt_title'))
+    ws.append([])
+    ws.append(_row(ws, LIST_HEADERS, 'tt_header'))
+    ordered = sorted(entries, key=lambda e: (day_rank.get(e.get('day'), 0), str(e.get('time'))))
+    for row, entry in enumerate(ordered, start=4):
+        ws.append(_row(ws, [
+            entry.get('day'),
+            entry.get('time'),
+            entry.get('course_code'),
+            entry.get('course_name'),
+            entry.get('faculty_name'),
+            entry.get('room_number'),
+            str(entry.get('type') or '').capitalize()
+        ], 'tt_cell_alt' if row % 2 == 0 else 'tt_cell'))
+
+
+def _write_grid_sheet(wb, title, heading, groups):
+    ws = wb.create_sheet(title)
+    ws.column_dimensions['A'].width = 15
+    for i in range(len(groups['days'])):
+        ws.column_dimensions[chr(ord('B') + i)].width = 28
+    ws.append(_row(ws, [heading], 'tt_title'))
+    ws.append([])
+    ws.append(_row(ws, ['Time'] + groups['days'], 'tt_header'))
+    for time in groups['times']:
+        values = [time]
+        for day in groups['days']:
+            entries = groups['grid'].get((day, time), [])
+            values.append('\n'.join(f"{e.get('course_code')} - {e.get('room_number')} ({e.get('faculty_name')})"
+                                    for e in entries) or None)
+        ws.append(_row(ws, values, 'tt_grid'))
+
+
+def render_workbook(timetable_data, views=DEFAULT_VIEWS, title=None):
+    """
+    Render a timetable document to XLSX bytes.
+
+    ``views`` picks the sheets: 'list' (every session, the classic export),
+    'grid' (time slots x days), 'faculty' and 'room' (one sheet each).
+    ``title`` overrides the heading.
+    """
+    timetable = timetable_data['timetable']
+    metadata = timetable_data.get('metadata', {})
+    heading = title or f"Timetable - {metadata.get('program', 'General')} - {metadata.get('semester', 'Current')}"
+    groups = group_entries(timetable)
+
+    wb = Workbook(write_only=True)
+    for style in build_styles():
+        wb.add_named_style(style)
+    used = set()
+
+    if 'list' in views:
+        _write_entry_sheet(wb, safe_sheet_title('Timetable', used), heading, timetable, groups['day_rank'])
+    if 'grid' in views:
+        _write_grid_sheet(wb, safe_sheet_title('Grid', used), heading, groups)
+    if 'faculty' in views:
+        for name in sorted(groups['faculty'], key=str):
+            _write_entry_sheet(wb, safe_sheet_title(f"F - {name}", used), f"{heading} - {name}",
+                               groups['faculty'][name], groups['day_rank'])
+    if 'room' in views:
+        for number in sorted(groups['room'], key=str):
+            _write_entry_sheet(wb, safe_sheet_title(f"R - {number}", used), f"{heading} - Room {number}",
+                               groups['room'][number], groups['day_rank'])
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,150 @@
+"""
+Bulk export bundle: one file per faculty member, room and student group of a
+stored timetable, rendered in a process pool and streamed as a ZIP.
+"""
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from excel_export import render_workbook
+from pdf_export import render_pdf
+from schema import normalize_enrollment
+
+
+BUNDLE_GROUPS = ('faculty', 'room', 'students')
+BUNDLE_FORMATS = ('pdf', 'excel')
+EXTENSIONS = {'pdf': 'pdf', 'excel': 'xlsx'}
+
+
+def safe_filename(name, used):
+    """Filesystem-safe, unique (within ``used``) file stem"""
+    stem = ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in str(name)).strip('._') or 'unnamed'
+    stem = stem[:80]
+    candidate, n = stem, 2
+    while candidate.lower() in used:
+        candidate = f"{stem}_{n}"
+        n += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def group_timetable(timetable_data, students=None, groups=BUNDLE_GROUPS):
+    """
+    Split a timetable into per-faculty, per-room and per-student-group parts.
+
+    Students with the same set of scheduled courses share one group, so the
+    number of student files is the number of distinct enrollments rather than
+    the number of students. Returns (parts, manifest) where parts are
+    (folder, label, entries) tuples.
+    """
+    timetable = timetable_data['timetable']
+    by_faculty, by_room, by_course = {}, {}, {}
+    for entry in timetable:
+        by_faculty.setdefault(entry.get('faculty_name') or 'TBA', []).append(entry)
+        by_room.setdefault(entry.get('room_number') or 'Unassigned', []).append(entry)
+        by_course.setdefault(str(entry.get('course_id')), []).append(entry)
+
+    parts = []
+    manifest = {}
+    if 'faculty' in groups:
+        parts.extend(('faculty', name, entries) for name, entries in sorted(by_faculty.items(), key=lambda kv: str(kv[0])))
+    if 'room' in groups:
+        parts.extend(('rooms', number, entries) for number, entries in sorted(by_room.items(), key=lambda kv: str(kv[0])))
+    if 'students' in groups and students:
+        enrollments = {}
+        for student in students:
+            key = frozenset(c for c in normalize_enrollment(student.get('enrolled_courses')) if c in by_course)
+            if key:
+                enrollments.setdefault(key, []).append(str(student.get('student_id') or student.get('id')))
+        ordered = sorted(enrollments.items(), key=lambda kv: (-len(kv[1]), sorted(kv[0])))
+        for number, (courses, members) in enumerate(ordered, start=1):
+            label = f"group_{number:03d}"
+            entries = [entry for course_id in sorted(courses) for entry in by_course[course_id]]
+            parts.append(('student_groups', label, entries))
+            manifest[label] = {'courses': sorted(courses), 'students': sorted(members)}
+    return parts, manifest
+
+
+def _render_part(fmt, document, title):
+    """Worker task: render one part; runs in a pool process"""
+    if fmt == 'pdf':
+        return render_pdf(document, title=title)
+    return render_workbook(document, views=('list', 'grid'), title=title)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target for ZipFile; the bytes written so far are drained by the response"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_bundle(timetable_data, students=None, groups=BUNDLE_GROUPS, formats=('pdf',), workers=None):
+    """
+    Yield a ZIP archive in chunks.
+
+    Parts are rendered in a process pool with at most two tasks per worker in
+    flight, and each finished file is written to the archive and yielded
+    immediately, so memory holds a handful of rendered files at a time.
+    """
+    metadata = timetable_data.get('metadata', {})
+    heading = f"Timetable - {metadata.get('program', 'General')} - {metadata.get('semester', 'Current')}"
+    parts, manifest = group_timetable(timetable_data, students, groups)
+    workers = max(1, int(workers or os.cpu_count() or 1))
+
+    used = {}
+    tasks = []
+    for folder, label, entries in parts:
+        stem = safe_filename(label, used.setdefault(folder, set()))
+        document = {'timetable': entries, 'metadata': metadata}
+        for fmt in formats:
+            tasks.append((f"{folder}/{stem}.{EXTENSIONS[fmt]}", fmt, document, f"{heading} - {label}"))
+
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED)
+    executor = ProcessPoolExecutor(max_workers=min(workers, max(1, len(tasks))))
+    pending = {}
+    queue = iter(tasks)
+    try:
+        def submit_next():
+            task = next(queue, None)
+            if task is not None:
+                name, fmt, document, title = task
+                pending[executor.submit(_render_part, fmt, document, title)] = name
+
+        for _ in range(workers * 2):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                # PDF and XLSX are already compressed; storing them avoids deflating twice
+                archive.writestr(name, future.result())
+                submit_next()
+            yield sink.drain()
+
+        archive.writestr('manifest.json', json.dumps({
+            'program': metadata.get('program'),
+            'semester': metadata.get('semester'),
+            'files': len(tasks),
+            'student_groups': manifest
+        }, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+        archive.close()
+        yield sink.drain()
+    finally:
+        # Also reached when the client disconnects mid-download
+        executor.shutdown(wait=False, cancel_futures=True)
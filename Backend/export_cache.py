@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+
+# Bump when the PDF/Excel layout changes so cached renders are not reused
+RENDER_VERSION = 3
+
+
+def export_etag(document, kind, variant=None):
+    """Content hash of a stored timetable document for one export format (and render options)"""
+    digest = hashlib.sha256()
+    digest.update(f"{kind}:{RENDER_VERSION}:".encode())
+    if variant:
+        digest.update(f"{variant}:".encode())
+    digest.update(json.dumps(document, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:32]
+
+
+def parse_timestamp(value):
+    """ISO timestamp string (as stored in created_at) to datetime, or None"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+class ExportCache:
+    """
+    Disk-backed LRU of rendered exports, keyed by (format, timetable id, content hash).
+
+    Files live in ``directory`` and the total size is kept under ``max_bytes``
+    by deleting the least recently used renders. The index is rebuilt from
+    the directory on start, so renders survive restarts.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.tmp') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    def _filename(self, kind, timetable_id, content_hash, variant=None):
+        safe_id = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in str(timetable_id))
+        if variant:
+            safe_id += '_' + ''.join(ch if ch.isalnum() or ch == '-' else '-' for ch in str(variant))
+        return f"{kind}_{safe_id}_{content_hash}"
+
+    def _count(self, kind, outcome):
+        counts = self.counters.setdefault(kind, {'hits': 0, 'misses': 0, 'not_modified': 0})
+        counts[outcome] += 1
+
+    def get(self, kind, timetable_id, content_hash, variant=None):
+        """Rendered bytes, or None on a miss"""
+        name = self._filename(kind, timetable_id, content_hash, variant)
+        with self.lock:
+            if name not in self.entries:
+                self._count(kind, 'misses')
+                return None
+            self.entries.move_to_end(name)
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as f:
+                    content = f.read()
+            except OSError:
+                self.total_bytes -= self.entries.pop(name)
+                self._count(kind, 'misses')
+                return None
+            self._count(kind, 'hits')
+        try:
+            # Keeps LRU order across restarts
+            os.utime(os.path.join(self.directory, name))
+        except OSError:
+            pass
+        return content
+
+    def put(self, kind, timetable_id, content_hash, content, variant=None):
+        """Store a render; older renders of the same timetable, format and variant are dropped"""
+        name = self._filename(kind, timetable_id, content_hash, variant)
+        base = name.rsplit('_', 1)[0]
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        with self.lock:
+            for stale in [n for n in self.entries if n.rsplit('_', 1)[0] == base and n != name]:
+                self._delete(stale)
+            if name in self.entries:
+                self.total_bytes -= self.entries[name]
+            self.entries[name] = len(content)
+            self.entries.move_to_end(name)
+            self.total_bytes += len(content)
+            self._evict()
+
+    def record_not_modified(self, kind):
+        with self.lock:
+            self._count(kind, 'not_modified')
+
+    def _delete(self, name):
+        self.total_bytes -= self.entries.pop(name)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            self._delete(next(iter(self.entries)))
+            self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            formats = {}
+            hits = misses = not_modified = 0
+            for kind, counts in self.counters.items():
+                served = counts['hits'] + counts['misses']
+                formats[kind] = dict(counts, hit_rate=round(counts['hits'] / served, 4) if served else 0.0)
+                hits += counts['hits']
+                misses += counts['misses']
+                not_modified += counts['not_modified']
+            return {
+                'hits': hits,
+                'misses': misses,
+                'not_modified': not_modified,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'formats': formats
+            }
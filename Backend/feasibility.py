@@ -0,0 +1,293 @@
+"""
+Feasibility pre-check for timetable inputs.
+
+Every check here is a necessary condition for a complete timetable, so a
+failed check is a certificate that no solver can place every session. Passing
+all of them does not promise the solver will succeed (student clashes and
+the interaction of rooms with faculty are only partly covered). Courses
+without an assigned faculty member are left out: the generator skips them,
+and validation reports them as warnings.
+"""
+import time as _time
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import maximum_flow, breadth_first_order
+
+from timetable_generator import TimetableGenerator, popcount, iter_bits
+
+
+# Certificates list at most this many courses / faculty / students each
+MAX_LISTED = 20
+
+
+def _names(plans):
+    return [plan['course'].get('name') or plan['id'] for plan in plans[:MAX_LISTED]]
+
+
+# ---------- Counting bounds ----------
+
+def check_course_slots(generator, plans):
+    """Courses whose faculty has no usable slot, or fewer slots than the course has sessions"""
+    certificates = []
+    for plan in plans:
+        available = popcount(plan['avail_mask'])
+        if not plan['faculty_id']:
+            continue
+        if plan['faculty_id'] not in generator.faculty_by_id:
+            reason = f"is assigned to unknown faculty '{plan['faculty_id']}'"
+        elif available < plan['sessions']:
+            reason = f"needs {plan['sessions']} sessions but its faculty is available in {available} slots"
+        else:
+            continue
+        certificates.append({
+            'check': 'course_slots',
+            'course_id': plan['id'],
+            'required_sessions': plan['sessions'],
+            'available_slots': available,
+            'message': f"Course '{plan['course'].get('name') or plan['id']}' {reason}"
+        })
+    return certificates
+
+
+def check_faculty_load(generator, plans):
+    """Each faculty member teaches at most one session per available slot"""
+    by_faculty = {}
+    for plan in plans:
+        if plan['faculty_id'] in generator.faculty_by_id:
+            by_faculty.setdefault(plan['faculty_id'], []).append(plan)
+    certificates = []
+    for fid, taught in sorted(by_faculty.items()):
+        required = sum(plan['sessions'] for plan in taught)
+        available = popcount(generator.faculty_avail_mask.get(fid, 0))
+        if required > available:
+            name = generator.faculty_by_id[fid].get('name') or fid
+            certificates.append({
+                'check': 'faculty_load',
+                'faculty_id': fid,
+                'courses': _names(taught),
+                'required_sessions': required,
+                'available_slots': available,
+                'message': f"Faculty '{name}' must teach {required} sessions but is available in {available} slots"
+            })
+    return certificates
+
+
+def check_room_supply(generator, plans):
+    """
+    Room-slot supply per room tier.
+
+    For every distinct set of suitable rooms M (a room type and capacity
+    tier), the sessions that can only use rooms in M must fit into
+    |M| rooms x the slots those courses can meet in.
+    """
+    if not generator.n_rooms:
+        return [{'check': 'room_supply', 'message': 'No rooms are defined', 'required_sessions':
+                 sum(plan['sessions'] for plan in plans), 'room_slots': 0}]
+    certificates = []
+    for mask in sorted({plan['room_mask'] for plan in plans}, key=lambda m: (popcount(m), m)):
+        inside = [plan for plan in plans if not plan['room_mask'] & ~mask and plan['avail_mask']]
+        demand = sum(plan['sessions'] for plan in inside)
+        slots = 0
+        for plan in inside:
+            slots |= plan['avail_mask']
+        supply = popcount(mask) * popcount(slots)
+        if demand > supply:
+            rooms = [generator.room_list[code] for code in iter_bits(mask)]
+            types = sorted({str(room.get('type', 'classroom')).lower() for room in rooms})
+            min_capacity = min(generator.to_int(room.get('capacity', 0), 0) for room in rooms)
+            certificates.append({
+                'check': 'room_supply',
+                'room_types': types,
+                'min_capacity': min_capacity,
+                'rooms': popcount(mask),
+                'courses': _names(inside),
+                'required_sessions': demand,
+                'room_slots': supply,
+                'message': f"{demand} sessions need {'/'.join(types)} rooms with capacity >= {min_capacity}, "
+                           f"but only {supply} such room-slots exist"
+            })
+    return certificates
+
+
+def check_student_load(generator, plans):
+    """With student clashes forbidden, a student's courses must fit into the week's slots"""
+    if not generator.avoid_student_clashes:
+        return []
+    sessions = {plan['id']: plan['sessions'] for plan in plans}
+    overloaded = []
+    for code, student in enumerate(generator.students):
+        load = sum(sessions.get(course_id, 0)
+                   for course_id in generator.parse_enrolled_courses(student.get('enrolled_courses', [])))
+        if load > generator.n_slots:
+            overloaded.append((generator.student_ids[code], load))
+    if not overloaded:
+        return []
+    return [{
+        'check': 'student_load',
+        'students': [student_id for student_id, _ in overloaded[:MAX_LISTED]],
+        'student_count': len(overloaded),
+        'max_sessions': max(load for _, load in overloaded),
+        'available_slots': generator.n_slots,
+        'message': f"{len(overloaded)} students are enrolled in more sessions than the {generator.n_slots} "
+                   f"weekly slots (up to {max(load for _, load in overloaded)})"
+    }]
+
+
+# ---------- Max-flow relaxations ----------
+
+def _max_flow(n_nodes, edges):
+    """Max flow from node 0 to node 1 and the nodes still reachable from 0 in the residual graph"""
+    tails, heads, caps = (np.asarray(column, dtype=np.int32) for column in zip(*edges))
+    capacity = sparse.csr_matrix((caps, (tails, heads)), shape=(n_nodes, n_nodes))
+    result = maximum_flow(capacity, 0, 1)
+    flow = getattr(result, 'flow', None)
+    if flow is None:
+        flow = result.residual
+    residual = (capacity - flow).tocsr()
+    residual.data[residual.data < 0] = 0
+    residual.eliminate_zeros()
+    reachable = breadth_first_order(residual, 0, directed=True, return_predecessors=False)
+    return int(result.flow_value), set(reachable.tolist())
+
+
+def _flow_certificate(check, plans, course_nodes, reachable, total, flow_value, what):
+    deficit = total - flow_value
+    blocked = [plan for plan, node in zip(plans, course_nodes) if node in reachable]
+    required = sum(plan['sessions'] for plan in blocked)
+    return {
+        'check': check,
+        'deficit': deficit,
+        'courses': _names(blocked),
+        'course_count': len(blocked),
+        'faculty': sorted({plan['faculty_id'] for plan in blocked})[:MAX_LISTED],
+        'required_sessions': required,
+        'placeable_sessions': required - deficit,
+        'message': f"At least {deficit} sessions cannot be placed: {len(blocked)} courses need {required} "
+                   f"sessions but {what} allow at most {required - deficit}"
+    }
+
+
+def check_faculty_time_flow(generator, plans):
+    """
+    Sessions -> (faculty, slot) -> slot matching.
+
+    A course uses each slot at most once, a faculty member teaches one session
+    per slot and a slot holds at most one session per room. A max flow below
+    the number of sessions proves infeasibility; the courses still reachable
+    in the residual graph form the over-demanded (Hall violating) set.
+    """
+    plans = [plan for plan in plans if plan['avail_mask'] and plan['faculty_id']]
+    total = sum(plan['sessions'] for plan in plans)
+    if not total:
+        return []
+    n_slots = generator.n_slots
+    course_nodes = list(range(2, 2 + len(plans)))
+    slot_base = 2 + len(plans)
+    next_node = slot_base + n_slots
+    faculty_slot = {}
+    edges = [(slot_base + slot, 1, generator.n_rooms) for slot in range(n_slots)]
+    for plan, node in zip(plans, course_nodes):
+        edges.append((0, node, plan['sessions']))
+        for slot in iter_bits(plan['avail_mask']):
+            key = (plan['faculty_id'], slot)
+            if key not in faculty_slot:
+                faculty_slot[key] = next_node
+                edges.append((next_node, slot_base + slot, 1))
+                next_node += 1
+            edges.append((node, faculty_slot[key], 1))
+    flow_value, reachable = _max_flow(next_node, edges)
+    if flow_value >= total:
+        return []
+    return [_flow_certificate('faculty_time_matching', plans, course_nodes, reachable, total, flow_value,
+                              'faculty availability and rooms per slot')]
+
+
+def check_room_slot_flow(generator, plans):
+    """
+    Sessions -> (course, slot) -> (slot, room class) matching.
+
+    Rooms are grouped into classes of rooms that suit exactly the same
+    courses, so the network has one node per slot and class instead of per
+    room; class capacity is its number of rooms.
+    """
+    plans = [plan for plan in plans if plan['avail_mask']]
+    total = sum(plan['sessions'] for plan in plans)
+    if not total or not generator.n_rooms:
+        return []
+    masks = sorted({plan['room_mask'] for plan in plans})
+    classes = {}
+    for room in range(generator.n_rooms):
+        signature = tuple(mask >> room & 1 for mask in masks)
+        classes.setdefault(signature, []).append(room)
+    class_list = list(classes.values())
+    class_mask = [sum(1 << room for room in rooms) for rooms in class_list]
+    allowed = {mask: [k for k, cm in enumerate(class_mask) if not cm & ~mask] for mask in masks}
+
+    n_slots, n_classes = generator.n_slots, len(class_list)
+    course_nodes = list(range(2, 2 + len(plans)))
+    class_base = 2 + len(plans)
+    next_node = class_base + n_slots * n_classes
+    edges = [(class_base + slot * n_classes + k, 1, len(class_list[k]))
+             for slot in range(n_slots) for k in range(n_classes)]
+    for plan, node in zip(plans, course_nodes):
+        edges.append((0, node, plan['sessions']))
+        for slot in iter_bits(plan['avail_mask']):
+            edges.append((node, next_node, 1))
+            for k in allowed[plan['room_mask']]:
+                edges.append((next_node, class_base + slot * n_classes + k, 1))
+            next_node += 1
+    flow_value, reachable = _max_flow(next_node, edges)
+    if flow_value >= total:
+        return []
+    return [_flow_certificate('room_slot_matching', plans, course_nodes, reachable, total, flow_value,
+                              'suitable rooms in their available slots')]
+
+
+CHECKS = (
+    ('course_slots', check_course_slots),
+    ('faculty_load', check_faculty_load),
+    ('room_supply', check_room_supply),
+    ('student_load', check_student_load),
+    ('faculty_time_matching', check_faculty_time_flow),
+    ('room_slot_matching', check_room_slot_flow)
+)
+
+
+def analyze_feasibility(courses, faculty, rooms, students, program_config=None):
+    """
+    Run the counting bounds and both max-flow relaxations.
+
+    Returns {'feasible', 'certificates', 'warnings', 'required_sessions', 'checks', 'elapsed_ms'}.
+    ``feasible`` is False as soon as any check produced a certificate; True
+    only means none of the necessary conditions failed.
+    """
+    started = _time.perf_counter()
+    generator = TimetableGenerator(courses, faculty, rooms, students, program_config or {})
+    plans = generator.build_course_plans()
+
+    warnings = []
+    for plan in plans:
+        # Types no room has (e.g. 'theory') silently use any room; only capacity shortfalls are worth a warning
+        required_type = str(plan['course'].get('type', 'theory')).lower()
+        if required_type in generator.rooms_by_type and \
+                not generator.get_suitable_room_mask(required_type, plan['enrolled']):
+            warnings.append(f"Course '{plan['course'].get('name') or plan['id']}' has no {required_type} room "
+                            f"for {plan['enrolled']} students; any room will be used")
+
+    certificates = []
+    timings = {}
+    for name, check in CHECKS:
+        check_started = _time.perf_counter()
+        found = check(generator, plans)
+        timings[name] = {'passed': not found, 'ms': round((_time.perf_counter() - check_started) * 1000, 2)}
+        certificates.extend(found)
+
+    return {
+        'feasible': not certificates,
+        'certificates': certificates,
+        'warnings': warnings,
+        'required_sessions': sum(plan['sessions'] for plan in plans),
+        'checks': timings,
+        'elapsed_ms': round((_time.perf_counter() - started) * 1000, 2)
+    }
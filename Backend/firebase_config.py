@@ -1,13 +1,20 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import os
 from dotenv import load_dotenv
 import json
+import copy
+import threading
+import time
+from collections import OrderedDict
+from metrics import FIRESTORE_READS, FIRESTORE_WRITES
+from storage import FirestoreStorage, SQLiteStorage, WriteConflict, project_fields, matches_filters
 
 load_dotenv()
 
 def initialize_firebase():
     try:
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
         if not firebase_admin._apps:
   
             if os.getenv('FIREBASE_SERVICE_ACCOUNT'):
@@ -32,59 +39,368 @@ def initialize_firebase():
         print(f"Error initializing Firebase: {e}")
         return None
 
-db = initialize_firebase()
+
+def create_storage(backend=None):
+    """
+    Build the storage backend named by ``backend`` or STORAGE_BACKEND.
+
+    'firestore' (default) connects with the service account; 'sqlite' opens
+    SQLITE_PATH (default timetable.db) and needs no credentials.
+    """
+    backend = (backend or os.getenv('STORAGE_BACKEND', 'firestore')).lower()
+    if backend == 'sqlite':
+        return SQLiteStorage(os.getenv('SQLITE_PATH', 'timetable.db'))
+    if backend == 'firestore':
+        return FirestoreStorage(initialize_firebase())
+    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}' (use firestore or sqlite)")
+
+# Created on first use rather than at import, so importing this module needs
+# neither credentials nor a network
+_storage = None
+_storage_lock = threading.Lock()
+
+
+class CollectionCache:
+    """
+    Read-through cache of whole collections, keyed by collection name.
+
+    Entries expire after ``ttl`` seconds and the cache is bounded both in
+    collections and in total documents (least recently used goes first).
+    Writes made through this module patch or drop the cached copy, so reads
+    stay consistent with what this process wrote.
+
+    Reads hand out a shallow copy of each document: top-level fields can be
+    reassigned freely, but nested lists and dicts are shared with the cache
+    and must not be modified in place (copy them first).
+
+    Every write bumps a per-collection generation, cached or not. A reader
+    takes ``generation()`` before fetching and passes it to ``put``; if a
+    write landed during the fetch the snapshot is dropped instead of cached.
+    """
+
+    def __init__(self, ttl=30, max_collections=32, max_documents=200000):
+        self.ttl = ttl
+        self.max_collections = max_collections
+        self.max_documents = max_documents
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.generations = {}
+        self.epoch = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_collections > 0
+
+    def get(self, collection_name):
+        """Cached documents (id -> data) or None on a miss or expiry"""
+        with self.lock:
+            entry = self.entries.get(collection_name)
+            if entry is None or entry['expires'] < time.monotonic():
+                if entry is not None:
+                    del self.entries[collection_name]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(collection_name)
+            self.hits += 1
+            return entry['docs']
+
+    def get_document(self, collection_name, document_id):
+        """A single cached document, or None when the collection is not cached"""
+        with self.lock:
+            entry = self.entries.get(collection_name)
+            if entry is None or entry['expires'] < time.monotonic() or document_id not in entry['docs']:
+                return None
+            self.hits += 1
+            return entry['docs'][document_id]
+
+    def generation(self, collection_name):
+        """Changes whenever a write to the collection passes through this cache"""
+        with self.lock:
+            return self.epoch, self.generations.get(collection_name, 0)
+
+    def _bump(self, collection_name):
+        self.generations[collection_name] = self.generations.get(collection_name, 0) + 1
+
+    def put(self, collection_name, docs, generation=None):
+        """Cache a fetched collection; skipped when it was written since ``generation``"""
+        if not self.enabled or len(docs) > self.max_documents:
+            return
+        with self.lock:
+            if generation is not None and generation != (self.epoch, self.generations.get(collection_name, 0)):
+                return
+            self.entries[collection_name] = {'docs': docs, 'expires': time.monotonic() + self.ttl}
+            self.entries.move_to_end(collection_name)
+            while (len(self.entries) > self.max_collections
+                   or sum(len(e['docs']) for e in self.entries.values()) > self.max_documents):
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def patch(self, collection_name, document_id, data=None, merge=False):
+        """Apply a write to a cached collection; data=None deletes the document"""
+        with self.lock:
+            self._bump(collection_name)
+            entry = self.entries.get(collection_name)
+            if entry is None:
+                return
+            docs = entry['docs']
+            if data is None:
+                docs.pop(document_id, None)
+            elif merge:
+                if document_id not in docs or any('.' in key for key in data):
+                    # Dotted field paths or unknown documents: let the next read refetch
+                    del self.entries[collection_name]
+                    self.invalidations += 1
+                    return
+                docs[document_id] = dict(docs[document_id], **copy.deepcopy(data))
+            else:
+                docs[document_id] = dict(copy.deepcopy(data), id=document_id)
+
+    def invalidate(self, collection_name=None):
+        with self.lock:
+            if collection_name is None:
+                self.epoch += 1
+                self.invalidations += len(self.entries)
+                self.entries.clear()
+                return
+            self._bump(collection_name)
+            if self.entries.pop(collection_name, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'collections': len(self.entries),
+                'documents': sum(len(e['docs']) for e in self.entries.values()),
+                'ttl': self.ttl
+            }
+
+
+cache = CollectionCache(
+    ttl=float(os.getenv('CACHE_TTL_SECONDS', 30)),
+    max_collections=int(os.getenv('CACHE_MAX_COLLECTIONS', 32)),
+    max_documents=int(os.getenv('CACHE_MAX_DOCUMENTS', 200000))
+)
+
+
+def get_storage():
+    """The active storage backend, created from the environment on first call"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+def set_storage(storage):
+    """Swap the storage backend (e.g. SQLiteStorage(':memory:') in tests) and drop the cache"""
+    global _storage
+    _storage = storage
+    cache.invalidate()
 
 def get_db():
-    """Return Firestore database instance"""
-    return db
+    """Return Firestore database instance (None with another backend)"""
+    return getattr(get_storage(), 'client', None)
+
+def set_db(database):
+    """Swap the Firestore client (e.g. a MemoryFirestore in tests) and drop the cache"""
+    set_storage(FirestoreStorage(database))
+
+def get_cache_stats():
+    """Hit/miss counters and size of the collection cache"""
+    return cache.stats()
 
 def add_document(collection_name, document_id, data):
-    """Add or update a document in Firestore"""
+    """Add or update a document"""
     try:
-        db.collection(collection_name).document(document_id).set(data)
+        get_storage().set(collection_name, document_id, data)
+        FIRESTORE_WRITES.inc(collection=collection_name)
+        cache.patch(collection_name, document_id, data)
         return {"success": True, "message": "Document added successfully"}
+    except WriteConflict as e:
+        return {"success": False, "message": str(e), "conflict": True}
     except Exception as e:
         return {"success": False, "message": str(e)}
 
 
+def increment_document(collection_name, document_id, field, start=0, data=None):
+    """
+    Atomically add one to a counter field (``start`` + 1 for a new document)
+    and merge ``data`` into the document. Returns the new ``value`` and the
+    ``previous`` document (None when it was created).
+    """
+    try:
+        value, previous = get_storage().increment(collection_name, document_id, field, start, data)
+        FIRESTORE_READS.inc(collection=collection_name)
+        FIRESTORE_WRITES.inc(collection=collection_name)
+        cache.invalidate(collection_name)
+        return {"success": True, "value": value, "previous": previous}
+    except Exception as e:
+        return {"success": False, "message": str(e)}
+
+
+# Firestore rejects batches with more than 500 writes
+BATCH_LIMIT = 500
+
+def add_documents_batch(collection_name, items):
+    """Write (document_id, data) pairs in a single batched commit (at most BATCH_LIMIT)"""
+    if len(items) > BATCH_LIMIT:
+        return {"success": False, "message": f"A batch holds at most {BATCH_LIMIT} writes"}
+    try:
+        get_storage().set_many(collection_name, items)
+        FIRESTORE_WRITES.inc(len(items), collection=collection_name)
+        for document_id, data in items:
+            cache.patch(collection_name, document_id, data)
+        return {"success": True, "message": f"{len(items)} documents written", "written": len(items)}
+    except Exception as e:
+        return {"success": False, "message": str(e), "written": 0}
+
+
 def get_document(collection_name, document_id):
-    """Get a document from Firestore"""
+    """Get a document"""
     try:
-        doc = db.collection(collection_name).document(document_id).get()
-        if doc.exists:
-            return {"success": True, "data": doc.to_dict()}
+        cached = cache.get_document(collection_name, document_id)
+        if cached is not None:
+            return {"success": True, "data": dict(cached)}
+        data = get_storage().get(collection_name, document_id)
+        FIRESTORE_READS.inc(collection=collection_name)
+        if data is not None:
+            return {"success": True, "data": data}
         return {"success": False, "message": "Document not found"}
     except Exception as e:
         return {"success": False, "message": str(e)}
 
 
-def get_all_documents(collection_name):
-    """Get all documents from a collection"""
+def iter_documents(collection_name, select=None, start_after=None, limit=None, page_size=500, filters=None):
+    """
+    Yield documents ordered by id, one page of ``page_size`` at a time.
+
+    ``select`` is a list of field paths to fetch (the id is always included),
+    ``start_after`` a document id cursor and ``filters`` (field, op, value)
+    tuples run by the database. Memory stays bounded by one page; a cached
+    collection is served from the cache instead.
+    """
+    filters = filters or ()
+    remaining = limit
+    cached = cache.get(collection_name)
+    if cached is not None:
+        for doc_id in sorted(doc_id for doc_id in cached if (start_after is None or doc_id > start_after)
+                             and matches_filters(cached[doc_id], filters)):
+            if remaining is not None and remaining <= 0:
+                return
+            d = project_fields(cached[doc_id], select) if select else dict(cached[doc_id])
+            d["id"] = doc_id
+            yield d
+            if remaining is not None:
+                remaining -= 1
+        return
+
+    cursor = start_after
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = get_storage().query(collection_name, filters=filters, select=select,
+                                   start_after=cursor, limit=size, ordered=True)
+        count = 0
+        for doc_id, d in page:
+            d["id"] = doc_id
+            cursor = doc_id
+            count += 1
+            yield d
+        FIRESTORE_READS.inc(count, collection=collection_name)
+        if remaining is not None:
+            remaining -= count
+        if count < size:
+            return
+
+
+def get_all_documents(collection_name, limit=None, start_after=None, select=None, filters=None):
+    """
+    Get all documents from a collection, or those matching ``filters``.
+
+    With ``limit``, ``start_after`` or ``select`` a single page is read instead
+    and ``next_cursor`` holds the id to pass as ``start_after`` for the next one.
+    """
+    if limit is not None or start_after is not None or select:
+        try:
+            data = list(iter_documents(collection_name, select=select, start_after=start_after, limit=limit,
+                                       filters=filters))
+            next_cursor = data[-1]["id"] if limit is not None and len(data) == limit else None
+            return {"success": True, "data": data, "next_cursor": next_cursor}
+        except Exception as e:
+            return {"success": False, "message": str(e)}
+    if filters:
+        return query_documents(collection_name, filters)
+    try:
+        cached = cache.get(collection_name)
+        if cached is None:
+            generation = cache.generation(collection_name)
+            cached = {}
+            for doc_id, d in get_storage().query(collection_name):
+                d["id"] = doc_id
+                cached[doc_id] = d
+            FIRESTORE_READS.inc(len(cached), collection=collection_name)
+            cache.put(collection_name, cached, generation)
+        # Shallow copies: nested values are shared with the cache (see CollectionCache)
+        data = [dict(d) for d in cached.values()]
+        return {"success": True, "data": data}
+    except Exception as e:
+        return {"success": False, "message": str(e)}
+
+
+def query_documents(collection_name, filters):
+    """
+    Get the documents matching all (field, op, value) ``filters``.
+
+    The filters run in the database (op '==' or 'array_contains'), so only
+    matching documents are transferred; a cached collection is filtered in
+    memory instead.
+    """
     try:
-        docs = db.collection(collection_name).stream()
+        cached = cache.get(collection_name)
+        if cached is not None:
+            data = [dict(d) for d in cached.values() if matches_filters(d, filters)]
+            return {"success": True, "data": data}
         data = []
-        for doc in docs:
-            d = doc.to_dict()
-            d["id"] = doc.id
+        for doc_id, d in get_storage().query(collection_name, filters=filters):
+            d["id"] = doc_id
             data.append(d)
+        FIRESTORE_READS.inc(len(data), collection=collection_name)
         return {"success": True, "data": data}
     except Exception as e:
         return {"success": False, "message": str(e)}
 
 
+def get_documents_where(collection_name, field, value, op='=='):
+    """Get the documents whose ``field`` equals (or, for 'array_contains', lists) ``value``"""
+    return query_documents(collection_name, [(field, op, value)])
+
+
 def delete_document(collection_name, document_id):
-    """Delete a document from Firestore"""
+    """Delete a document"""
     try:
-        db.collection(collection_name).document(document_id).delete()
+        get_storage().delete(collection_name, document_id)
+        FIRESTORE_WRITES.inc(collection=collection_name)
+        cache.patch(collection_name, document_id, None)
         return {"success": True, "message": "Document deleted successfully"}
     except Exception as e:
         return {"success": False, "message": str(e)}
 
 
 def update_document(collection_name, document_id, data):
-    """Update a document in Firestore"""
+    """Update a document (dotted keys update nested fields)"""
     try:
-        db.collection(collection_name).document(document_id).update(data)
+        get_storage().update(collection_name, document_id, data)
+        FIRESTORE_WRITES.inc(collection=collection_name)
+        cache.patch(collection_name, document_id, data, merge=True)
         return {"success": True, "message": "Document updated successfully"}
     except Exception as e:
         return {"success": False, "message": str(e)}
@@ -0,0 +1,147 @@
+"""
+Repeat-generation shortcuts: input fingerprints and single-flight runs.
+
+A fingerprint hashes everything a solve depends on, so a stored timetable
+with the same fingerprint can be returned instead of solving again, and
+concurrent identical requests share one run.
+"""
+import hashlib
+import json
+import threading
+
+from firebase_config import get_all_documents
+from metrics import REGISTRY
+from schema import normalize_enrollment
+from timetable_generator import GenerationCancelled
+from timetable_storage import load_timetable
+
+
+# Bump when solver changes should stop old results from being reused
+FINGERPRINT_VERSION = 1
+
+# Request fields each algorithm reads that change what it produces (besides the
+# program config); ``workers`` only changes parallelism and is left out
+ALGORITHM_OPTIONS = {
+    'optimize': ('start',),
+    'portfolio': ('attempts', 'algorithms'),
+    'incremental': ('timetable_id', 'changed')
+}
+
+# Program config read only by the optimizer (directly or in portfolio attempts)
+OPTIMIZER_SETTINGS = ('optimize_iterations', 'optimize_time_limit', 'objective_weights')
+OPTIMIZING_ALGORITHMS = ('optimize', 'portfolio')
+
+# Bookkeeping fields that do not affect scheduling
+VOLATILE_FIELDS = ('created_at', 'updated_at')
+
+GENERATION_OUTCOMES = REGISTRY.counter('timetable_generation_requests_total',
+                                       'Generation requests by outcome (solved, memo_hit, deduplicated)')
+
+
+def _normalized(doc):
+    return {key: value for key, value in doc.items() if key not in VOLATILE_FIELDS}
+
+
+def input_fingerprint(dataset, program_config, algorithm, options=None):
+    """
+    SHA-256 over the normalized inputs of one generation.
+
+    Covers the (program-filtered) courses, the faculty and rooms they can use,
+    each student's enrollments within those courses, the program config, the
+    algorithm and its options. Only options and optimizer settings the chosen
+    algorithm reads are included; document order and timestamps do not matter.
+    """
+    course_ids = {str(c.get('id')) for c in dataset.courses}
+    faculty_ids = {str(c.get('faculty_id')) for c in dataset.courses if c.get('faculty_id')}
+    enrollments = []
+    for student in dataset.students:
+        relevant = sorted(set(normalize_enrollment(student.get('enrolled_courses'))) & course_ids)
+        if relevant:
+            enrollments.append((str(student.get('id')), relevant))
+
+    payload = {
+        'version': FINGERPRINT_VERSION,
+        'courses': sorted((_normalized(c) for c in dataset.courses), key=lambda c: str(c.get('id'))),
+        'faculty': sorted((_normalized(f) for f in dataset.faculty if str(f.get('id')) in faculty_ids),
+                          key=lambda f: str(f.get('id'))),
+        'rooms': sorted((_normalized(r) for r in dataset.rooms), key=lambda r: str(r.get('id'))),
+        'enrollments': sorted(enrollments),
+        'config': {key: value for key, value in program_config.items()
+                   if algorithm in OPTIMIZING_ALGORITHMS or key not in OPTIMIZER_SETTINGS},
+        'algorithm': algorithm,
+        'options': {key: value for key, value in (options or {}).items()
+                    if key in ALGORITHM_OPTIONS.get(algorithm, ())}
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def load_memoized(fingerprint):
+    """The newest stored timetable generated from ``fingerprint`` (expanded), or None"""
+    result = get_all_documents('timetables', select=['created_at'],
+                               filters=[('input_fingerprint', '==', fingerprint)])
+    if not result['success'] or not result['data']:
+        return None
+    newest = max(result['data'], key=lambda doc: str(doc.get('created_at') or ''))
+    loaded = load_timetable(newest['id'])
+    return loaded['data'] if loaded['success'] else None
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    At most one run per key at a time; callers arriving meanwhile wait for it.
+
+    ``run(key, fn)`` returns (result, shared) where ``shared`` is True for
+    callers that received another caller's result. If the running call
+    raises (including cancellation), waiting callers start over and one of
+    them runs ``fn`` itself. Per process only.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def run(self, key, fn, cancel_event=None, on_wait=None):
+        while True:
+            with self.lock:
+                flight = self.flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self.flights[key] = _Flight()
+                else:
+                    flight.waiters += 1
+
+            if leader:
+                try:
+                    flight.result = fn()
+                except BaseException:
+                    flight.failed = True
+                    raise
+                finally:
+                    with self.lock:
+                        del self.flights[key]
+                    flight.done.set()
+                return flight.result, False
+
+            if on_wait:
+                on_wait()
+            while not flight.done.wait(0.2):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled()
+            if not flight.failed:
+                return flight.result, True
+
+    def stats(self):
+        with self.lock:
+            return {
+                'in_flight': len(self.flights),
+                'waiting': sum(flight.waiters for flight in self.flights.values())
+            }
@@ -0,0 +1,144 @@
+import threading
+import time as _time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from timetable_generator import GenerationCancelled
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit when admission control rejects a job"""
+
+
+class Job:
+    """One background generation request and its observable progress"""
+
+    def __init__(self, kind, payload):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.payload = payload
+        self.status = 'queued'
+        self.progress = {'phase': 'queued'}
+        self.result = None
+        self.status_code = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def update(self, **progress):
+        """Merge progress fields (phase, sessions_placed, best_objective, ...)"""
+        with self._lock:
+            self.progress.update(progress)
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def to_dict(self, include_result=True):
+        with self._lock:
+            data = {
+                'job_id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool with admission control.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queued`` more
+    wait; further submissions raise JobQueueFull instead of piling up. Finished
+    jobs are kept (up to ``keep_finished``) so clients can poll for results.
+    """
+
+    def __init__(self, max_workers=2, max_queued=8, keep_finished=200):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='timetable-job')
+        self.jobs = OrderedDict()
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def submit(self, kind, target, payload):
+        """
+        Queue ``target(payload, job)``; it returns (body, status_code) like a
+        Flask view. Raises JobQueueFull when the pool and queue are saturated.
+        """
+        job = Job(kind, payload)
+        with self.lock:
+            if self.active >= self.max_workers + self.max_queued:
+                raise JobQueueFull(f"{self.active} jobs already running or queued")
+            self.active += 1
+            self.jobs[job.id] = job
+            self._evict_finished()
+        self.executor.submit(self._run, job, target)
+        return job
+
+    def _run(self, job, target):
+        try:
+            if job.cancelled():
+                job.status = 'cancelled'
+                return
+            job.status = 'running'
+            job.started_at = datetime.now().isoformat()
+            started = _time.perf_counter()
+            body, status_code = target(job.payload, job)
+            job.result, job.status_code = body, status_code
+            job.status = 'succeeded' if status_code < 400 and body.get('success') else 'failed'
+            job.update(phase='done', elapsed=round(_time.perf_counter() - started, 4))
+        except GenerationCancelled:
+            job.status = 'cancelled'
+            job.update(phase='cancelled')
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            with self.lock:
+                self.active -= 1
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs never start, running ones stop at the next check"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if not job.finished_at:
+            job.cancel_event.set()
+            if job.status == 'queued':
+                job.update(phase='cancelled')
+        return job
+
+    def list(self):
+        return [job.to_dict(include_result=False) for job in reversed(list(self.jobs.values()))]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'active': self.active,
+                'tracked_jobs': len(self.jobs)
+            }
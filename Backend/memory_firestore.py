@@ -0,0 +1,195 @@
+"""
+A small in-memory stand-in for the parts of the Firestore client this backend
+uses, so the API and caches can run offline and in tests:
+
+    from memory_firestore import MemoryFirestore
+    import firebase_config
+    firebase_config.set_db(MemoryFirestore())
+"""
+import copy
+import threading
+
+from storage import apply_update, matches_filters, project_fields
+
+
+class MemorySnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class MemoryDocument:
+    def __init__(self, store, collection_name, doc_id):
+        self._store = store
+        self._collection = collection_name
+        self.id = doc_id
+
+    def _docs(self):
+        return self._store.collections.setdefault(self._collection, {})
+
+    def set(self, data):
+        with self._store.lock:
+            self._store.writes += 1
+            self._docs()[self.id] = copy.deepcopy(data)
+
+    def get(self, transaction=None):
+        with self._store.lock:
+            self._store.reads += 1
+            return MemorySnapshot(self.id, self._docs().get(self.id))
+
+    def update(self, data):
+        with self._store.lock:
+            if self.id not in self._docs():
+                raise KeyError(f"No document to update: {self._collection}/{self.id}")
+            self._store.writes += 1
+            apply_update(self._docs()[self.id], data)
+
+    def delete(self):
+        with self._store.lock:
+            self._store.writes += 1
+            self._docs().pop(self.id, None)
+
+
+class MemoryQuery:
+    """The subset of Firestore queries the backend uses: ==/array_contains filters, order by id, cursor, limit, select"""
+
+    def __init__(self, store, name, ordered=False, cursor=None, count=None, fields=None, filters=()):
+        self._store = store
+        self._name = name
+        self._filters = filters
+        self._ordered = ordered
+        self._cursor = cursor
+        self._count = count
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = {'ordered': self._ordered, 'cursor': self._cursor, 'count': self._count,
+                 'fields': self._fields, 'filters': self._filters}
+        state.update(changes)
+        return MemoryQuery(self._store, self._name, **state)
+
+    def where(self, filter):
+        if filter.op_string not in ('==', 'array_contains'):
+            raise NotImplementedError('MemoryFirestore only supports == and array_contains filters')
+        return self._copy(filters=self._filters + ((filter.field_path, filter.op_string, filter.value),))
+
+    def order_by(self, field_path):
+        if field_path != '__name__':
+            raise NotImplementedError('MemoryFirestore only orders by document id')
+        return self._copy(ordered=True)
+
+    def start_after(self, fields):
+        return self._copy(cursor=fields['__name__'])
+
+    def limit(self, count):
+        return self._copy(count=count)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    def stream(self):
+        with self._store.lock:
+            docs = [(doc_id, data) for doc_id, data in self._store.collections.get(self._name, {}).items()
+                    if matches_filters(data, self._filters)]
+            if self._ordered:
+                docs.sort(key=lambda item: item[0])
+            if self._cursor is not None:
+                docs = [(doc_id, data) for doc_id, data in docs if doc_id > self._cursor]
+            if self._count is not None:
+                docs = docs[:self._count]
+            self._store.reads += len(docs)
+            docs = [(doc_id, copy.deepcopy(data) if self._fields is None else project_fields(data, self._fields))
+                    for doc_id, data in docs]
+        for doc_id, data in docs:
+            yield MemorySnapshot(doc_id, data)
+
+
+class MemoryCollection(MemoryQuery):
+    def __init__(self, store, name):
+        super().__init__(store, name)
+
+    def document(self, doc_id):
+        return MemoryDocument(self._store, self._name, doc_id)
+
+
+class MemoryBatch:
+    """Collects set() calls and applies them together on commit()"""
+
+    def __init__(self, store):
+        self._store = store
+        self._writes = []
+
+    def set(self, document, data):
+        self._writes.append((document, copy.deepcopy(data)))
+
+    def commit(self):
+        with self._store.lock:
+            for document, data in self._writes:
+                document.set(data)
+        self._writes = []
+
+
+class MemoryTransaction:
+    """
+    The parts of a Firestore Transaction the ``transactional`` decorator and
+    its callback use: the store lock is held from begin to commit, so
+    transactions are serialized instead of retried.
+    """
+
+    _read_only = False
+    _max_attempts = 1
+
+    def __init__(self, store):
+        self._store = store
+        self._id = None
+        self._writes = []
+
+    def _clean_up(self):
+        self._writes = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._store.lock.acquire()
+        self._id = b'memory-transaction'
+
+    def set(self, document, data):
+        self._writes.append((document, copy.deepcopy(data)))
+
+    def _commit(self):
+        try:
+            for document, data in self._writes:
+                document.set(data)
+        finally:
+            self._clean_up()
+            self._store.lock.release()
+
+    def _rollback(self):
+        if self._id is not None:
+            self._clean_up()
+            self._store.lock.release()
+
+
+class MemoryFirestore:
+    """Dict-backed Firestore client; counts document reads and writes like billing does"""
+
+    def __init__(self):
+        self.collections = {}
+        self.lock = threading.RLock()
+        self.reads = 0
+        self.writes = 0
+
+    def collection(self, name):
+        return MemoryCollection(self, name)
+
+    def batch(self):
+        return MemoryBatch(self)
+
+    def transaction(self):
+        return MemoryTransaction(self)
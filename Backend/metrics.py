@@ -0,0 +1,175 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+    from metrics import REGISTRY, PhaseTimer
+    timer = PhaseTimer()
+    with timer.span('solve'):
+        ...
+    timer.breakdown()      # {'solve': 0.1234}
+    REGISTRY.render()      # text for /api/metrics
+"""
+import threading
+import time as _time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for k, v in pairs:
+        value = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{k}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {round(series['sum'], 6)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns a list of (labels_dict, value) pairs"""
+
+    def __init__(self, name, help_text, callback):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.callback()
+        except Exception:
+            return lines
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(_label_key(labels))} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge(self, name, help_text, callback):
+        return self._register(Gauge(name, help_text, callback))
+
+    def render(self):
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+PHASE_SECONDS = REGISTRY.histogram('timetable_phase_seconds', 'Time spent per generation/export phase')
+FIRESTORE_READS = REGISTRY.counter('firestore_document_reads_total', 'Documents read from Firestore')
+FIRESTORE_WRITES = REGISTRY.counter('firestore_document_writes_total', 'Documents written to Firestore')
+HTTP_SECONDS = REGISTRY.histogram('http_request_duration_seconds', 'HTTP request latency by endpoint')
+
+
+class PhaseTimer:
+    """
+    Times named phases of one request.
+
+    Each span is recorded in ``timetable_phase_seconds`` and in this timer's
+    own breakdown, which callers put in ``metadata['phases']``.
+    """
+
+    def __init__(self, **labels):
+        self.labels = labels
+        self.phases = {}
+
+    @contextmanager
+    def span(self, phase):
+        started = _time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = _time.perf_counter() - started
+            self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+            PHASE_SECONDS.observe(elapsed, phase=phase, **self.labels)
+
+    def breakdown(self):
+        return {phase: round(seconds, 4) for phase, seconds in self.phases.items()}
+
+
+@contextmanager
+def timed(phase, **labels):
+    """A one-off span outside any request breakdown"""
+    started = _time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_SECONDS.observe(_time.perf_counter() - started, phase=phase, **labels)
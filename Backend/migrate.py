@@ -0,0 +1,86 @@
+"""
+Migrations for stored records.
+
+Usage:
+    python migrate.py normalize [--collections courses,faculty,rooms,students] [--dry-run]
+
+``normalize`` rewrites existing documents in the canonical form of
+``schema.normalize_record`` (the same form the POST handlers and bulk import
+now write). Documents already canonical are left alone; documents that fail
+validation are reported and not touched. Uses the configured storage backend
+(STORAGE_BACKEND / SQLITE_PATH or Firestore credentials).
+"""
+import argparse
+import json
+import time as _time
+
+from firebase_config import iter_documents, add_documents_batch, BATCH_LIMIT
+from schema import COLLECTIONS, normalize_record
+
+
+MAX_REPORTED_ERRORS = 100
+
+
+def normalize_collection(collection_name, dry_run=False, batch_size=BATCH_LIMIT):
+    """Normalize one collection in batched writes; returns counts and the first validation errors"""
+    started = _time.perf_counter()
+    report = {'collection': collection_name, 'scanned': 0, 'normalized': 0, 'unchanged': 0,
+              'failed': 0, 'write_errors': 0, 'errors': []}
+    pending = []
+
+    def flush():
+        if pending and not dry_run:
+            result = add_documents_batch(collection_name, list(pending))
+            if not result['success']:
+                report['write_errors'] += len(pending)
+                report['normalized'] -= len(pending)
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append({'id': pending[0][0], 'message': f"Batch write failed: {result['message']}"})
+        pending.clear()
+
+    for doc in iter_documents(collection_name, page_size=batch_size):
+        report['scanned'] += 1
+        try:
+            document_id, data = normalize_record(collection_name, doc)
+        except ValueError as e:
+            report['failed'] += 1
+            if len(report['errors']) < MAX_REPORTED_ERRORS:
+                report['errors'].append({'id': doc.get('id'), 'message': str(e)})
+            continue
+        if data == doc:
+            report['unchanged'] += 1
+            continue
+        report['normalized'] += 1
+        pending.append((document_id, data))
+        if len(pending) >= batch_size:
+            flush()
+    flush()
+
+    report['dry_run'] = dry_run
+    report['elapsed'] = round(_time.perf_counter() - started, 4)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Timetable data migrations')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    normalize = sub.add_parser('normalize', help='rewrite records in the canonical schema')
+    normalize.add_argument('--collections', default=','.join(COLLECTIONS),
+                           help=f"comma-separated: {', '.join(COLLECTIONS)}")
+    normalize.add_argument('--dry-run', action='store_true', help='only report what would change')
+    normalize.add_argument('--batch-size', type=int, default=BATCH_LIMIT)
+
+    args = parser.parse_args()
+    if args.command == 'normalize':
+        batch_size = max(1, min(args.batch_size, BATCH_LIMIT))
+        collections = [c.strip() for c in args.collections.split(',') if c.strip()]
+        for name in collections:
+            if name not in COLLECTIONS:
+                parser.error(f"unknown collection '{name}'")
+        reports = [normalize_collection(name, args.dry_run, batch_size) for name in collections]
+        print(json.dumps(reports, indent=2))
+
+
+if __name__ == '__main__':
+    main()
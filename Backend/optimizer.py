@@ -0,0 +1,328 @@
+import math
+import random
+import time as _time
+
+from timetable_generator import ScheduleState, iter_bits, popcount
+
+
+DEFAULT_WEIGHTS = {
+    'unscheduled': 100.0,    # per required session left out of the timetable
+    'faculty_gap': 1.0,      # per idle period between a faculty member's first and last class of a day
+    'course_crowding': 2.0,  # per extra session of one course on the same day
+    'room_waste': 1.0        # per session, fraction of the room's seats left empty
+}
+
+
+class TimetableOptimizer:
+    """
+    Local search over a feasible timetable.
+
+    Simulated annealing with a short tabu list over three neighbourhoods:
+    move one session to another (slot, room), swap the slots/rooms of two
+    sessions, and insert a session the starting timetable left out. Hard
+    constraints are kept by the ScheduleState bitsets, and every move is
+    scored by re-costing only the (faculty, day) and (course, day) cells it
+    touches, so a step costs O(k) regardless of timetable size.
+    """
+
+    def __init__(self, generator, plans, placements, weights=None, seed=None):
+        self.generator = generator
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.rng = random.Random(seed)
+        self.day_mask = (1 << generator.n_periods) - 1
+        self.room_capacity = [generator.to_int(r.get('capacity', 0), 0) for r in generator.room_list]
+
+        # Session k: its plan, slot (-1 while unscheduled) and room
+        self.plans = []
+        self.slots = []
+        self.rooms = []
+        self.state = ScheduleState(generator)
+
+        placed = {}
+        for plan, slot, room in placements:
+            self.add_session(plan, slot, room)
+            placed[plan['id']] = placed.get(plan['id'], 0) + 1
+        for plan in plans:
+            for _ in range(plan['sessions'] - placed.get(plan['id'], 0)):
+                self.add_session(plan, -1, -1)
+
+        self.scheduled = [k for k, slot in enumerate(self.slots) if slot >= 0]
+        self.unscheduled = [k for k, slot in enumerate(self.slots) if slot < 0]
+
+    def add_session(self, plan, slot, room):
+        self.plans.append(plan)
+        self.slots.append(slot)
+        self.rooms.append(room)
+        if slot >= 0:
+            self.state.place(plan, slot, room)
+
+    def placements(self):
+        return [(self.plans[k], self.slots[k], self.rooms[k]) for k in range(len(self.plans)) if self.slots[k] >= 0]
+
+    # ---------- Cost terms ----------
+    def day_bits(self, mask, day):
+        return (mask >> (day * self.generator.n_periods)) & self.day_mask
+
+    def faculty_gap_cost(self, faculty_id, day):
+        bits = self.day_bits(self.state.faculty_busy.get(faculty_id, 0), day)
+        if not bits:
+            return 0
+        first = (bits & -bits).bit_length() - 1
+        last = bits.bit_length() - 1
+        return (last - first + 1) - popcount(bits)
+
+    def course_crowding_cost(self, course_id, day):
+        return max(0, popcount(self.day_bits(self.state.course_busy.get(course_id, 0), day)) - 1)
+
+    def room_waste_cost(self, k):
+        if self.slots[k] < 0:
+            return 0.0
+        capacity = self.room_capacity[self.rooms[k]]
+        if capacity <= 0:
+            return 0.0
+        return max(0, capacity - self.plans[k]['enrolled']) / capacity
+
+    def local_cost(self, sessions, days):
+        """Cost of the cells a move touches: its sessions' faculty and course on the given days"""
+        w = self.weights
+        faculty_cells = set()
+        course_cells = set()
+        cost = 0.0
+        for k in sessions:
+            plan = self.plans[k]
+            for day in days:
+                if plan['faculty_id']:
+                    faculty_cells.add((plan['faculty_id'], day))
+                course_cells.add((plan['id'], day))
+            if self.slots[k] < 0:
+                cost += w['unscheduled']
+            else:
+                cost += w['room_waste'] * self.room_waste_cost(k)
+        cost += w['faculty_gap'] * sum(self.faculty_gap_cost(f, d) for f, d in faculty_cells)
+        cost += w['course_crowding'] * sum(self.course_crowding_cost(c, d) for c, d in course_cells)
+        return cost
+
+    def breakdown(self):
+        """Full objective, term by term; only used at the start and the end of a run"""
+        faculty_ids = {p['faculty_id'] for p in self.plans if p['faculty_id']}
+        course_ids = {p['id'] for p in self.plans}
+        days = range(self.generator.n_days)
+        terms = {
+            'unscheduled': float(len(self.unscheduled)),
+            'faculty_gap': float(sum(self.faculty_gap_cost(f, d) for f in faculty_ids for d in days)),
+            'course_crowding': float(sum(self.course_crowding_cost(c, d) for c in course_ids for d in days)),
+            'room_waste': sum(self.room_waste_cost(k) for k in range(len(self.plans)))
+        }
+        terms['objective'] = sum(self.weights[name] * value for name, value in terms.items())
+        return {name: round(value, 4) for name, value in terms.items()}
+
+    # ---------- Neighbourhoods ----------
+    def pick_room(self, free):
+        """Best-fit (smallest) free room most of the time, a random one otherwise"""
+        if self.rng.random() < 0.7:
+            return (free & -free).bit_length() - 1
+        return self.rng.choice(list(iter_bits(free)))
+
+    def choose_target(self, k):
+        """
+        A random feasible (slot, room) for session k, without touching the state.
+
+        Session k only occupies its own slot, so the blocked mask is exact apart
+        from that slot, which stays allowed for a room-only change.
+        """
+        plan = self.plans[k]
+        current = self.slots[k]
+        allowed = plan['avail_mask'] & ~self.state.blocked_slots(plan)
+        if current >= 0:
+            allowed |= 1 << current
+
+        slots = [s for s in iter_bits(allowed) if self.state.free_rooms(plan, s)]
+        if not slots:
+            return None
+        slot = self.rng.choice(slots)
+        return slot, self.pick_room(self.state.free_rooms(plan, slot))
+
+    def unplace(self, k):
+        if self.slots[k] >= 0:
+            self.state.remove(self.plans[k], self.slots[k], self.rooms[k])
+            self.slots[k], self.rooms[k] = -1, -1
+
+    def place(self, k, slot, room):
+        self.slots[k], self.rooms[k] = slot, room
+        if slot >= 0:
+            self.state.place(self.plans[k], slot, room)
+
+    def apply(self, targets):
+        """
+        Move every session to its target; returns False (state unchanged) when
+        the combination breaks a hard constraint.
+        """
+        old = [(k, self.slots[k], self.rooms[k]) for k, _, _ in targets]
+        for k, _, _ in targets:
+            self.unplace(k)
+        for n, (k, slot, room) in enumerate(targets):
+            plan = self.plans[k]
+            feasible = (plan['avail_mask'] >> slot & 1
+                        and not self.state.blocked_slots(plan) >> slot & 1
+                        and self.state.free_rooms(plan, slot) >> room & 1)
+            if not feasible:
+                for placed, _, _ in targets[:n]:
+                    self.unplace(placed)
+                for k_old, slot_old, room_old in old:
+                    self.place(k_old, slot_old, room_old)
+                return False
+            self.place(k, slot, room)
+        return True
+
+    def propose(self):
+        """Pick a neighbourhood and a concrete move: a list of (session, slot, room)"""
+        roll = self.rng.random()
+        if self.unscheduled and roll < 0.1:
+            k = self.rng.choice(self.unscheduled)
+            target = self.choose_target(k)
+            return [(k,) + target] if target else None
+
+        if len(self.scheduled) > 1 and roll < 0.4:
+            a, b = self.rng.sample(self.scheduled, 2)
+            if self.slots[a] == self.slots[b]:
+                return None
+            plan_a, plan_b = self.plans[a], self.plans[b]
+            if not (plan_a['room_mask'] >> self.rooms[b] & 1 and plan_b['room_mask'] >> self.rooms[a] & 1):
+                return None
+            return [(a, self.slots[b], self.rooms[b]), (b, self.slots[a], self.rooms[a])]
+
+        if self.scheduled:
+            k = self.rng.choice(self.scheduled)
+            target = self.choose_target(k)
+            if not target or target == (self.slots[k], self.rooms[k]):
+                return None
+            return [(k,) + target]
+        return None
+
+    # ---------- Search ----------
+    def run(self, iterations=20000, time_limit=5.0, tabu_tenure=15, initial_temperature=2.0,
+            final_temperature=0.01, trajectory_points=50, progress=None):
+        """
+        Anneal from the starting timetable and return search statistics with the
+        sampled objective trajectory; the best timetable found is left in place.
+        """
+        started = _time.perf_counter()
+        deadline = started + time_limit
+        initial = self.breakdown()
+        current = best = initial['objective']
+        best_solution = (list(self.slots), list(self.rooms))
+
+        tabu = {}
+        accepted = 0
+        sample_every = max(1, iterations // trajectory_points)
+        trajectory = [{'iteration': 0, 'objective': round(current, 4), 'best': round(best, 4)}]
+        cooling = (final_temperature / initial_temperature) ** (1.0 / max(1, iterations))
+        temperature = initial_temperature
+
+        iteration = 0
+        for iteration in range(1, iterations + 1):
+            if iteration % 256 == 0:
+                self.generator.check_cancelled()
+                if _time.perf_counter() > deadline:
+                    break
+            temperature *= cooling
+
+            if iteration % sample_every == 0:
+                trajectory.append({'iteration': iteration, 'objective': round(current, 4), 'best': round(best, 4)})
+                if progress:
+                    progress(iteration, best)
+
+            targets = self.propose()
+            if not targets:
+                continue
+
+            sessions = [k for k, _, _ in targets]
+            days = {self.generator.slot_day(s) for s in [self.slots[k] for k in sessions] + [t[1] for t in targets]
+                    if s >= 0}
+            before = self.local_cost(sessions, days)
+            old = [(k, self.slots[k], self.rooms[k]) for k in sessions]
+            if not self.apply(targets):
+                continue
+            delta = self.local_cost(sessions, days) - before
+
+            is_tabu = any(tabu.get((k, slot), 0) > iteration for k, slot, _ in targets)
+            aspiration = current + delta < best - 1e-9
+            if (is_tabu and not aspiration) or (
+                    delta > 0 and self.rng.random() >= math.exp(-delta / max(temperature, 1e-9))):
+                for k in sessions:
+                    self.unplace(k)
+                for k, slot, room in old:
+                    self.place(k, slot, room)
+                continue
+
+            accepted += 1
+            current += delta
+            for k, slot, _ in old:
+                if slot >= 0:
+                    tabu[(k, slot)] = iteration + tabu_tenure
+                else:
+                    self.unscheduled.remove(k)
+                    self.scheduled.append(k)
+
+            if current < best - 1e-9:
+                best = current
+                best_solution = (list(self.slots), list(self.rooms))
+
+        # Restore the best timetable seen
+        for k in range(len(self.plans)):
+            self.unplace(k)
+        for k, (slot, room) in enumerate(zip(*best_solution)):
+            self.place(k, slot, room)
+        self.scheduled = [k for k, slot in enumerate(self.slots) if slot >= 0]
+        self.unscheduled = [k for k, slot in enumerate(self.slots) if slot < 0]
+
+        final = self.breakdown()
+        trajectory.append({'iteration': iteration, 'objective': round(current, 4), 'best': final['objective']})
+        return {
+            'iterations': iteration,
+            'accepted_moves': accepted,
+            'search_time': round(_time.perf_counter() - started, 4),
+            'objective_initial': initial,
+            'objective_final': final,
+            'objective_trajectory': trajectory
+        }
+
+
+def generate_optimized_timetable(generator, start='csp', iterations=None, time_limit=None, seed=None):
+    """
+    Start from the CSP (or greedy) timetable and improve it with local search.
+
+    The iteration/time budget comes from the arguments or the program config
+    (``optimize_iterations`` / ``optimize_time_limit``).
+    """
+    config = generator.program_config
+    iterations = int(iterations if iterations is not None else config.get('optimize_iterations', 20000))
+    time_limit = float(time_limit if time_limit is not None else config.get('optimize_time_limit', 5))
+    seed = seed if seed is not None else config.get('seed')
+
+    plans = generator.build_course_plans()
+    start_metadata = {'start_algorithm': start}
+    if start == 'csp':
+        csp = generator.solve_csp()
+        start_metadata.update(csp_status=csp['status'], csp_time=csp['elapsed'])
+        if csp['status'] == 'solved':
+            placements = csp['placements']
+        else:
+            start_metadata['start_algorithm'] = 'greedy'
+            placements = generator.greedy_placements(plans)
+    else:
+        placements = generator.greedy_placements(plans)
+
+    # CSP placements reference their own plan dicts; re-key them onto `plans`
+    by_id = {plan['id']: plan for plan in plans}
+    placements = [(by_id[plan['id']], slot, room) for plan, slot, room in placements]
+
+    optimizer = TimetableOptimizer(generator, plans, placements,
+                                   weights=config.get('objective_weights'), seed=seed)
+    stats = optimizer.run(iterations=iterations, time_limit=time_limit, progress=lambda iteration, best:
+                          generator.report_progress(phase='optimizing', iteration=iteration,
+                                                    best_objective=round(best, 4)))
+
+    start_metadata.update(stats)
+    start_metadata['unscheduled_sessions'] = len(optimizer.unscheduled)
+    return generator.build_result(generator.placements_to_entries(optimizer.placements()), 'optimize', start_metadata)
@@ -0,0 +1,81 @@
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from datetime import datetime
+import io
+
+
+def render_pdf(timetable_data, title=None):
+    """Render a timetable document (JSON shape) to PDF bytes; ``title`` overrides the heading"""
+    timetable = timetable_data['timetable']
+    metadata = timetable_data.get('metadata', {})
+    
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), 
+                          rightMargin=30, leftMargin=30, 
+                          topMargin=30, bottomMargin=18)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#1a237e'),
+        spaceAfter=30,
+        alignment=1  
+    )
+    
+    title_text = title or f"Timetable - {metadata.get('program', 'General')} - {metadata.get('semester', 'Current')}"
+    title = Paragraph(title_text, title_style)
+    elements.append(title)
+    
+    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+    
+    for day in days:
+        day_entries = [e for e in timetable if e['day'] == day]
+        
+        if day_entries:
+            day_header = Paragraph(f"<b>{day}</b>", styles['Heading2'])
+            elements.append(day_header)
+            elements.append(Spacer(1, 12))
+            
+            table_data = [['Time', 'Course Code', 'Course Name', 'Faculty', 'Room', 'Type']]
+            
+            for entry in sorted(day_entries, key=lambda x: x['time']):
+                table_data.append([
+                    entry['time'],
+                    entry['course_code'],
+                    entry['course_name'][:30],  
+                    entry['faculty_name'][:20],
+                    entry['room_number'],
+                    entry['type'].capitalize()
+                ])
+            
+            table = Table(table_data, colWidths=[1.2*inch, 1*inch, 2.5*inch, 1.5*inch, 0.8*inch, 0.8*inch])
+            table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a237e')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('FONTSIZE', (0, 1), (-1, -1), 8),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+            ]))
+            
+            elements.append(table)
+            elements.append(Spacer(1, 20))
+    
+    footer_text = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | NEP 2020 Compliant"
+    footer = Paragraph(footer_text, styles['Normal'])
+    elements.append(Spacer(1, 12))
+    elements.append(footer)
+    
+    # Build PDF
+    doc.build(elements)
+    return buffer.getvalue()
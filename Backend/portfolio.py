@@ -0,0 +1,143 @@
+import os
+import random
+import time as _time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from timetable_generator import TimetableGenerator, GenerationCancelled
+from optimizer import generate_optimized_timetable
+
+
+DEFAULT_ALGORITHMS = ['greedy', 'csp', 'optimize']
+
+# Per-process state, filled once by the pool initializer
+_worker = {}
+
+
+def _init_worker(courses, faculty, rooms, students, program_config):
+    """
+    Build the generator once per worker process.
+
+    The dataset travels through the pool initializer, so it is sent (or, with
+    fork, inherited) once per process instead of being pickled with every task.
+    """
+    generator = TimetableGenerator(courses, faculty, rooms, students, program_config)
+    _worker['generator'] = generator
+    _worker['required_sessions'] = sum(plan['sessions'] for plan in generator.build_course_plans())
+
+
+def _run_attempt(algorithm, seed):
+    """Run one seeded attempt in a worker and score it"""
+    generator = _worker['generator']
+    generator.rng = random.Random(seed)
+    started = _time.perf_counter()
+
+    if algorithm == 'csp':
+        result = generator.generate_timetable_csp(randomize=True)
+    elif algorithm == 'optimize':
+        result = generate_optimized_timetable(generator, start='greedy', seed=seed)
+    else:
+        result = generator.generate_simple_timetable()
+
+    validation = generator.validate_timetable(result['timetable'])
+    objective = result['metadata'].get('objective_final', {}).get('objective')
+    return {
+        'result': result,
+        'validation': validation,
+        'stats': {
+            'algorithm': algorithm,
+            'seed': seed,
+            'pid': os.getpid(),
+            'elapsed': round(_time.perf_counter() - started, 4),
+            'sessions': len(result['timetable']),
+            'missing_sessions': _worker['required_sessions'] - len(result['timetable']),
+            'conflicts': len(validation['conflicts']),
+            'objective': objective
+        }
+    }
+
+
+def attempt_rank(stats):
+    """Lower is better: conflicts first, then missing sessions, then objective, then time"""
+    objective = stats['objective'] if stats['objective'] is not None else float('inf')
+    return (stats['conflicts'], stats['missing_sessions'], objective, stats['elapsed'])
+
+
+def run_portfolio(courses, faculty, rooms, students, program_config,
+                  attempts=None, workers=None, algorithms=None, seed=None, progress=None, cancel_event=None):
+    """
+    Race seeded greedy/CSP/optimizer attempts across a process pool.
+
+    Stops as soon as an attempt is complete and conflict-free (pending attempts
+    are cancelled), then returns the best result with per-attempt and
+    per-worker timing stats in ``metadata['portfolio']``. ``progress`` and
+    ``cancel_event`` are the same job hooks the generator takes.
+    """
+    started = _time.perf_counter()
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    attempts = max(1, int(attempts or workers * 2))
+    algorithms = algorithms or DEFAULT_ALGORITHMS
+    seeds = random.Random(seed if seed is not None else program_config.get('seed'))
+
+    tasks = [(algorithms[i % len(algorithms)], seeds.randrange(2 ** 31)) for i in range(attempts)]
+    finished = []
+    failed = 0
+    stopped_early = False
+
+    executor = ProcessPoolExecutor(
+        max_workers=min(workers, attempts),
+        initializer=_init_worker,
+        initargs=(courses, faculty, rooms, students, program_config)
+    )
+    try:
+        pending = {executor.submit(_run_attempt, algorithm, task_seed) for algorithm, task_seed in tasks}
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            if cancel_event is not None and cancel_event.is_set():
+                stopped_early = True
+                for future in pending:
+                    future.cancel()
+                raise GenerationCancelled()
+            for future in done:
+                if future.cancelled():
+                    continue
+                if future.exception():
+                    failed += 1
+                    continue
+                finished.append(future.result())
+            if progress and finished:
+                best_so_far = min(finished, key=lambda a: attempt_rank(a['stats']))['stats']
+                progress(phase='solving', attempts_finished=len(finished),
+                         sessions_placed=best_so_far['sessions'], best_objective=best_so_far['objective'])
+            if any(a['stats']['conflicts'] == 0 and a['stats']['missing_sessions'] <= 0 for a in finished):
+                stopped_early = bool(pending)
+                for future in pending:
+                    future.cancel()
+                break
+    finally:
+        # Attempts already running finish within their own budgets in the background
+        executor.shutdown(wait=not stopped_early, cancel_futures=True)
+
+    if not finished:
+        return {'success': False, 'message': 'All portfolio attempts failed'}
+
+    best = min(finished, key=lambda a: attempt_rank(a['stats']))
+    per_worker = {}
+    for attempt in finished:
+        stats = attempt['stats']
+        worker = per_worker.setdefault(str(stats['pid']), {'attempts': 0, 'busy_time': 0.0})
+        worker['attempts'] += 1
+        worker['busy_time'] = round(worker['busy_time'] + stats['elapsed'], 4)
+
+    result = best['result']
+    result['metadata']['portfolio'] = {
+        'winner': best['stats'],
+        'attempts_submitted': attempts,
+        'attempts_finished': len(finished),
+        'attempts_failed': failed,
+        'stopped_early': stopped_early,
+        'workers': per_worker,
+        'attempts': [a['stats'] for a in finished],
+        'wall_time': round(_time.perf_counter() - started, 4)
+    }
+    result['metadata']['algorithm'] = 'portfolio'
+    return result
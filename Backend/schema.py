@@ -0,0 +1,183 @@
+"""
+Canonical schema for course, faculty, room and student records.
+
+Records are validated and normalized once, when they are written (POST
+handlers, bulk import, ``migrate.py normalize``), so the generator can read
+them without re-parsing:
+
+    courses   credits/semester ints, type lower-case, faculty_id a string or absent
+    faculty   availability as {day: [time, ...]} (absent = always available)
+              plus availability_mask, a bitmask over the default day x period grid
+    rooms     capacity a positive int, type lower-case
+    students  semester an int, enrolled_courses a list of unique string ids
+
+Every normalized record carries ``schema_version``; records without it are
+still accepted by the generator through its legacy parsing.
+"""
+import json
+import uuid
+
+
+SCHEMA_VERSION = 1
+
+# The grid availability_mask is encoded against (the generator's default grid)
+DEFAULT_DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')
+DEFAULT_TIME_SLOTS = (
+    '09:00-10:00', '10:00-11:00', '11:00-12:00', '12:00-13:00',
+    '13:00-14:00', '14:00-15:00', '15:00-16:00', '16:00-17:00'
+)
+DEFAULT_SLOT_INDEX = {f"{day}_{time}": day_index * len(DEFAULT_TIME_SLOTS) + period
+                      for day_index, day in enumerate(DEFAULT_DAYS)
+                      for period, time in enumerate(DEFAULT_TIME_SLOTS)}
+
+COLLECTIONS = ('courses', 'faculty', 'rooms', 'students')
+
+# Per collection: fields that must be present, and fields stored as integers
+REQUIRED_FIELDS = {
+    'courses': ('name',),
+    'faculty': ('name',),
+    'rooms': ('capacity',),
+    'students': ('name',)
+}
+INTEGER_FIELDS = {
+    'courses': ('credits', 'semester'),
+    'faculty': (),
+    'rooms': ('capacity',),
+    'students': ('semester',)
+}
+COURSE_TYPES = ('theory', 'practical', 'lab')
+
+# Defaults the generator would otherwise apply on every read
+DEFAULTS = {
+    'courses': {'credits': 3, 'type': 'theory'},
+    'rooms': {'type': 'classroom'}
+}
+
+
+def _to_int(field, value):
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"Field '{field}' must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Field '{field}' must be an integer")
+    if value < 0:
+        raise ValueError(f"Field '{field}' must not be negative")
+    return value
+
+
+def normalize_availability(availability):
+    """
+    Canonical {day: [time, ...]} (times sorted, no duplicates), or None for "always available".
+
+    Accepts a dict of lists or comma strings, a JSON object string, or a comma
+    string of ``Day_time`` slot keys.
+    """
+    if not availability:
+        return None
+    if isinstance(availability, str) and availability.lstrip().startswith('{'):
+        try:
+            availability = json.loads(availability)
+        except ValueError:
+            raise ValueError("Field 'availability' is not valid JSON")
+    if isinstance(availability, str):
+        parsed = {}
+        for key in (k.strip() for k in availability.split(',')):
+            if not key:
+                continue
+            day, sep, time = key.partition('_')
+            if not sep or not day or not time:
+                raise ValueError(f"Availability slot '{key}' must look like Day_HH:MM-HH:MM")
+            parsed.setdefault(day, []).append(time)
+        availability = parsed
+    if not isinstance(availability, dict):
+        raise ValueError("Field 'availability' must be an object or a comma-separated string")
+
+    canonical = {}
+    for day, times in availability.items():
+        if isinstance(times, str):
+            times = [t.strip() for t in times.split(',') if t.strip()]
+        if not isinstance(times, (list, tuple)) or not all(isinstance(t, str) for t in times):
+            raise ValueError(f"Availability for '{day}' must be a list of time ranges")
+        canonical[str(day)] = sorted({t.strip() for t in times if t.strip()})
+    return canonical or None
+
+
+def availability_mask(availability):
+    """Bitmask of a canonical availability over the default grid (slots outside it are ignored)"""
+    mask = 0
+    for day, times in (availability or {}).items():
+        for time in times:
+            slot = DEFAULT_SLOT_INDEX.get(f"{day}_{time}")
+            if slot is not None:
+                mask |= 1 << slot
+    return mask
+
+
+def normalize_enrollment(enrolled):
+    """Enrolled course ids as a list of unique strings in their original order"""
+    if enrolled is None or enrolled == '':
+        return []
+    if isinstance(enrolled, str):
+        separator = ';' if ';' in enrolled else ','
+        enrolled = enrolled.split(separator)
+    if not isinstance(enrolled, (list, tuple)):
+        raise ValueError("Field 'enrolled_courses' must be a list or a comma-separated string")
+    return list(dict.fromkeys(str(c).strip() for c in enrolled if str(c).strip()))
+
+
+def normalize_record(collection_name, record):
+    """Check one record and return (document_id, canonical data); raises ValueError with the reason"""
+    if collection_name not in COLLECTIONS:
+        raise ValueError(f"Unknown collection '{collection_name}'")
+    if not isinstance(record, dict):
+        raise ValueError('Record must be an object')
+    data = dict(record)
+
+    for field in REQUIRED_FIELDS[collection_name]:
+        if data.get(field) in (None, ''):
+            raise ValueError(f"Missing required field '{field}'")
+
+    for field in INTEGER_FIELDS[collection_name]:
+        if data.get(field) in (None, ''):
+            data.pop(field, None)
+        else:
+            data[field] = _to_int(field, data[field])
+    for field, default in DEFAULTS.get(collection_name, {}).items():
+        if data.get(field) in (None, ''):
+            data[field] = default
+
+    if collection_name == 'courses':
+        data['type'] = str(data['type']).strip().lower()
+        if data['type'] not in COURSE_TYPES:
+            raise ValueError(f"Field 'type' must be one of {', '.join(COURSE_TYPES)}")
+        if data.get('faculty_id') in (None, ''):
+            data.pop('faculty_id', None)
+        else:
+            data['faculty_id'] = str(data['faculty_id'])
+
+    elif collection_name == 'faculty':
+        availability = normalize_availability(data.get('availability'))
+        if availability is None:
+            data.pop('availability', None)
+            data.pop('availability_mask', None)
+        else:
+            data['availability'] = availability
+            data['availability_mask'] = availability_mask(availability)
+
+    elif collection_name == 'rooms':
+        if data['capacity'] == 0:
+            raise ValueError("Field 'capacity' must be positive")
+        data['type'] = str(data['type']).strip().lower()
+
+    elif collection_name == 'students':
+        data['enrolled_courses'] = normalize_enrollment(data.get('enrolled_courses'))
+
+    document_id = str(data.get('id') or uuid.uuid4())
+    data['id'] = document_id
+    data['schema_version'] = SCHEMA_VERSION
+    return document_id, data
+
+
+def is_canonical(record):
+    return isinstance(record, dict) and record.get('schema_version') == SCHEMA_VERSION
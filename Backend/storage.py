@@ -0,0 +1,372 @@
+"""
+Document storage backends behind firebase_config.
+
+Both backends expose the same small interface, with documents as plain dicts:
+
+    set(collection, doc_id, data)        set_many(collection, [(doc_id, data), ...])
+    get(collection, doc_id) -> dict or None
+    update(collection, doc_id, data)     delete(collection, doc_id)
+    query(collection, filters=(), select=None, start_after=None, limit=None, ordered=False)
+        -> iterator of (doc_id, data)
+    increment(collection, doc_id, field, start=0, data=None) -> (value, previous data or None)
+
+``filters`` are (field, op, value) tuples with op '==' or 'array_contains';
+both backends run them in the database rather than in Python.
+"""
+import copy
+import json
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+FILTER_OPS = ('==', 'array_contains')
+
+
+class WriteConflict(Exception):
+    """A write broke a unique constraint (e.g. a second timetable with the same series version)"""
+
+
+# ---------- Document helpers ----------
+
+def project_fields(data, field_paths):
+    """Keep only the given (possibly dotted) field paths of a document"""
+    projected = {}
+    for path in field_paths:
+        source, target = data, projected
+        parts = path.split('.')
+        for part in parts[:-1]:
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+            target = target.setdefault(part, {})
+        else:
+            if isinstance(source, dict) and parts[-1] in source:
+                target[parts[-1]] = copy.deepcopy(source[parts[-1]])
+    return projected
+
+
+_MISSING = object()
+
+def field_value(data, path):
+    """Value at a dotted field path, or _MISSING"""
+    for part in path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return _MISSING
+        data = data[part]
+    return data
+
+
+def matches_filters(data, filters):
+    """In-memory evaluation of (field, op, value) filters, same semantics as the backends"""
+    for field, op, value in filters:
+        current = field_value(data, field)
+        if op == '==':
+            if current is _MISSING or current != value:
+                return False
+        elif op == 'array_contains':
+            if not isinstance(current, list) or value not in current:
+                return False
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+    return True
+
+
+def apply_update(data, changes):
+    """Merge an update into a document; dotted keys address nested fields like Firestore"""
+    for key, value in changes.items():
+        target = data
+        parts = key.split('.')
+        for part in parts[:-1]:
+            if not isinstance(target.get(part), dict):
+                target[part] = {}
+            target = target[part]
+        target[parts[-1]] = copy.deepcopy(value)
+    return data
+
+
+# ---------- Firestore ----------
+
+class FirestoreStorage:
+    """Firestore (or any client with its API, e.g. MemoryFirestore)"""
+
+    name = 'firestore'
+
+    def __init__(self, client):
+        self.client = client
+
+    def _collection(self, collection_name):
+        if self.client is None:
+            raise RuntimeError('Firestore is not initialized')
+        return self.client.collection(collection_name)
+
+    def set(self, collection_name, doc_id, data):
+        self._collection(collection_name).document(doc_id).set(data)
+
+    def set_many(self, collection_name, items):
+        collection = self._collection(collection_name)
+        batch = self.client.batch()
+        for doc_id, data in items:
+            batch.set(collection.document(doc_id), data)
+        batch.commit()
+
+    def get(self, collection_name, doc_id):
+        doc = self._collection(collection_name).document(doc_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def update(self, collection_name, doc_id, data):
+        self._collection(collection_name).document(doc_id).update(data)
+
+    def delete(self, collection_name, doc_id):
+        self._collection(collection_name).document(doc_id).delete()
+
+    def increment(self, collection_name, doc_id, field, start=0, data=None):
+        """
+        Add one to ``field`` (counting from ``start`` for a new document) and
+        merge ``data``, in a transaction; returns (value, previous document).
+        """
+        from google.cloud.firestore_v1 import transactional
+        reference = self._collection(collection_name).document(doc_id)
+
+        @transactional
+        def bump(transaction):
+            snapshot = reference.get(transaction=transaction)
+            previous = snapshot.to_dict() if snapshot.exists else None
+            value = (previous or {}).get(field, start) + 1
+            transaction.set(reference, dict(previous or {}, **(data or {}), **{field: value}))
+            return value, previous
+
+        return bump(self.client.transaction())
+
+    def query(self, collection_name, filters=(), select=None, start_after=None, limit=None, ordered=False):
+        query = self._collection(collection_name)
+        if filters:
+            from google.cloud.firestore_v1 import FieldFilter
+            for field, op, value in filters:
+                if op not in FILTER_OPS:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                query = query.where(filter=FieldFilter(field, op, value))
+        if ordered or start_after is not None or limit is not None:
+            query = query.order_by('__name__')
+        if select:
+            query = query.select(select)
+        if start_after is not None:
+            query = query.start_after({'__name__': start_after})
+        if limit is not None:
+            query = query.limit(limit)
+        for doc in query.stream():
+            yield doc.id, doc.to_dict() or {}
+
+
+# ---------- SQLite ----------
+
+# Scalar fields with an expression index, and list fields whose items are
+# indexed one row per item for array_contains lookups
+INDEXED_FIELDS = ('program', 'faculty_id', 'input_fingerprint')
+MEMBER_FIELDS = ('enrolled_courses',)
+
+_FIELD_PATH = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+
+
+def _json_path(field):
+    # Inlined into the SQL (bound parameters would not match the expression indexes)
+    if not _FIELD_PATH.match(field):
+        raise ValueError(f"Invalid field path: {field}")
+    return f"'$.{field}'"
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+# documents keeps its rowid: on a WITHOUT ROWID table the planner prefers the
+# (collection, id) primary key over the expression indexes
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS documents (
+        collection TEXT NOT NULL,
+        id TEXT NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (collection, id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS document_members (
+        collection TEXT NOT NULL,
+        field TEXT NOT NULL,
+        value TEXT NOT NULL,
+        id TEXT NOT NULL,
+        PRIMARY KEY (collection, field, value, id)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS document_members_by_doc ON document_members (collection, id)"
+] + [
+    f"CREATE INDEX IF NOT EXISTS documents_by_{field} ON documents (collection, json_extract(data, {_json_path(field)}))"
+    for field in INDEXED_FIELDS
+]
+
+# At most one timetable per program, semester and version; created separately
+# so a database that already holds duplicates still opens
+UNIQUE_INDEXES = [
+    """CREATE UNIQUE INDEX IF NOT EXISTS timetables_by_version ON documents (
+        collection, json_extract(data, '$.program'), json_extract(data, '$.semester'), json_extract(data, '$.version')
+    ) WHERE collection = 'timetables' AND json_extract(data, '$.version') IS NOT NULL"""
+]
+
+
+class SQLiteStorage:
+    """
+    Documents as JSON text in one SQLite table, for offline, test and on-prem use.
+
+    The database runs in WAL mode so readers never wait for a writer, and each
+    thread gets its own connection. ``program`` and ``faculty_id`` have
+    expression indexes and ``enrolled_courses`` items are indexed in
+    ``document_members``, so the common filters are index lookups; other
+    fields are still filtered in SQL via json_extract. ``:memory:`` shares one
+    connection behind a lock.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path='timetable.db'):
+        self.path = path
+        self.shared = path == ':memory:'
+        self.local = threading.local()
+        self.lock = threading.RLock() if self.shared else nullcontext()
+        self._shared_connection = None
+        with self._transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            for statement in UNIQUE_INDEXES:
+                try:
+                    conn.execute(statement)
+                except sqlite3.IntegrityError as e:
+                    print(f"Skipping unique index on {self.path}: {e}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=not self.shared)
+        if not self.shared:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _connection(self):
+        if self.shared:
+            if self._shared_connection is None:
+                self._shared_connection = self._connect()
+            return self._shared_connection
+        conn = getattr(self.local, 'connection', None)
+        if conn is None:
+            conn = self.local.connection = self._connect()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        with self.lock:
+            conn = self._connection()
+            # Take the write lock up front so read-modify-write updates cannot interleave
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def _rows(self, sql, params):
+        if self.shared:
+            with self.lock:
+                rows = self._connection().execute(sql, params).fetchall()
+            yield from rows
+            return
+        cursor = self._connection().execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(500)
+            if not rows:
+                return
+            yield from rows
+
+    def _write(self, conn, collection_name, doc_id, data):
+        # An upsert on the primary key only: REPLACE would also delete rows that clash on a unique index
+        try:
+            conn.execute('INSERT INTO documents (collection, id, data) VALUES (?, ?, ?) '
+                         'ON CONFLICT (collection, id) DO UPDATE SET data = excluded.data',
+                         (collection_name, doc_id, _dumps(data)))
+        except sqlite3.IntegrityError as e:
+            raise WriteConflict(f"{collection_name}/{doc_id}: {e}")
+        conn.execute('DELETE FROM document_members WHERE collection = ? AND id = ?', (collection_name, doc_id))
+        members = {(field, _dumps(item)) for field in MEMBER_FIELDS
+                   if isinstance(data.get(field), list) for item in data[field]}
+        conn.executemany('INSERT INTO document_members (collection, field, value, id) VALUES (?, ?, ?, ?)',
+                         [(collection_name, field, value, doc_id) for field, value in members])
+
+    def set(self, collection_name, doc_id, data):
+        with self._transaction() as conn:
+            self._write(conn, collection_name, doc_id, data)
+
+    def set_many(self, collection_name, items):
+        with self._transaction() as conn:
+            for doc_id, data in items:
+                self._write(conn, collection_name, doc_id, data)
+
+    def get(self, collection_name, doc_id):
+        with self.lock:
+            row = self._connection().execute('SELECT data FROM documents WHERE collection = ? AND id = ?',
+                                             (collection_name, doc_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, collection_name, doc_id, data):
+        with self._transaction() as conn:
+            row = conn.execute('SELECT data FROM documents WHERE collection = ? AND id = ?',
+                               (collection_name, doc_id)).fetchone()
+            if row is None:
+                raise KeyError(f"No document to update: {collection_name}/{doc_id}")
+            self._write(conn, collection_name, doc_id, apply_update(json.loads(row[0]), data))
+
+    def increment(self, collection_name, doc_id, field, start=0, data=None):
+        """Add one to ``field`` and merge ``data`` under the write lock; returns (value, previous document)"""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT data FROM documents WHERE collection = ? AND id = ?',
+                               (collection_name, doc_id)).fetchone()
+            previous = json.loads(row[0]) if row else None
+            value = (previous or {}).get(field, start) + 1
+            self._write(conn, collection_name, doc_id, dict(previous or {}, **(data or {}), **{field: value}))
+        return value, previous
+
+    def delete(self, collection_name, doc_id):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM documents WHERE collection = ? AND id = ?', (collection_name, doc_id))
+            conn.execute('DELETE FROM document_members WHERE collection = ? AND id = ?', (collection_name, doc_id))
+
+    def build_query(self, collection_name, filters=(), start_after=None, limit=None, ordered=False):
+        """SQL and parameters for ``query`` (also handy for EXPLAIN QUERY PLAN)"""
+        sql = ['SELECT id, data FROM documents WHERE collection = ?']
+        params = [collection_name]
+        for field, op, value in filters:
+            path = _json_path(field)
+            if op == '==':
+                if value is None:
+                    sql.append(f"AND json_type(data, {path}) = 'null'")
+                else:
+                    sql.append(f"AND json_extract(data, {path}) = ?")
+                    params.append(_dumps(value) if isinstance(value, (dict, list)) else value)
+            elif op == 'array_contains' and field in MEMBER_FIELDS:
+                sql.append('AND id IN (SELECT id FROM document_members WHERE collection = ? AND field = ? AND value = ?)')
+                params.extend([collection_name, field, _dumps(value)])
+            elif op == 'array_contains':
+                sql.append(f"AND EXISTS (SELECT 1 FROM json_each(data, {path}) WHERE json_each.value = ?)")
+                params.append(value)
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        if start_after is not None:
+            sql.append('AND id > ?')
+            params.append(start_after)
+        if ordered or start_after is not None or limit is not None:
+            sql.append('ORDER BY id')
+        if limit is not None:
+            sql.append('LIMIT ?')
+            params.append(limit)
+        return ' '.join(sql), params
+
+    def query(self, collection_name, filters=(), select=None, start_after=None, limit=None, ordered=False):
+        sql, params = self.build_query(collection_name, filters, start_after, limit, ordered)
+        for doc_id, text in self._rows(sql, params):
+            data = json.loads(text)
+            yield doc_id, project_fields(data, select) if select else data
@@ -0,0 +1,208 @@
+"""
+Deterministic synthetic institutions for benchmarks and offline runs.
+
+Usage:
+    python synthetic.py --tier medium --seed 7 --out fixtures/
+    python synthetic.py --courses 500 --students 8000 --format ndjson --out fixtures/
+
+Each collection is written as <name>.json (or .ndjson), ready for
+``POST /api/import/<collection>``.
+"""
+import argparse
+import json
+import os
+import random
+
+from timetable_generator import TimetableGenerator
+
+
+# Size tiers shared with the benchmark suite
+TIERS = {
+    'small': {'courses': 80, 'faculty': 25, 'rooms': 15, 'students': 600},
+    'medium': {'courses': 300, 'faculty': 90, 'rooms': 60, 'students': 4000},
+    'large': {'courses': 1200, 'faculty': 350, 'rooms': 200, 'students': 20000}
+}
+
+PROGRAMS = ('B.Ed.', 'M.Ed.', 'FYUP', 'ITEP')
+DEPARTMENTS = ('Education', 'Psychology', 'Mathematics', 'Science', 'Languages', 'Social Studies')
+
+# Faculty availability patterns and how often each occurs
+AVAILABILITY_MIX = {'full': 0.35, 'mornings': 0.15, 'afternoons': 0.15, 'three_days': 0.15, 'random': 0.2}
+COURSE_TYPE_MIX = {'theory': 0.65, 'practical': 0.15, 'lab': 0.2}
+CLASSROOM_CAPACITIES = {40: 0.3, 60: 0.35, 80: 0.2, 120: 0.15}
+LAB_CAPACITIES = {20: 0.3, 30: 0.4, 40: 0.3}
+COHORT_COURSES = 10
+
+
+def weighted_choice(rng, weights):
+    values = list(weights)
+    return rng.choices(values, weights=[weights[v] for v in values])[0]
+
+
+def faculty_availability(rng, pattern, days, time_slots):
+    """Availability dict for one pattern; None means available at every slot"""
+    half = len(time_slots) // 2
+    if pattern == 'full':
+        return None
+    if pattern == 'mornings':
+        return {day: time_slots[:half] for day in days}
+    if pattern == 'afternoons':
+        return {day: time_slots[half:] for day in days}
+    if pattern == 'three_days':
+        return {day: list(time_slots) for day in sorted(rng.sample(days, min(3, len(days))), key=days.index)}
+    return {day: [t for t in time_slots if rng.random() < 0.6] for day in days}
+
+
+def generate_institution(courses=300, faculty=90, rooms=60, students=4000, seed=42,
+                         programs=PROGRAMS, courses_per_student=(4, 7), popularity=1.1,
+                         availability_mix=None, days=None, time_slots=None, faculty_by_program=False):
+    """
+    Build a reproducible institution: the same arguments always give the same data.
+
+    Courses are spread over ``programs`` and assigned round-robin to faculty
+    (with ``faculty_by_program`` each program gets its own slice of the
+    faculty, so programs share only rooms), faculty follow the availability
+    patterns in ``availability_mix``, rooms mix classrooms, labs and a few auditoriums, and each student takes
+    ``courses_per_student`` (min, max) courses of their own program/semester
+    cohort with Zipf-like ``popularity`` skew. Returns a dict with the four collections
+    and the program config (days/time slots) they were built for.
+    """
+    rng = random.Random(seed)
+    defaults = TimetableGenerator([], [], [], [], {})
+    days = list(days or defaults.days)
+    time_slots = list(time_slots or defaults.time_slots)
+    availability_mix = availability_mix or AVAILABILITY_MIX
+
+    faculty_docs = []
+    for i in range(faculty):
+        pattern = weighted_choice(rng, availability_mix)
+        faculty_docs.append({
+            'id': f"F{i:04d}",
+            'name': f"Faculty {i:04d}",
+            'email': f"faculty{i:04d}@example.edu",
+            'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+            'availability': faculty_availability(rng, pattern, days, time_slots),
+            'availability_pattern': pattern
+        })
+
+    room_docs = []
+    for i in range(rooms):
+        if i % 25 == 24:
+            room_type, capacity = 'auditorium', rng.choice([200, 250, 300])
+        elif rng.random() < 0.25:
+            room_type, capacity = 'lab', weighted_choice(rng, LAB_CAPACITIES)
+        else:
+            room_type, capacity = 'classroom', weighted_choice(rng, CLASSROOM_CAPACITIES)
+        room_docs.append({
+            'id': f"R{i:04d}",
+            'number': f"{chr(ord('A') + i // 100)}{100 + i % 100}",
+            'type': room_type,
+            'capacity': capacity,
+            'building': f"Block {chr(ord('A') + i // 100)}"
+        })
+
+    teaching_order = [f['id'] for f in faculty_docs]
+    rng.shuffle(teaching_order)
+    pools = [teaching_order[p::len(programs)] or teaching_order for p in range(len(programs))]
+    course_docs = []
+    for i in range(courses):
+        if faculty_by_program:
+            pool, turn = pools[i % len(programs)], i // len(programs)
+        else:
+            pool, turn = teaching_order, i
+        course_docs.append({
+            'id': f"C{i:04d}",
+            'code': f"EDU{i:04d}",
+            'name': f"Course {i:04d}",
+            'credits': rng.choice([2, 3, 3, 4]),
+            'type': weighted_choice(rng, COURSE_TYPE_MIX),
+            'program': programs[i % len(programs)],
+            'faculty_id': pool[turn % len(pool)] if pool else None
+        })
+
+    # Cohorts (a program's semester or section) of about COHORT_COURSES courses
+    # each; students only take courses of their own cohort, so clashes stay realistic
+    program_courses = {}
+    for course in course_docs:
+        program_courses.setdefault(course['program'], []).append(course)
+    n_cohorts = {program: max(1, len(docs) // COHORT_COURSES) for program, docs in program_courses.items()}
+    cohorts = {}
+    for program, docs in program_courses.items():
+        for index, course in enumerate(docs):
+            cohort = index % n_cohorts[program]
+            course['semester'] = 1 + cohort % 8
+            cohorts.setdefault((program, cohort), []).append(course['id'])
+    # Zipf-like weights: a few popular courses, a long tail
+    weights = {key: [1.0 / (rank + 1) ** popularity for rank in range(len(ids))] for key, ids in cohorts.items()}
+
+    student_docs = []
+    low, high = courses_per_student
+    for i in range(students):
+        program = programs[i % len(programs)]
+        cohort = (i // len(programs)) % n_cohorts.get(program, 1)
+        pool = cohorts.get((program, cohort), [])
+        k = min(len(pool), round(rng.triangular(low, high, (low + high) / 2)))
+        chosen = set()
+        while len(chosen) < k:
+            chosen.update(rng.choices(pool, weights=weights[(program, cohort)], k=k - len(chosen)))
+        student_docs.append({
+            'id': f"S{i:05d}",
+            'student_id': f"STU{i:05d}",
+            'name': f"Student {i:05d}",
+            'program': program,
+            'semester': 1 + cohort % 8,
+            'enrolled_courses': sorted(chosen)
+        })
+
+    return {
+        'courses': course_docs,
+        'faculty': faculty_docs,
+        'rooms': room_docs,
+        'students': student_docs,
+        'config': {'days': days, 'time_slots': time_slots}
+    }
+
+
+def generate_tier(tier, seed=42, **overrides):
+    """``generate_institution`` with the counts of a named size tier"""
+    params = dict(TIERS[tier], **overrides)
+    return generate_institution(seed=seed, **params)
+
+
+def write_institution(institution, directory, fmt='json'):
+    """Write each collection to ``directory`` as JSON arrays or NDJSON"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name in ('courses', 'faculty', 'rooms', 'students'):
+        path = os.path.join(directory, f"{name}.{fmt}")
+        with open(path, 'w', encoding='utf-8') as f:
+            if fmt == 'ndjson':
+                for doc in institution[name]:
+                    f.write(json.dumps(doc) + '\n')
+            else:
+                json.dump(institution[name], f)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic institution')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--courses', type=int)
+    parser.add_argument('--faculty', type=int)
+    parser.add_argument('--rooms', type=int)
+    parser.add_argument('--students', type=int)
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json')
+    parser.add_argument('--out', default='fixtures')
+    args = parser.parse_args()
+
+    overrides = {key: getattr(args, key) for key in ('courses', 'faculty', 'rooms', 'students')
+                 if getattr(args, key) is not None}
+    institution = generate_tier(args.tier, seed=args.seed, **overrides)
+    for path in write_institution(institution, args.out, args.format):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import firebase_config
+from memory_firestore import MemoryFirestore
+from storage import SQLiteStorage
+
+
+@pytest.fixture
+def memory_db():
+    """A fresh in-memory Firestore behind firebase_config for one test"""
+    database = MemoryFirestore()
+    firebase_config.set_db(database)
+    yield database
+    firebase_config.set_db(MemoryFirestore())
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """A fresh SQLite file database behind firebase_config for one test"""
+    storage = SQLiteStorage(str(tmp_path / 'timetable.db'))
+    firebase_config.set_storage(storage)
+    yield storage
+    firebase_config.set_db(MemoryFirestore())
+
+
+def make_entries(n_courses=30, sessions=3, days=('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'),
+                 times=('09:00-10:00', '10:00-11:00', '11:00-12:00', '12:00-13:00')):
+    """Timetable entries in the generator's shape, sorted by day and time like build_result"""
+    entries = []
+    for c in range(n_courses):
+        for s in range(sessions):
+            slot = (c * sessions + s) % (len(days) * len(times))
+            entries.append({
+                'course_id': f'C{c:03d}',
+                'course_name': f'Course {c}',
+                'course_code': f'EDU{c:03d}',
+                'faculty_id': f'F{c % 7:02d}',
+                'faculty_name': f'Faculty {c % 7}',
+                'type': 'lab' if c % 4 == 0 else 'theory',
+                'credits': sessions,
+                'room_number': f'R{(c * sessions + s) // (len(days) * len(times)):02d}',
+                'room_type': 'classroom',
+                'day': days[slot // len(times)],
+                'time': times[slot % len(times)]
+            })
+    order = {day: index for index, day in enumerate(days)}
+    entries.sort(key=lambda e: (order[e['day']], e['time']))
+    return entries
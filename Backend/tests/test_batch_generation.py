@@ -0,0 +1,12 @@
+import pytest
+
+from batch_generation import decompose
+
+COURSES = [{'id': 'A', 'faculty_id': 'F1'}, {'id': 'B', 'faculty_id': 'F2'}, {'id': 'C', 'faculty_id': 'F3'}]
+
+
+@pytest.mark.parametrize('enrolled', [['A', 'B'], 'A,B', 'A; B'])
+def test_shared_student_couples_courses_in_any_enrollment_form(enrolled):
+    components = decompose(COURSES, [{'id': 'S1', 'enrolled_courses': enrolled}])
+    assert sorted(sorted(str(c['id']) for c in component['courses']) for component in components) == \
+        [['A', 'B'], ['C']]
@@ -0,0 +1,65 @@
+import time
+
+import firebase_config
+from firebase_config import add_document, get_all_documents, cache
+
+
+def seed(count=3):
+    firebase_config.add_documents_batch('rooms', [(f'R{i}', {'room_number': str(i)}) for i in range(count)])
+
+
+def ids(result):
+    return sorted(doc['id'] for doc in result['data'])
+
+
+def test_second_read_is_served_from_cache(memory_db):
+    seed()
+    get_all_documents('rooms')
+    reads, hits = memory_db.reads, cache.hits
+    assert ids(get_all_documents('rooms')) == ['R0', 'R1', 'R2']
+    assert memory_db.reads == reads and cache.hits == hits + 1
+
+
+def test_entries_expire_after_ttl(memory_db, monkeypatch):
+    monkeypatch.setattr(cache, 'ttl', 0.05)
+    seed()
+    get_all_documents('rooms')
+    time.sleep(0.1)
+    reads = memory_db.reads
+    get_all_documents('rooms')
+    assert memory_db.reads == reads + 3
+
+
+def test_writes_patch_the_cached_collection(memory_db):
+    seed()
+    get_all_documents('rooms')
+    add_document('rooms', 'R9', {'room_number': '9'})
+    add_document('rooms', 'R0', {'room_number': 'renamed'})
+    reads = memory_db.reads
+    result = get_all_documents('rooms')
+    assert memory_db.reads == reads
+    assert ids(result) == ['R0', 'R1', 'R2', 'R9']
+    assert {doc['id']: doc['room_number'] for doc in result['data']}['R0'] == 'renamed'
+
+
+def test_copies_do_not_leak_into_the_cache(memory_db):
+    seed()
+    get_all_documents('rooms')['data'][0]['room_number'] = 'changed'
+    assert 'changed' not in {doc['room_number'] for doc in get_all_documents('rooms')['data']}
+
+
+def test_write_during_fetch_is_not_hidden_by_the_cache(memory_db, monkeypatch):
+    seed()
+    storage = firebase_config.get_storage()
+    query = storage.query
+
+    def query_then_write(collection_name, **kwargs):
+        for item in query(collection_name, **kwargs):
+            yield item
+        # Lands after the snapshot was read but before it is cached
+        add_document('rooms', 'R9', {'room_number': '9'})
+
+    monkeypatch.setattr(storage, 'query', query_then_write)
+    assert ids(get_all_documents('rooms')) == ['R0', 'R1', 'R2']
+    monkeypatch.setattr(storage, 'query', query)
+    assert ids(get_all_documents('rooms')) == ['R0', 'R1', 'R2', 'R9']
@@ -0,0 +1,52 @@
+import app
+import firebase_config
+from data_loader import Dataset
+from generation_memo import input_fingerprint
+
+COURSES = [
+    {'id': 'C1', 'name': 'Pedagogy', 'program': 'B.Ed.', 'credits': 2, 'type': 'theory', 'faculty_id': 'F1'},
+    {'id': 'C2', 'name': 'Lab Practice', 'program': 'B.Ed.', 'credits': 1, 'type': 'lab', 'faculty_id': 'F1'}
+]
+FACULTY = [{'id': 'F1', 'name': 'Faculty One'}]
+ROOMS = [{'id': 'R1', 'room_number': '101', 'capacity': 40, 'type': 'classroom'},
+         {'id': 'R2', 'room_number': 'L1', 'capacity': 40, 'type': 'lab'}]
+STUDENTS = [{'id': 'S1', 'name': 'Student One', 'enrolled_courses': ['C1', 'C2']}]
+CONFIG = {'name': 'B.Ed.', 'semester': 'Current'}
+
+
+def fingerprint(algorithm, options=None, config=None):
+    return input_fingerprint(Dataset(COURSES, FACULTY, ROOMS, STUDENTS), dict(CONFIG, **(config or {})),
+                             algorithm, options)
+
+
+def test_options_of_other_algorithms_are_ignored():
+    base = fingerprint('csp')
+    assert fingerprint('csp', {'attempts': 8, 'workers': 4, 'start': 'greedy', 'changed': {}}) == base
+    assert fingerprint('csp', config={'optimize_iterations': 500, 'objective_weights': {'gaps': 2}}) == base
+    assert fingerprint('portfolio', {'attempts': 8, 'workers': 2}) == \
+        fingerprint('portfolio', {'attempts': 8, 'workers': 4})
+
+
+def test_enrollment_form_does_not_change_the_fingerprint():
+    dataset = Dataset(COURSES, FACULTY, ROOMS, [dict(STUDENTS[0], enrolled_courses='C2; C1')])
+    assert input_fingerprint(dataset, CONFIG, 'csp') == fingerprint('csp')
+
+
+def test_options_the_algorithm_reads_change_the_fingerprint():
+    assert fingerprint('optimize', {'start': 'greedy'}) != fingerprint('optimize', {'start': 'csp'})
+    assert fingerprint('optimize', config={'optimize_iterations': 500}) != fingerprint('optimize')
+    assert fingerprint('portfolio', {'attempts': 8}) != fingerprint('portfolio', {'attempts': 4})
+    assert fingerprint('csp', config={'seed': 1}) != fingerprint('csp', config={'seed': 2})
+
+
+def test_irrelevant_options_hit_the_memo(memory_db):
+    for name, docs in (('courses', COURSES), ('faculty', FACULTY), ('rooms', ROOMS), ('students', STUDENTS)):
+        firebase_config.add_documents_batch(name, [(doc['id'], doc) for doc in docs])
+    client = app.app.test_client()
+    request = {'program': 'B.Ed.', 'algorithm': 'csp', 'seed': 1, 'time_limit': 2}
+
+    first = client.post('/api/generate-timetable', json=request).json
+    repeat = client.post('/api/generate-timetable', json=dict(request, attempts=8, optimize_iterations=500)).json
+
+    assert first['success'] and not first.get('memoized')
+    assert repeat['memoized'] and repeat['timetable_id'] == first['timetable_id']
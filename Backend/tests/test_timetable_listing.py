@@ -0,0 +1,39 @@
+import app
+from conftest import make_entries
+from timetable_storage import save_timetable
+
+
+def save_sample(timetable_id='t1'):
+    entries = make_entries(n_courses=5)
+    save_timetable(timetable_id, {'id': timetable_id, 'program': 'B.Ed.', 'timetable': entries})
+    return entries
+
+
+def test_list_expands_full_documents(memory_db):
+    entries = save_sample()
+    response = app.app.test_client().get('/api/timetables')
+    assert response.status_code == 200
+    assert response.json['data'][0]['timetable'] == entries
+
+
+def test_select_timetable_fetches_whole_storage(memory_db):
+    entries = save_sample()
+    response = app.app.test_client().get('/api/timetables?select=program,timetable,storage.format')
+    document = response.json['data'][0]
+    assert response.status_code == 200
+    assert document['timetable'] == entries and 'storage' not in document
+
+
+def test_partial_storage_projection_is_not_expanded(memory_db):
+    save_sample()
+    response = app.app.test_client().get('/api/timetables?select=storage.format')
+    assert response.status_code == 200
+    assert response.json['data'] == [{'id': 't1', 'storage': {'format': 'columnar-v1'}}]
+
+
+def test_broken_document_returns_json_error(memory_db):
+    memory_db.collection('timetables').document('t1').set(
+        {'id': 't1', 'storage': {'format': 'delta-v1', 'base_id': 'missing'}})
+    response = app.app.test_client().get('/api/timetables')
+    assert response.status_code == 500
+    assert response.json['success'] is False
@@ -0,0 +1,71 @@
+import copy
+
+import firebase_config
+from conftest import make_entries
+from timetable_storage import (
+    compact_timetable, expand_timetable, save_timetable, load_timetable, SHARD_COLLECTION
+)
+
+
+def timetable_document(entries, timetable_id='t1'):
+    return {
+        'id': timetable_id,
+        'program': 'B.Ed.',
+        'semester': 'Semester 1',
+        'timetable': entries,
+        'metadata': {'algorithm': 'csp', 'total_sessions': len(entries)},
+        'validation': {'is_valid': True},
+        'created_at': '2024-01-01T00:00:00'
+    }
+
+
+def test_compact_round_trip_keeps_entry_order():
+    document = timetable_document(make_entries())
+    stored, shards = compact_timetable('t1', copy.deepcopy(document))
+    assert 'timetable' not in stored and not shards
+    assert expand_timetable(stored) == document
+
+
+def test_entries_with_extra_fields_round_trip_verbatim():
+    entries = make_entries(n_courses=5)
+    entries[3] = dict(entries[3], note='moved by hand')
+    entries[7] = dict(entries[7], tags=['a', 'b'])
+    del entries[9]['room_type']
+    stored, _ = compact_timetable('t1', timetable_document(entries))
+    assert stored['storage']['raw'].keys() == {'3', '7', '9'}
+    assert expand_timetable(stored)['timetable'] == entries
+
+
+def test_sharded_round_trip():
+    document = timetable_document(make_entries(n_courses=60))
+    stored, shards = compact_timetable('t1', copy.deepcopy(document), shard_bytes=0)
+    assert len(shards) == 5
+    assert 'columns' not in stored['storage']
+    assert stored['storage']['shards'] == [shard_id for shard_id, _ in shards]
+    assert expand_timetable(stored, [shard for _, shard in shards]) == document
+
+
+def test_saved_sharded_timetable_loads_its_shards(memory_db, monkeypatch):
+    monkeypatch.setattr('timetable_storage.SHARD_BYTES', 0)
+    document = timetable_document(make_entries(n_courses=60))
+    assert save_timetable('t1', copy.deepcopy(document))['success']
+    assert len(memory_db.collections[SHARD_COLLECTION]) == 5
+    assert load_timetable('t1') == {'success': True, 'data': document}
+
+
+def test_documents_saved_before_compact_storage_load_unchanged(memory_db):
+    document = timetable_document(make_entries(n_courses=4))
+    firebase_config.add_document('timetables', 't1', copy.deepcopy(document))
+    assert load_timetable('t1')['data'] == document
+
+
+def test_json_storage_mode(memory_db, monkeypatch):
+    monkeypatch.setenv('TIMETABLE_STORAGE', 'json')
+    document = timetable_document(make_entries(n_courses=4))
+    save_timetable('t1', copy.deepcopy(document))
+    assert 'storage' not in memory_db.collections['timetables']['t1']
+    assert load_timetable('t1')['data'] == document
+
+
+def test_missing_timetable(memory_db):
+    assert not load_timetable('nope')['success']
@@ -0,0 +1,135 @@
+import copy
+import threading
+
+import firebase_config
+import timetable_storage
+from conftest import make_entries
+from timetable_storage import load_timetable, DELTA_FORMAT, STORAGE_FORMAT
+from timetable_versions import save_version, list_versions, diff_timetables, series_id, SERIES_COLLECTION
+
+DAY_ORDER = {day: index for index, day in enumerate(('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'))}
+
+
+def version_data(entries):
+    return {
+        'program': 'B.Ed.',
+        'semester': 'Semester 1',
+        'timetable': entries,
+        'metadata': {'algorithm': 'incremental', 'total_sessions': len(entries)}
+    }
+
+
+def repair(entries, index, day, time):
+    """Move one session and re-sort by day and time like build_result"""
+    entries = copy.deepcopy(entries)
+    entries[index].update(day=day, time=time)
+    entries.sort(key=lambda e: (DAY_ORDER[e['day']], e['time']))
+    return entries
+
+
+def stored_format(timetable_id):
+    return firebase_config.get_document('timetables', timetable_id)['data']['storage']['format']
+
+
+def test_delta_version_loads_in_saved_order(memory_db):
+    base = make_entries()
+    save_version('v1', version_data(base))
+    repaired = repair(base, 0, 'Wednesday', '11:00-12:00')
+    result = save_version('v2', version_data(repaired))
+
+    assert result['success'] and result['version'] == 2 and result['parent_id'] == 'v1'
+    assert stored_format('v2') == DELTA_FORMAT
+    assert load_timetable('v2')['data']['timetable'] == repaired
+    assert load_timetable('v1')['data']['timetable'] == base
+
+
+def test_reordered_kept_entries_fall_back_to_snapshot(memory_db):
+    base = make_entries()
+    save_version('v1', version_data(base))
+    reordered = list(reversed(base))
+    save_version('v2', version_data(reordered))
+
+    assert stored_format('v2') == STORAGE_FORMAT
+    assert load_timetable('v2')['data']['timetable'] == reordered
+
+
+def test_chain_writes_snapshot_at_interval(memory_db, monkeypatch):
+    monkeypatch.setattr(timetable_storage, 'SNAPSHOT_INTERVAL', 4)
+    entries = make_entries()
+    saved = {}
+    for version in range(1, 10):
+        if version > 1:
+            entries = repair(entries, version, 'Friday', '12:00-13:00')
+        save_version(f'v{version}', version_data(entries))
+        saved[f'v{version}'] = entries
+
+    formats = [stored_format(f'v{version}') for version in range(1, 10)]
+    assert formats == [STORAGE_FORMAT, DELTA_FORMAT, DELTA_FORMAT, DELTA_FORMAT,
+                       STORAGE_FORMAT, DELTA_FORMAT, DELTA_FORMAT, DELTA_FORMAT, STORAGE_FORMAT]
+    for timetable_id, expected in saved.items():
+        assert load_timetable(timetable_id)['data']['timetable'] == expected
+    assert [doc['version'] for doc in list_versions('B.Ed.', 'Semester 1')['data']] == list(range(1, 10))
+
+
+def test_delta_without_positions_is_a_broken_chain(memory_db):
+    base = make_entries()
+    save_version('v1', version_data(base))
+    save_version('v2', version_data(repair(base, 0, 'Wednesday', '11:00-12:00')))
+    document = firebase_config.get_document('timetables', 'v2')['data']
+    document['storage'] = {key: value for key, value in document['storage'].items() if key != 'added_positions'}
+    firebase_config.add_document('timetables', 'v2', document)
+
+    assert not load_timetable('v2')['success']
+    result = save_version('v3', version_data(base))
+    assert result['success'] and result['parent_id'] == 'v2'
+    assert stored_format('v3') == STORAGE_FORMAT
+
+
+def test_diff_reports_moved_session(memory_db):
+    base = make_entries()
+    repaired = repair(base, 0, 'Wednesday', '11:00-12:00')
+    diff = diff_timetables(base, repaired)
+
+    assert diff['summary'] == {'unchanged': len(base) - 1, 'moved': 1, 'added': 0, 'removed': 0}
+    assert diff['moved'][0]['to']['day'] == 'Wednesday'
+
+
+def test_concurrent_saves_get_distinct_versions(sqlite_db):
+    entries = make_entries(n_courses=5)
+    results = {}
+
+    def save(index):
+        results[index] = save_version(f'v{index}', version_data(entries))
+
+    threads = [threading.Thread(target=save, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(result['success'] for result in results.values())
+    assert sorted(result['version'] for result in results.values()) == list(range(1, 9))
+    by_version = {result['version']: index for index, result in results.items()}
+    assert results[by_version[1]]['parent_id'] is None
+    for version in range(2, 9):
+        assert results[by_version[version]]['parent_id'] == f'v{by_version[version - 1]}'
+
+
+def test_sqlite_rejects_duplicate_version_and_save_retries(sqlite_db):
+    entries = make_entries(n_courses=5)
+    save_version('v1', version_data(entries))
+    duplicate = firebase_config.add_document('timetables', 'other', dict(version_data(entries), version=1))
+    assert not duplicate['success'] and duplicate['conflict']
+
+    # A counter behind the stored versions collides once, then moves on
+    firebase_config.add_document(SERIES_COLLECTION, series_id('B.Ed.', 'Semester 1'),
+                                 {'version': 0, 'latest_id': 'v1'})
+    result = save_version('v2', version_data(entries))
+    assert result['success'] and result['version'] == 2 and result['parent_id'] == 'v1'
+
+
+def test_counter_continues_series_saved_without_one(memory_db):
+    entries = make_entries(n_courses=5)
+    firebase_config.add_document('timetables', 'old', dict(version_data(entries), version=3))
+    result = save_version('new', version_data(entries))
+    assert result['version'] == 4 and result['parent_id'] == 'old'
@@ -0,0 +1,32 @@
+import app
+import firebase_config
+from data_loader import DataLoadError
+
+
+def seed():
+    firebase_config.add_documents_batch('courses', [
+        ('C1', {'name': 'Pedagogy', 'program': 'B.Ed.', 'credits': 2, 'type': 'theory', 'faculty_id': 'F1'}),
+        ('C2', {'name': 'Unstaffed', 'program': 'B.Ed.', 'credits': 2, 'type': 'theory'})
+    ])
+    firebase_config.add_document('faculty', 'F1', {'name': 'Faculty One'})
+    firebase_config.add_document('rooms', 'R1', {'room_number': '101', 'capacity': 40, 'type': 'classroom'})
+
+
+def test_course_without_faculty_is_a_warning(memory_db):
+    seed()
+    body = app.app.test_client().post('/api/validate-data', json={'program': 'B.Ed.'}).json
+    assert body['success'] and body['errors'] == []
+    assert "Course 'Unstaffed' has no assigned faculty" in body['warnings']
+    assert body['feasibility']['feasible']
+
+
+def test_failed_collections_are_reported_as_errors(memory_db, monkeypatch):
+    def failing_load(program):
+        raise DataLoadError({'courses': 'deadline exceeded', 'students': 'unavailable'})
+
+    monkeypatch.setattr(app, 'load_dataset', failing_load)
+    response = app.app.test_client().post('/api/validate-data', json={})
+    assert response.status_code == 200
+    assert response.json['success'] is False
+    assert response.json['errors'] == ['No courses found. Please add courses first.',
+                                       'Failed to fetch students: unavailable']
@@ -1,8 +1,98 @@
-from constraint import Problem, AllDifferentConstraint
 import random
+import time as _time
+from array import array
+from bisect import bisect_left
 from datetime import datetime
 import json
 
+import numpy as np
+from scipy import sparse
+
+from schema import DEFAULT_DAYS, DEFAULT_TIME_SLOTS, is_canonical, normalize_enrollment
+
+
+def popcount(mask):
+    """Number of set bits in a non-negative int bitset"""
+    return bin(mask).count('1')
+
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+
+
+def iter_bits(mask):
+    """Yield the indexes of the set bits of an int bitset, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class GenerationCancelled(Exception):
+    """Raised inside an engine when its cancel_event is set"""
+
+
+class ScheduleState:
+    """
+    Occupancy of one scheduling run, held as Python-int bitsets.
+
+    Slots and rooms are the generator's small integer codes. ``room_busy[slot]``
+    is a mask over rooms, while faculty and courses keep masks over slots, so
+    every availability or clash test is a single AND.
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.room_busy = [0] * generator.n_slots
+        self.faculty_busy = {}
+        self.course_busy = {}
+
+    def student_mask(self, course_id):
+        """Slots where students of this course already sit in another course"""
+        mask = 0
+        if self.generator.avoid_student_clashes:
+            for other in self.generator.course_conflicts.get(course_id, ()):
+                mask |= self.course_busy.get(other, 0)
+        return mask
+
+    def blocked_slots(self, plan):
+        """Slots a course session cannot use because of faculty, course or student clashes"""
+        mask = self.course_busy.get(plan['id'], 0) | self.student_mask(plan['id'])
+        if plan['faculty_id']:
+            mask |= self.faculty_busy.get(plan['faculty_id'], 0)
+        return mask
+
+    def free_rooms(self, plan, slot):
+        """Suitable rooms still free at a slot, as a room mask"""
+        return plan['room_mask'] & ~self.room_busy[slot]
+
+    def place(self, plan, slot, room):
+        bit = 1 << slot
+        self.room_busy[slot] |= 1 << room
+        self.course_busy[plan['id']] = self.course_busy.get(plan['id'], 0) | bit
+        if plan['faculty_id']:
+            self.faculty_busy[plan['faculty_id']] = self.faculty_busy.get(plan['faculty_id'], 0) | bit
+
+    def remove(self, plan, slot, room):
+        bit = 1 << slot
+        self.room_busy[slot] &= ~(1 << room)
+        self.course_busy[plan['id']] &= ~bit
+        if plan['faculty_id']:
+            self.faculty_busy[plan['faculty_id']] &= ~bit
+
+    def can_place(self, plan, slot, room):
+        return bool(plan['avail_mask'] >> slot & 1
+                    and not self.blocked_slots(plan) >> slot & 1
+                    and self.free_rooms(plan, slot) >> room & 1)
+
+    def copy(self):
+        state = ScheduleState(self.generator)
+        state.room_busy = list(self.room_busy)
+        state.faculty_busy = dict(self.faculty_busy)
+        state.course_busy = dict(self.course_busy)
+        return state
+
+
 class TimetableGenerator:
 
     def __init__(self, courses, faculty, rooms, students, program_config):
@@ -12,22 +102,68 @@ class TimetableGenerator:
         self.students = students or []
         self.program_config = program_config or {}
 
-        self.days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        self.time_slots = [
-            '09:00-10:00', '10:00-11:00', '11:00-12:00', '12:00-13:00',
-            '13:00-14:00', '14:00-15:00', '15:00-16:00', '16:00-17:00'
-        ]
+        self.days = self.program_config.get('days') or list(DEFAULT_DAYS)
+        self.time_slots = self.program_config.get('time_slots') or list(DEFAULT_TIME_SLOTS)
 
         self.timetable = []
         self.conflicts = []
 
+        # Wall-clock budget (seconds) for the CSP search before falling back to greedy
+        self.time_limit = float(self.program_config.get('time_limit', 10))
+        # Students enrolled in two courses must not have them in the same slot
+        self.avoid_student_clashes = bool(self.program_config.get('avoid_student_clashes', True))
+        # Source of all randomness (greedy slot order, randomized CSP tie-breaks); seedable
+        self.rng = random.Random(self.program_config.get('seed'))
+
+        # Optional hooks for background jobs: progress_callback(**fields) and a
+        # threading.Event checked periodically by the engines
+        self.progress_callback = None
+        self.cancel_event = None
+
+        self.build_slot_grid()
+        self.build_indexes()
+
+    def report_progress(self, **fields):
+        if self.progress_callback:
+            self.progress_callback(**fields)
+
+    def check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise GenerationCancelled()
+
     def to_int(self, v, default=0):
         """Safe int conversion"""
+        if type(v) is int:
+            return v
         try:
             return int(v)
         except Exception:
             return default
 
+    def build_slot_grid(self):
+        """
+        Encode the day x period grid as small ints: slot = day * periods + period.
+
+        Day/time strings only appear at the boundaries (parsing availability and
+        building output entries); the engines work on slot codes and bitsets.
+        """
+        self.n_days = len(self.days)
+        self.n_periods = len(self.time_slots)
+        self.n_slots = self.n_days * self.n_periods
+        self.all_slots_mask = (1 << self.n_slots) - 1
+        self.slot_keys = self.generate_time_slot_combinations()
+        self.slot_index = {key: slot for slot, key in enumerate(self.slot_keys)}
+        # Normalized faculty records carry availability_mask over this grid
+        self.default_grid = tuple(self.days) == DEFAULT_DAYS and tuple(self.time_slots) == DEFAULT_TIME_SLOTS
+
+    def slot_label(self, slot):
+        """Day and time strings of a slot code"""
+        day, period = divmod(slot, self.n_periods)
+        return self.days[day], self.time_slots[period]
+
+    def slot_day(self, slot):
+        return slot // self.n_periods
+
     def generate_time_slot_combinations(self):
         """Generate all possible day-time combinations"""
         slots = []
@@ -36,31 +172,117 @@ class TimetableGenerator:
                 slots.append(f"{day}_{time}")
         return slots
 
-    def check_faculty_availability(self, faculty_id, day, time):
-        """Check if faculty is available at given day and time"""
-        faculty = next((f for f in self.faculty if str(f.get('id')) == str(faculty_id)), None)
-        if not faculty:
-            return False
+    def build_indexes(self):
+        """Build id -> record indexes and parsed availability once per generator"""
+        self.faculty_by_id = {str(f.get('id')): f for f in self.faculty}
+        self.rooms_by_id = {str(r.get('id')): r for r in self.rooms}
+
+        # Slot mask per faculty member; unrestricted availability is the full grid
+        self.faculty_avail_mask = {}
+        self.faculty_unrestricted = set()
+        for fid, f in self.faculty_by_id.items():
+            if self.default_grid and is_canonical(f) and 'availability_mask' in f:
+                self.faculty_avail_mask[fid] = f['availability_mask']
+                continue
+            slots = self.parse_availability(f.get('availability'))
+            if slots is None:
+                self.faculty_avail_mask[fid] = self.all_slots_mask
+                self.faculty_unrestricted.add(fid)
+            else:
+                mask = 0
+                for key in slots:
+                    if key in self.slot_index:
+                        mask |= 1 << self.slot_index[key]
+                self.faculty_avail_mask[fid] = mask
 
-        avail = faculty.get('availability')
+        # Rooms are coded by capacity order, so the lowest set bit of a room mask
+        # is always the smallest (best-fitting) room
+        self.room_list = sorted(self.rooms, key=lambda r: self.to_int(r.get('capacity', 0), 0))
+        self.room_code = {str(r.get('id')): code for code, r in enumerate(self.room_list)}
+        self.n_rooms = len(self.room_list)
+        self.all_rooms_mask = (1 << self.n_rooms) - 1
+
+        # Rooms grouped by lower-cased type, sorted by capacity for bisecting
+        self.rooms_by_type = {}
+        for room in self.room_list:
+            room_type = str(room.get('type', 'classroom')).lower()
+            self.rooms_by_type.setdefault(room_type, []).append(room)
+        self.room_capacities_by_type = {
+            room_type: [self.to_int(r.get('capacity', 0), 0) for r in rooms]
+            for room_type, rooms in self.rooms_by_type.items()
+        }
+        self.suitable_rooms_cache = {}
+
+        self.build_enrollment_index()
+
+    def parse_availability(self, avail):
+        """Parse a faculty availability (dict or comma string) into a set of slot keys"""
         if not avail:
-            return True  
+            return None
 
-        
         if isinstance(avail, dict):
-            day_availability = avail.get(day, [])
-            return time in day_availability
+            slots = set()
+            for day, times in avail.items():
+                if isinstance(times, str):
+                    times = [t.strip() for t in times.split(',') if t.strip()]
+                for time in times or []:
+                    slots.add(f"{day}_{time}")
+            return slots
 
-        
         if isinstance(avail, str):
-            tokens = [t.strip() for t in avail.split(',') if t.strip()]
-            key = f"{day}_{time}"
-            return key in tokens
-        return True
+            return {t.strip() for t in avail.split(',') if t.strip()}
+        return None
+
+    def build_enrollment_index(self):
+        """
+        Invert students -> courses into course -> students in one pass.
+
+        Students are integer-coded by their position in ``self.student_ids`` and
+        each course keeps an ``array('i')`` of those codes, so the index stays
+        compact even for tens of thousands of students. The same pass collects
+        the course clash graph (courses sharing at least one student).
+        """
+        self.student_ids = []
+        self.course_students = {}
+        self.course_conflicts = {}
+
+        for code, student in enumerate(self.students):
+            self.student_ids.append(str(student.get('id', code)))
+            if is_canonical(student):
+                enrolled = student.get('enrolled_courses', [])
+            else:
+                enrolled = self.parse_enrolled_courses(student.get('enrolled_courses', []))
+            for course_id in enrolled:
+                members = self.course_students.get(course_id)
+                if members is None:
+                    members = self.course_students[course_id] = array('i')
+                members.append(code)
+                if len(enrolled) > 1:
+                    self.course_conflicts.setdefault(course_id, set()).update(enrolled)
+
+        for course_id, others in self.course_conflicts.items():
+            others.discard(course_id)
+
+        self.enrollment_counts = {cid: len(members) for cid, members in self.course_students.items()}
+
+    def parse_enrolled_courses(self, enrolled):
+        """Parse a student's enrolled courses (list, comma or semicolon string) into unique course ids"""
+        return set(normalize_enrollment(enrolled))
+
+    def check_faculty_availability(self, faculty_id, day, time):
+        """Check if faculty is available at given day and time"""
+        fid = str(faculty_id)
+        if fid not in self.faculty_avail_mask:
+            return False
+
+        slot = self.slot_index.get(f"{day}_{time}")
+        if slot is None:
+            return fid in self.faculty_unrestricted
+        return bool(self.faculty_avail_mask[fid] >> slot & 1)
 
     def check_room_capacity(self, room_id, required_capacity):
         """Check if room has sufficient capacity"""
-        room = next((r for r in self.rooms if str(r.get('id')) == str(room_id)), None)
+        room = self.rooms_by_id.get(str(room_id))
         if not room:
             return False
         cap = self.to_int(room.get('capacity', 0), 0)
@@ -68,110 +290,517 @@ class TimetableGenerator:
 
     def check_room_type(self, room_id, required_type):
         """Check if room type matches requirement (lab/classroom)"""
-        room = next((r for r in self.rooms if str(r.get('id')) == str(room_id)), None)
+        room = self.rooms_by_id.get(str(room_id))
         if not room:
             return False
         return str(room.get('type', 'classroom')).lower() == str(required_type or 'classroom').lower()
 
+    def get_suitable_rooms(self, required_type, required_capacity):
+        """Rooms of the required type with enough capacity, smallest first (cached)"""
+        return self.get_suitable_room_set(required_type, required_capacity)[0]
+
+    def get_suitable_room_mask(self, required_type, required_capacity):
+        """Same as ``get_suitable_rooms`` but as a mask over room codes"""
+        return self.get_suitable_room_set(required_type, required_capacity)[1]
+
+    def get_suitable_room_set(self, required_type, required_capacity):
+        key = (str(required_type or 'classroom').lower(), self.to_int(required_capacity, 0))
+        cached = self.suitable_rooms_cache.get(key)
+        if cached is None:
+            candidates = self.rooms_by_type.get(key[0], [])
+            start = bisect_left(self.room_capacities_by_type.get(key[0], []), key[1])
+            rooms = candidates[start:]
+            mask = 0
+            for room in rooms:
+                mask |= 1 << self.room_code[str(room.get('id'))]
+            cached = self.suitable_rooms_cache[key] = (rooms, mask)
+        return cached
+
     def calculate_enrolled_students(self, course_id):
         """Calculate number of students enrolled in a course"""
-        count = 0
-        for student in self.students:
-            enrolled = student.get('enrolled_courses', [])
-
-            if isinstance(enrolled, str):
-                try:
-                    enrolled_list = [s.strip() for s in enrolled.split(',') if s.strip()]
-                except Exception:
-                    enrolled_list = []
-            else:
-                enrolled_list = enrolled or []
+        return max(self.enrollment_counts.get(str(course_id), 0), 1)
+
+    def get_course_students(self, course_id):
+        """Integer codes of the students enrolled in a course (see ``student_ids``)"""
+        return self.course_students.get(str(course_id), array('i'))
+
+    def build_course_plans(self):
+        """
+        Per-course scheduling data in slot/room codes: sessions needed, the
+        faculty availability mask and the mask of suitable rooms.
+        """
+        plans = []
+        for course in self.courses:
+            credits = self.to_int(course.get('credits', 3), 3)
+            faculty_id = course.get('faculty_id')
+            fid = str(faculty_id) if faculty_id else None
+            enrolled_count = self.calculate_enrolled_students(course.get('id'))
 
-            if course_id in enrolled_list:
-                count += 1
+            room_mask = self.get_suitable_room_mask(course.get('type', 'theory'), enrolled_count)
+            if not room_mask:
+                room_mask = self.all_rooms_mask
 
-        return max(count, 1)
+            plans.append({
+                'course': course,
+                'id': str(course.get('id')),
+                'faculty_id': fid,
+                'sessions': max(1, credits),
+                'enrolled': enrolled_count,
+                'avail_mask': self.faculty_avail_mask.get(fid, 0) if fid else 0,
+                'room_mask': room_mask
+            })
+        return plans
 
     # ---------- Greedy fallback ----------
     def generate_simple_timetable(self):
         """
         Fallback: Simple greedy algorithm for timetable generation
         """
-        timetable_entries = []
-        used_slots = set()
-        faculty_schedule = {}
+        placements = self.greedy_placements(self.build_course_plans())
+        return self.build_result(self.placements_to_entries(placements), 'greedy')
 
-        all_slots = self.generate_time_slot_combinations()
-        random.shuffle(all_slots)
+    def greedy_placements(self, plans, state=None, rng=None, counts=None):
+        """
+        Greedy pass over course plans; returns (plan, slot, room) placements.
 
-        for course in self.courses:
-            credits = self.to_int(course.get('credits', 3), 3)
-            sessions_needed = max(1, credits)
-            faculty_id = course.get('faculty_id')
-            course_type = course.get('type', 'theory')
-            enrolled_count = self.calculate_enrolled_students(course.get('id'))
+        ``state`` may carry pinned occupancy and ``counts`` (course id -> sessions)
+        limits how many sessions of each plan are placed.
+        """
+        state = state or ScheduleState(self)
+        placements = []
 
-            suitable_rooms = [r for r in self.rooms
-                              if self.check_room_type(r.get('id'), course_type)
-                              and self.check_room_capacity(r.get('id'), enrolled_count)]
-            if not suitable_rooms:
-                suitable_rooms = self.rooms[:]  
+        all_slots = list(range(self.n_slots))
+        (rng or self.rng).shuffle(all_slots)
 
+        for plan in plans:
+            self.check_cancelled()
+            self.report_progress(phase='solving', sessions_placed=len(placements))
+            sessions_needed = plan['sessions'] if counts is None else counts.get(plan['id'], 0)
             sessions_scheduled = 0
+            blocked = state.blocked_slots(plan)
+
             for slot in all_slots:
                 if sessions_scheduled >= sessions_needed:
                     break
-                day, time = slot.split('_', 1)
+                bit = 1 << slot
+                if not plan['avail_mask'] & bit or blocked & bit:
+                    continue
 
-                if not self.check_faculty_availability(faculty_id, day, time):
+                free = state.free_rooms(plan, slot)
+                if not free:
                     continue
 
-                if faculty_id:
-                    if slot in faculty_schedule.get(str(faculty_id), []):
-                        continue
-
-                room_found = None
-                for room in suitable_rooms:
-                    key = f"{slot}_{room.get('id')}"
-                    if key not in used_slots:
-                        room_found = room
-                        used_slots.add(key)
-                        break
-
-                if room_found:
-                    faculty = next((f for f in self.faculty if str(f.get('id')) == str(faculty_id)), {})
-                    entry = {
-                        'course_id': course.get('id'),
-                        'course_name': course.get('name'),
-                        'course_code': course.get('code'),
-                        'faculty_name': faculty.get('name', 'TBA'),
-                        'faculty_id': faculty_id,
-                        'room_number': room_found.get('number', room_found.get('id')),
-                        'room_type': room_found.get('type', 'classroom'),
-                        'day': day,
-                        'time': time,
-                        'type': course_type,
-                        'credits': credits
-                    }
-                    timetable_entries.append(entry)
-                    faculty_schedule.setdefault(str(faculty_id), []).append(slot)
-                    sessions_scheduled += 1
+                room = (free & -free).bit_length() - 1
+                state.place(plan, slot, room)
+                placements.append((plan, slot, room))
+                blocked |= bit
+                sessions_scheduled += 1
+
+        return placements
+
+    # ---------- Shared result helpers ----------
+    def build_entry(self, course, faculty, room, day, time):
+        """Build one output timetable entry"""
+        return {
+            'course_id': course.get('id'),
+            'course_name': course.get('name'),
+            'course_code': course.get('code'),
+            'faculty_name': (faculty or {}).get('name', 'TBA'),
+            'faculty_id': course.get('faculty_id'),
+            'room_number': room.get('number', room.get('id')),
+            'room_type': room.get('type', 'classroom'),
+            'day': day,
+            'time': time,
+            'type': course.get('type', 'theory'),
+            'credits': self.to_int(course.get('credits', 3), 3)
+        }
+
+    def placements_to_entries(self, placements):
+        """Convert (plan, slot, room) codes back to output entries"""
+        entries = []
+        for plan, slot, room in placements:
+            day, time = self.slot_label(slot)
+            entries.append(self.build_entry(
+                plan['course'], self.faculty_by_id.get(plan['faculty_id']), self.room_list[room], day, time
+            ))
+        return entries
 
+    def build_result(self, timetable_entries, algorithm, extra_metadata=None):
+        """Sort entries by day/time and wrap them in the API result shape"""
         day_order = {day: i for i, day in enumerate(self.days)}
         timetable_entries.sort(key=lambda x: (day_order.get(x['day'], 999), x['time']))
 
+        metadata = {
+            'total_courses': len(self.courses),
+            'total_sessions': len(timetable_entries),
+            'generated_at': datetime.now().isoformat(),
+            'algorithm': algorithm,
+            'program': self.program_config.get('name', 'General'),
+            'semester': self.program_config.get('semester', 'Current')
+        }
+        metadata.update(extra_metadata or {})
+
         return {
             'success': True,
             'timetable': timetable_entries,
-            'metadata': {
-                'total_courses': len(self.courses),
-                'generated_at': datetime.now().isoformat(),
-                'algorithm': 'greedy',
-                'program': self.program_config.get('name', 'General'),
-                'semester': self.program_config.get('semester', 'Current')
-            }
+            'metadata': metadata
+        }
+
+    # ---------- CSP solver ----------
+    def build_csp_variables(self, sessions=None, pinned=None):
+        """
+        Expand courses into one variable per session.
+
+        A value is the int ``slot * n_rooms + room`` and each domain is a
+        bitset over those values that already satisfies faculty availability,
+        room type and room capacity, so the search only has to deal with the
+        pairwise faculty/room/course/student clashes.
+
+        ``sessions`` is a list of (plan, count) to schedule (all sessions of all
+        courses by default); ``pinned`` is a ScheduleState whose occupancy is
+        removed from the domains up front.
+        """
+        if sessions is None:
+            sessions = [(plan, plan['sessions']) for plan in self.build_course_plans()]
+
+        variables = []
+        for plan, count in sessions:
+            avail = plan['avail_mask']
+            if pinned is not None:
+                avail &= ~pinned.blocked_slots(plan)
+
+            domain = 0
+            for slot in iter_bits(avail):
+                rooms = plan['room_mask'] if pinned is None else pinned.free_rooms(plan, slot)
+                domain |= rooms << (slot * self.n_rooms)
+
+            for index in range(count):
+                variables.append({'plan': plan, 'session': index, 'domain': domain})
+
+        return variables
+
+    def generate_timetable_csp(self, time_limit=None, randomize=False):
+        """
+        Constraint satisfaction search over course sessions.
+
+        Falls back to the greedy generator when the budget runs out or the
+        search proves the instance infeasible.
+        """
+        csp = self.solve_csp(time_limit, randomize=randomize)
+        stats = {
+            'csp_status': csp['status'],
+            'csp_backtracks': csp['backtracks'],
+            'csp_time': csp['elapsed']
         }
 
+        if csp['status'] != 'solved':
+            result = self.generate_simple_timetable()
+            result['metadata'].update(stats, fallback_from='csp')
+            return result
+
+        stats['unscheduled_sessions'] = csp['unscheduled_sessions']
+        return self.build_result(self.placements_to_entries(csp['placements']), 'csp', stats)
+
+    def solve_csp(self, time_limit=None, randomize=False, sessions=None, pinned=None):
+        """
+        Variables are sessions, values are (slot, room) pairs. Uses MRV with a
+        degree tie-break for variable ordering, forward checking after every
+        assignment and a wall-clock budget. ``randomize`` breaks value ties in
+        a ``self.rng``-shuffled slot order instead of grid order; ``sessions``
+        and ``pinned`` restrict the search as in ``build_csp_variables``.
+
+        Returns the search status ('solved', 'timeout' or 'infeasible') and,
+        when solved, the (plan, slot, room) placements.
+        """
+        started = _time.perf_counter()
+        time_limit = self.time_limit if time_limit is None else float(time_limit)
+        deadline = started + time_limit
+        n_rooms = self.n_rooms
+
+        variables = self.build_csp_variables(sessions, pinned)
+        unschedulable = [v for v in variables if not v['domain']]
+        variables = [v for v in variables if v['domain']]
+        n = len(variables)
+
+        # Sessions sharing a faculty member, a course or students may never share a slot
+        by_resource = {}
+        for i, var in enumerate(variables):
+            plan = var['plan']
+            if plan['faculty_id']:
+                by_resource.setdefault(('faculty', plan['faculty_id']), []).append(i)
+            by_resource.setdefault(('course', plan['id']), []).append(i)
+        neighbours = [set() for _ in range(n)]
+        for members in by_resource.values():
+            for i in members:
+                neighbours[i].update(members)
+        if self.avoid_student_clashes:
+            for i, var in enumerate(variables):
+                for other in self.course_conflicts.get(var['plan']['id'], ()):
+                    neighbours[i].update(by_resource.get(('course', other), ()))
+        for i in range(n):
+            neighbours[i].discard(i)
+
+        # Sessions that could use a given room compete for its (slot, room) values
+        room_users = [[] for _ in range(n_rooms)]
+        for i, var in enumerate(variables):
+            for room in iter_bits(var['plan']['room_mask']):
+                room_users[room].append(i)
+
+        # All values of one slot form a contiguous block of n_rooms bits
+        slot_blocks = [self.all_rooms_mask << (slot * n_rooms) for slot in range(self.n_slots)]
+
+        domains = [var['domain'] for var in variables]
+        sizes = [popcount(d) for d in domains]
+        degree = [len(nb) for nb in neighbours]
+
+        assignment = {}
+        unassigned = set(range(n))
+        course_days = {}
+
+        def select_variable():
+            # MRV, ties broken by the most constraining (highest degree) variable
+            return min(unassigned, key=lambda i: (sizes[i], -degree[i]))
+
+        slot_rank = list(range(self.n_slots))
+        if randomize:
+            self.rng.shuffle(slot_rank)
+
+        def ordered_values(i):
+            days_used = course_days.get(variables[i]['plan']['id'], {})
+            return sorted(iter_bits(domains[i]), key=lambda value: (
+                days_used.get(self.slot_day(value // n_rooms), 0),
+                value % n_rooms,
+                slot_rank[value // n_rooms]
+            ))
+
+        def assign(i, value):
+            """Assign and forward check; returns the removal trail or None on wipe-out"""
+            slot, room = divmod(value, n_rooms)
+            trail = []
+            ok = True
+
+            bit = 1 << value
+            for j in room_users[room]:
+                if j != i and j in unassigned and domains[j] & bit:
+                    trail.append((j, domains[j], sizes[j]))
+                    domains[j] ^= bit
+                    sizes[j] -= 1
+                    if not sizes[j]:
+                        ok = False
+
+            shift = slot * n_rooms
+            clear_slot = ~slot_blocks[slot]
+            for j in neighbours[i]:
+                if j not in unassigned:
+                    continue
+                removed = (domains[j] >> shift) & self.all_rooms_mask
+                if removed:
+                    trail.append((j, domains[j], sizes[j]))
+                    domains[j] &= clear_slot
+                    sizes[j] -= popcount(removed)
+                    if not sizes[j]:
+                        ok = False
+
+            if not ok:
+                undo(trail)
+                return None
+
+            assignment[i] = value
+            unassigned.discard(i)
+            days_used = course_days.setdefault(variables[i]['plan']['id'], {})
+            day = self.slot_day(slot)
+            days_used[day] = days_used.get(day, 0) + 1
+            return trail
+
+        def unassign(i):
+            value = assignment.pop(i)
+            unassigned.add(i)
+            course_days[variables[i]['plan']['id']][self.slot_day(value // n_rooms)] -= 1
+
+        def undo(trail):
+            for j, old, size in reversed(trail):
+                domains[j] = old
+                sizes[j] = size
+
+        # Iterative backtracking: each frame is [variable, values, next index, trail]
+        status = 'solved'
+        backtracks = 0
+        iterations = 0
+        frames = []
+        if unassigned:
+            first = select_variable()
+            frames.append([first, ordered_values(first), 0, None])
+
+        while frames:
+            frame = frames[-1]
+            var_index, values, position, trail = frame
+
+            if trail is not None:
+                unassign(var_index)
+                undo(trail)
+                frame[3] = None
+
+            if _time.perf_counter() > deadline:
+                status = 'timeout'
+                break
+            if iterations % 256 == 0:
+                self.check_cancelled()
+                self.report_progress(phase='solving', sessions_placed=len(assignment))
+            iterations += 1
+
+            if position >= len(values):
+                frames.pop()
+                backtracks += 1
+                continue
+
+            frame[2] = position + 1
+            trail = assign(var_index, values[position])
+            if trail is None:
+                continue
+            frame[3] = trail
+
+            if not unassigned:
+                break
+
+            nxt = select_variable()
+            frames.append([nxt, ordered_values(nxt), 0, None])
+
+        if n and not frames:
+            status = 'infeasible'
+
+        elapsed = round(_time.perf_counter() - started, 4)
+        placements = []
+        if status == 'solved':
+            placements = [(variables[i]['plan'],) + divmod(value, n_rooms) for i, value in assignment.items()]
+
+        return {
+            'status': status,
+            'placements': placements,
+            'backtracks': backtracks,
+            'elapsed': elapsed,
+            'unscheduled_sessions': len(unschedulable)
+        }
+
+    # ---------- Incremental repair ----------
+    def entries_to_placements(self, timetable_entries, plans):
+        """
+        Map stored output entries back onto (plan, slot, room) codes.
+
+        Returns the placements and the entries that no longer map (unknown
+        course, slot outside the grid or unknown room) in two lists.
+        """
+        plans_by_id = {plan['id']: plan for plan in plans}
+        room_by_label = {}
+        for code, room in enumerate(self.room_list):
+            room_by_label.setdefault(str(room.get('number', room.get('id'))), code)
+            room_by_label.setdefault(str(room.get('id')), code)
+
+        placements, unmapped = [], []
+        for entry in timetable_entries:
+            plan = plans_by_id.get(str(entry.get('course_id')))
+            slot = self.slot_index.get(f"{entry.get('day')}_{entry.get('time')}")
+            room = room_by_label.get(str(entry.get('room_number')))
+            if plan is None or slot is None or room is None:
+                unmapped.append(entry)
+            else:
+                placements.append((plan, slot, room))
+        return placements, unmapped
+
+    def repair_timetable(self, timetable_entries, changed=None, time_limit=None, max_rounds=2):
+        """
+        Re-solve only what a data change invalidates, keeping everything else pinned.
+
+        ``changed`` lists the ids of changed entities: {"courses": [...],
+        "faculty": [...], "rooms": [...]}. Sessions of changed courses are
+        always re-placed; sessions of changed faculty or rooms only when they now
+        break availability, type or capacity. Every other session stays where
+        it is unless it clashes with an earlier pinned one. When some sessions
+        still cannot be placed, their conflict neighbourhood (same faculty or
+        shared students) is unpinned and the sub-problem is solved again.
+        """
+        started = _time.perf_counter()
+        changed = changed or {}
+        changed_courses = {str(c) for c in changed.get('courses', [])}
+        changed_faculty = {str(f) for f in changed.get('faculty', [])}
+        changed_rooms = {str(r) for r in changed.get('rooms', [])}
+
+        plans = self.build_course_plans()
+        existing, unmapped = self.entries_to_placements(timetable_entries, plans)
+
+        state = ScheduleState(self)
+        pinned = []
+        unassigned = len(unmapped)
+        placed_count = {}
+        for plan, slot, room in existing:
+            room_id = str(self.room_list[room].get('id'))
+            affected = (
+                plan['id'] in changed_courses
+                or (plan['faculty_id'] in changed_faculty and not plan['avail_mask'] >> slot & 1)
+                or (room_id in changed_rooms and not plan['room_mask'] >> room & 1)
+                or placed_count.get(plan['id'], 0) >= plan['sessions']
+                or not state.can_place(plan, slot, room)
+            )
+            if affected:
+                unassigned += 1
+                continue
+            state.place(plan, slot, room)
+            pinned.append((plan, slot, room))
+            placed_count[plan['id']] = placed_count.get(plan['id'], 0) + 1
+
+        budget = self.time_limit if time_limit is None else float(time_limit)
+        solved, rounds, statuses = [], 0, []
+        while True:
+            rounds += 1
+            needs = {plan['id']: plan['sessions'] - placed_count.get(plan['id'], 0) for plan in plans}
+            todo = [(plan, needs[plan['id']]) for plan in plans if needs[plan['id']] > 0]
+            if not todo:
+                break
+
+            csp = self.solve_csp(budget, sessions=todo, pinned=state)
+            statuses.append(csp['status'])
+            if csp['status'] == 'solved':
+                new = csp['placements']
+            else:
+                new = self.greedy_placements([plan for plan, _ in todo], state.copy(), counts=needs)
+
+            for plan, slot, room in new:
+                state.place(plan, slot, room)
+                placed_count[plan['id']] = placed_count.get(plan['id'], 0) + 1
+            solved.extend(new)
+
+            missing = {plan['id'] for plan in plans if placed_count.get(plan['id'], 0) < plan['sessions']}
+            if not missing or rounds >= max_rounds:
+                break
+
+            # Unpin the conflict neighbourhood of whatever is still missing and retry
+            missing_faculty = {plan['faculty_id'] for plan in plans if plan['id'] in missing and plan['faculty_id']}
+            neighbourhood = set()
+            for course_id in missing:
+                neighbourhood.update(self.course_conflicts.get(course_id, ()))
+            released = [p for p in pinned if p[0]['faculty_id'] in missing_faculty or p[0]['id'] in neighbourhood]
+            if not released:
+                break
+            for plan, slot, room in released:
+                state.remove(plan, slot, room)
+                placed_count[plan['id']] -= 1
+            released_set = set(map(id, released))
+            pinned = [p for p in pinned if id(p) not in released_set]
+            unassigned += len(released)
+
+        placements = pinned + solved
+        unscheduled = sum(plan['sessions'] for plan in plans) - len(placements)
+        return self.build_result(self.placements_to_entries(placements), 'incremental', {
+            'repair': {
+                'pinned': len(pinned),
+                'unassigned': unassigned,
+                're_solved': len(solved),
+                'unscheduled_sessions': unscheduled,
+                'rounds': rounds,
+                'csp_status': statuses,
+                'repair_time': round(_time.perf_counter() - started, 4)
+            }
+        })
+
     def validate_timetable(self, timetable_entries):
         conflicts = []
 
@@ -201,7 +830,96 @@ class TimetableGenerator:
                 })
             room_slots[key] = entry.get('course_name')
 
+        student_clashes = self.find_student_clashes(timetable_entries)
+        conflicts.extend(student_clashes['conflicts'])
+
         return {
             'is_valid': len(conflicts) == 0,
-            'conflicts': conflicts
+            'conflicts': conflicts,
+            'student_clashes': student_clashes['summary']
         }
+
+    def find_student_clashes(self, timetable_entries):
+        """
+        Detect courses sharing students that meet in the same slot.
+
+        With E the sparse student x course enrollment matrix and A the
+        course x slot session-count matrix, ``(E^T E) .* (A A^T)`` holds, for
+        every course pair, shared students x coinciding sessions. The whole
+        check is a couple of sparse products instead of a pairwise loop.
+        """
+        summary = {'course_pairs': 0, 'total_clashes': 0, 'students_affected': 0}
+        course_ids = sorted({str(e.get('course_id')) for e in timetable_entries})
+        if not course_ids or not self.student_ids:
+            return {'conflicts': [], 'summary': summary}
+
+        course_col = {cid: j for j, cid in enumerate(course_ids)}
+        course_names = {}
+        slot_codes = dict(self.slot_index)
+        slot_labels = {code: (key.split('_', 1)) for key, code in slot_codes.items()}
+        entry_rows, entry_slots = [], []
+        for entry in timetable_entries:
+            key = f"{entry.get('day')}_{entry.get('time')}"
+            if key not in slot_codes:
+                slot_codes[key] = len(slot_codes)
+                slot_labels[slot_codes[key]] = [entry.get('day'), entry.get('time')]
+            cid = str(entry.get('course_id'))
+            course_names.setdefault(cid, entry.get('course_name'))
+            entry_rows.append(course_col[cid])
+            entry_slots.append(slot_codes[key])
+
+        n_courses, n_slots, n_students = len(course_ids), len(slot_codes), len(self.student_ids)
+        A = sparse.csr_matrix(
+            (np.ones(len(entry_rows), dtype=np.int32), (entry_rows, entry_slots)),
+            shape=(n_courses, n_slots)
+        )
+
+        student_codes, student_cols = [], []
+        for cid, j in course_col.items():
+            members = self.course_students.get(cid)
+            if members:
+                student_codes.append(np.frombuffer(members, dtype=np.intc))
+                student_cols.append(np.full(len(members), j, dtype=np.intc))
+        if not student_codes:
+            return {'conflicts': [], 'summary': summary}
+        student_codes = np.concatenate(student_codes)
+        student_cols = np.concatenate(student_cols)
+        E = sparse.csr_matrix(
+            (np.ones(len(student_codes), dtype=np.int32), (student_codes, student_cols)),
+            shape=(n_students, n_courses)
+        )
+
+        shared_students = (E.T @ E).tocsr()
+        shared_slots = (A @ A.T).tocsr()
+        clashes = sparse.triu(shared_students.multiply(shared_slots), k=1).tocoo()
+
+        keep = clashes.data > 0
+        first, second, counts = clashes.row[keep], clashes.col[keep], clashes.data[keep]
+        shared = np.asarray(shared_students[first, second]).ravel()
+        # Row p of `common` holds the slots where both courses of pair p meet
+        common = A[first].multiply(A[second]).tocsr()
+        common.sort_indices()
+
+        conflicts = []
+        for p in range(len(counts)):
+            i, j = first[p], second[p]
+            slots = common.indices[common.indptr[p]:common.indptr[p + 1]]
+            conflicts.append({
+                'type': 'student_clash',
+                'courses': [course_names[course_ids[i]], course_names[course_ids[j]]],
+                'course_ids': [course_ids[i], course_ids[j]],
+                'shared_students': int(shared[p]),
+                'slots': [{'day': slot_labels[s][0], 'time': slot_labels[s][1]} for s in slots],
+                'clash_count': int(counts[p])
+            })
+
+        # Student x slot load: any cell above one is a student sitting in two places
+        load = (E @ A).tocsr()
+        overloaded = load.data > 1
+        summary['course_pairs'] = len(conflicts)
+        summary['total_clashes'] = int(counts.sum())
+        summary['students_affected'] = int(np.unique(
+            np.repeat(np.arange(n_students), np.diff(load.indptr))[overloaded]
+        ).size)
+
+        return {'conflicts': conflicts, 'summary': summary}
@@ -0,0 +1,366 @@
+import base64
+import json
+import os
+import sys
+from array import array
+
+from firebase_config import add_document, add_documents_batch, get_document, BATCH_LIMIT
+
+
+STORAGE_FORMAT = 'columnar-v1'
+DELTA_FORMAT = 'delta-v1'
+SHARD_COLLECTION = 'timetable_shards'
+
+# Entry fields, grouped by the table they are dictionary-encoded into.
+# Everything about a course (incl. its faculty) repeats on every session, so
+# one course-table row replaces seven strings per entry.
+FIELD_GROUPS = (
+    ('course', ('course_id', 'course_name', 'course_code', 'faculty_id', 'faculty_name', 'type', 'credits')),
+    ('room', ('room_number', 'room_type')),
+    ('day', ('day',)),
+    ('time', ('time',))
+)
+ENTRY_FIELDS = frozenset(field for _, fields in FIELD_GROUPS for field in fields)
+
+# Encoded payloads above this size are split into one shard document per day
+SHARD_BYTES = int(os.getenv('TIMETABLE_SHARD_BYTES', 256 * 1024))
+
+# A version is stored as a delta against its parent unless the chain back to
+# the last full snapshot would get this long, or the delta is not smaller than
+# this share of a full snapshot
+SNAPSHOT_INTERVAL = int(os.getenv('TIMETABLE_SNAPSHOT_INTERVAL', 10))
+DELTA_MAX_RATIO = 0.5
+
+
+# ---------- Code packing ----------
+
+def pack_codes(codes):
+    """Pack non-negative ints as a typecode + base64 string (2 or 4 bytes per code)"""
+    typecode = 'H' if not codes or max(codes) < 65536 else 'I'
+    packed = array(typecode, codes)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return typecode + base64.b64encode(packed.tobytes()).decode('ascii')
+
+
+def unpack_codes(text):
+    packed = array(text[0])
+    packed.frombytes(base64.b64decode(text[1:]))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tolist()
+
+
+# ---------- Encoding ----------
+
+def encode_entries(entries):
+    """
+    Dictionary-encode timetable entries into shared tables plus int columns.
+
+    Returns (tables, codes, raw): ``tables`` maps group -> field -> distinct
+    values, ``codes`` is a list of (position, {group: code}) for encoded
+    entries and ``raw`` keeps entries with extra/missing fields verbatim.
+    """
+    lookups = {group: {} for group, _ in FIELD_GROUPS}
+    tables = {group: {field: [] for field in fields} for group, fields in FIELD_GROUPS}
+    codes = []
+    raw = {}
+
+    for position, entry in enumerate(entries):
+        if entry.keys() != ENTRY_FIELDS:
+            raw[str(position)] = entry
+            continue
+        try:
+            row_codes = {}
+            for group, fields in FIELD_GROUPS:
+                key = tuple(entry[field] for field in fields)
+                code = lookups[group].get(key)
+                if code is None:
+                    code = lookups[group][key] = len(lookups[group])
+                    for field, value in zip(fields, key):
+                        tables[group][field].append(value)
+                row_codes[group] = code
+        except TypeError:
+            # Unhashable values (lists, maps) are kept as they are
+            raw[str(position)] = entry
+            continue
+        codes.append((position, row_codes))
+    return tables, codes, raw
+
+
+def pack_columns(codes):
+    return {group: pack_codes([row[group] for _, row in codes]) for group, _ in FIELD_GROUPS}
+
+
+def decode_columns(tables, columns, positions, timetable):
+    """Expand packed columns back into entries at their original positions"""
+    unpacked = {group: unpack_codes(columns[group]) for group, _ in FIELD_GROUPS}
+    for index, position in enumerate(positions):
+        entry = {}
+        for group, fields in FIELD_GROUPS:
+            code = unpacked[group][index]
+            for field in fields:
+                entry[field] = tables[group][field][code]
+        timetable[position] = entry
+
+
+def encode_block(entries):
+    """A small unsharded columnar payload for a list of entries (delta additions)"""
+    tables, codes, raw = encode_entries(entries)
+    return {
+        'entry_count': len(entries),
+        'tables': tables,
+        'raw': raw,
+        'columns': pack_columns(codes),
+        'positions': pack_codes([position for position, _ in codes])
+    }
+
+
+def decode_block(block):
+    entries = [None] * block['entry_count']
+    for position, entry in block.get('raw', {}).items():
+        entries[int(position)] = entry
+    decode_columns(block['tables'], block['columns'], unpack_codes(block['positions']), entries)
+    return entries
+
+
+# ---------- Deltas ----------
+
+def entry_key(entry):
+    return json.dumps(entry, sort_keys=True, default=str)
+
+
+def compute_delta(base_entries, entries):
+    """
+    (removed, added, added_positions): positions of base entries that are
+    gone, the new entries, and where each new entry sits in ``entries``.
+
+    Entries are matched on their full content as a multiset; applying the
+    delta puts ``added`` back at their positions and fills the rest with the
+    kept base entries in base order.
+    """
+    wanted = {}
+    for entry in entries:
+        key = entry_key(entry)
+        wanted[key] = wanted.get(key, 0) + 1
+    removed = []
+    for position, entry in enumerate(base_entries):
+        key = entry_key(entry)
+        if wanted.get(key):
+            wanted[key] -= 1
+        else:
+            removed.append(position)
+    added, added_positions = [], []
+    for position, entry in enumerate(entries):
+        key = entry_key(entry)
+        if wanted.get(key):
+            wanted[key] -= 1
+            added.append(entry)
+            added_positions.append(position)
+    return removed, added, added_positions
+
+
+def apply_delta(base_entries, storage):
+    removed = set(unpack_codes(storage['removed']))
+    kept = [entry for position, entry in enumerate(base_entries) if position not in removed]
+    added = decode_block(storage['added'])
+    if 'added_positions' not in storage:
+        raise ValueError(f"Delta against {storage.get('base_id')} has no added_positions")
+    entries = [None] * (len(kept) + len(added))
+    for position, entry in zip(unpack_codes(storage['added_positions']), added):
+        entries[position] = entry
+    kept_entries = iter(kept)
+    return [entry if entry is not None else next(kept_entries) for entry in entries]
+
+
+def storage_depth(document):
+    """Number of deltas between a stored document and its full snapshot (0 for snapshots)"""
+    return (document.get('storage') or {}).get('depth', 0)
+
+
+def delta_timetable(timetable_data, base_id, base_entries, base_depth):
+    """
+    The main document stored as a delta against ``base_id``, or None when the
+    chain back to the snapshot is already SNAPSHOT_INTERVAL long or the kept
+    entries changed order (a delta only restores positions of added entries).
+    """
+    if base_depth + 1 >= SNAPSHOT_INTERVAL:
+        return None
+    entries = timetable_data.get('timetable', [])
+    removed, added, added_positions = compute_delta(base_entries, entries)
+    removed_set = set(removed)
+    kept = iter(entry for position, entry in enumerate(base_entries) if position not in removed_set)
+    added_set = set(added_positions)
+    if any(entry_key(entry) != entry_key(next(kept)) for position, entry in enumerate(entries)
+           if position not in added_set):
+        return None
+
+    storage = {
+        'format': DELTA_FORMAT,
+        'base_id': base_id,
+        'depth': base_depth + 1,
+        'entry_count': len(entries),
+        'removed': pack_codes(removed),
+        'added': encode_block(added),
+        'added_positions': pack_codes(added_positions)
+    }
+    document = {key: value for key, value in timetable_data.items() if key != 'timetable'}
+    document['storage'] = storage
+    json_bytes = len(json.dumps(entries, default=str))
+    stored_bytes = len(json.dumps(storage, default=str))
+    storage['stats'] = {
+        'json_bytes': json_bytes,
+        'stored_bytes': stored_bytes,
+        'ratio': round(json_bytes / stored_bytes, 2) if stored_bytes else None,
+        'removed': len(removed),
+        'added': len(added)
+    }
+    return document
+
+
+def delta_entries(storage):
+    """Entries of a delta version: read the base chain back to a snapshot, then replay the deltas"""
+    deltas = [storage]
+    while True:
+        base_id = deltas[-1]['base_id']
+        result = get_document('timetables', base_id)
+        if not result['success']:
+            raise ValueError(f"Missing base timetable {base_id}")
+        base_storage = result['data'].get('storage') or {}
+        if base_storage.get('format') != DELTA_FORMAT:
+            entries = expand_timetable(result['data'])['timetable']
+            break
+        deltas.append(base_storage)
+    for delta in reversed(deltas):
+        entries = apply_delta(entries, delta)
+    return entries
+
+
+# ---------- Save / load ----------
+
+def compact_timetable(timetable_id, timetable_data, shard_bytes=None):
+    """
+    Split a timetable document into (main_document, shard_documents).
+
+    The ``timetable`` list is replaced by a ``storage`` payload; when that
+    payload is larger than ``shard_bytes`` its columns move into one shard
+    document per day. ``storage.stats`` records the bytes saved.
+    """
+    shard_bytes = SHARD_BYTES if shard_bytes is None else shard_bytes
+    entries = timetable_data.get('timetable', [])
+    tables, codes, raw = encode_entries(entries)
+
+    storage = {
+        'format': STORAGE_FORMAT,
+        'entry_count': len(entries),
+        'tables': tables,
+        'raw': raw,
+        'columns': pack_columns(codes),
+        'positions': pack_codes([position for position, _ in codes])
+    }
+    shards = []
+    if len(json.dumps(storage, default=str)) > shard_bytes:
+        by_day = {}
+        for position, row in codes:
+            by_day.setdefault(row['day'], []).append((position, row))
+        for day_code, day_codes in sorted(by_day.items()):
+            shard_id = f"{timetable_id}_{day_code}"
+            shards.append((shard_id, {
+                'timetable_id': timetable_id,
+                'day': tables['day']['day'][day_code],
+                'columns': pack_columns(day_codes),
+                'positions': pack_codes([position for position, _ in day_codes])
+            }))
+        del storage['columns'], storage['positions']
+        storage['shards'] = [shard_id for shard_id, _ in shards]
+
+    document = {key: value for key, value in timetable_data.items() if key != 'timetable'}
+    document['storage'] = storage
+    json_bytes = len(json.dumps(entries, default=str))
+    stored_bytes = len(json.dumps(storage, default=str)) + sum(len(json.dumps(s, default=str)) for _, s in shards)
+    storage['stats'] = {
+        'json_bytes': json_bytes,
+        'stored_bytes': stored_bytes,
+        'ratio': round(json_bytes / stored_bytes, 2) if stored_bytes else None,
+        'shards': len(shards)
+    }
+    return document, shards
+
+
+def expand_timetable(document, shards=None):
+    """
+    Return the document in the original JSON shape (``timetable`` list, no
+    ``storage``). Sharded documents need their shard documents, fetched by
+    ``load_shards`` when not given. Documents saved before compact storage
+    are returned unchanged; delta versions are rebuilt from their base chain.
+    """
+    storage = document.get('storage')
+    if not storage:
+        return document
+    if storage.get('format') == DELTA_FORMAT:
+        expanded = {key: value for key, value in document.items() if key != 'storage'}
+        expanded['timetable'] = delta_entries(storage)
+        return expanded
+    timetable = [None] * storage['entry_count']
+    for position, entry in storage.get('raw', {}).items():
+        timetable[int(position)] = entry
+    if 'shards' in storage:
+        for shard in shards if shards is not None else load_shards(storage['shards']):
+            decode_columns(storage['tables'], shard['columns'], unpack_codes(shard['positions']), timetable)
+    else:
+        decode_columns(storage['tables'], storage['columns'], unpack_codes(storage['positions']), timetable)
+
+    expanded = {key: value for key, value in document.items() if key != 'storage'}
+    expanded['timetable'] = timetable
+    return expanded
+
+
+def load_shards(shard_ids):
+    shards = []
+    for shard_id in shard_ids:
+        result = get_document(SHARD_COLLECTION, shard_id)
+        if not result['success']:
+            raise ValueError(f"Missing timetable shard {shard_id}")
+        shards.append(result['data'])
+    return shards
+
+
+def save_timetable(timetable_id, timetable_data, base=None):
+    """
+    Store a generated timetable; same result shape as ``add_document``.
+
+    Uses the compact format unless TIMETABLE_STORAGE=json. With ``base``, a
+    (base_id, base_entries, base_depth) tuple, the timetable is stored as a
+    delta against that version when ``delta_timetable`` allows it. Shards are
+    written before the main document so readers never see a document without them.
+    """
+    if os.getenv('TIMETABLE_STORAGE', 'compact') == 'json':
+        return add_document('timetables', timetable_id, timetable_data)
+
+    document, shards = compact_timetable(timetable_id, timetable_data)
+    if base is not None:
+        delta = delta_timetable(timetable_data, *base)
+        if delta is not None and \
+                delta['storage']['stats']['stored_bytes'] < DELTA_MAX_RATIO * document['storage']['stats']['stored_bytes']:
+            result = add_document('timetables', timetable_id, delta)
+            result['storage'] = delta['storage']['stats']
+            return result
+
+    for start in range(0, len(shards), BATCH_LIMIT):
+        result = add_documents_batch(SHARD_COLLECTION, shards[start:start + BATCH_LIMIT])
+        if not result['success']:
+            return result
+    result = add_document('timetables', timetable_id, document)
+    result['storage'] = document['storage']['stats']
+    return result
+
+
+def load_timetable(timetable_id):
+    """Read a timetable in its original JSON shape; same result shape as ``get_document``"""
+    result = get_document('timetables', timetable_id)
+    if not result['success']:
+        return result
+    try:
+        return {'success': True, 'data': expand_timetable(result['data'])}
+    except Exception as e:
+        return {'success': False, 'message': str(e)}
@@ -0,0 +1,181 @@
+"""
+Timetable versions and diffs.
+
+Timetables of the same program and semester form one version series: each
+save gets the next ``version`` number and a ``parent_id`` (the timetable it
+repaired, else the series' latest version), and is stored as an entry-level
+delta against that parent when it is small enough (see timetable_storage).
+
+Version numbers come from a per-series counter document that storage
+increments atomically (a Firestore transaction, a SQLite write lock), so any
+number of API processes can save into the same series. SQLite also keeps a
+unique (program, semester, version) index; a save that still collides with an
+existing version takes the next number.
+"""
+import hashlib
+import json
+
+from firebase_config import get_all_documents, get_document, increment_document
+from schema import DEFAULT_DAYS
+from timetable_storage import save_timetable, expand_timetable, storage_depth
+
+
+# One counter document per program/semester series
+SERIES_COLLECTION = 'timetable_series'
+MAX_SAVE_ATTEMPTS = 5
+
+PLACEMENT_FIELDS = ('day', 'time', 'room_number')
+DAY_ORDER = {day: index for index, day in enumerate(DEFAULT_DAYS)}
+
+
+def list_versions(program, semester, fields=('version', 'parent_id', 'created_at')):
+    """Stored timetables of one series (selected fields plus id), oldest version first"""
+    result = get_all_documents('timetables', select=list(fields),
+                               filters=[('program', '==', program), ('semester', '==', semester)])
+    if not result['success']:
+        return result
+    result['data'].sort(key=lambda doc: (doc.get('version') or 0, str(doc.get('created_at') or '')))
+    return result
+
+
+def series_id(program, semester):
+    return hashlib.sha1(json.dumps([program, semester], default=str).encode()).hexdigest()
+
+
+def next_version(program, semester, timetable_id):
+    """
+    Allocate the next version number of a series for ``timetable_id``.
+
+    Returns {'success', 'version', 'latest_id'} where ``latest_id`` is the
+    timetable that held the previous number. A series without a counter yet
+    continues from the versions already stored.
+    """
+    counter_id = series_id(program, semester)
+    start, latest_id = 0, None
+    if not get_document(SERIES_COLLECTION, counter_id)['success']:
+        series = list_versions(program, semester, fields=('version', 'created_at'))
+        if series['success'] and series['data']:
+            start = series['data'][-1].get('version') or 0
+            latest_id = series['data'][-1]['id']
+    result = increment_document(SERIES_COLLECTION, counter_id, 'version', start=start,
+                                data={'program': program, 'semester': semester, 'latest_id': timetable_id})
+    if not result['success']:
+        return result
+    if result['previous'] is not None:
+        latest_id = result['previous'].get('latest_id')
+    return {'success': True, 'version': result['value'], 'latest_id': latest_id}
+
+
+def _base(parent_id, parent):
+    """(parent_id, entries, depth) to store a delta against, or None for a full snapshot"""
+    stored = get_document('timetables', parent_id)
+    if not stored['success']:
+        # Not saved (yet): a concurrent save may still be writing it
+        return None
+    try:
+        entries = (parent or expand_timetable(stored['data']))['timetable']
+    except ValueError:
+        # Broken base chain: store a full snapshot instead
+        return None
+    return parent_id, entries, storage_depth(stored['data'])
+
+
+def save_version(timetable_id, timetable_data, parent=None):
+    """
+    Save a timetable as the next version of its program/semester series.
+
+    ``parent`` is an expanded timetable this one was derived from (incremental
+    repair); without it the series' latest version is the parent. Returns the
+    ``save_timetable`` result plus ``version`` and ``parent_id``.
+    """
+    parent_id = parent.get('id') if parent else None
+    for _ in range(MAX_SAVE_ATTEMPTS):
+        allocated = next_version(timetable_data.get('program'), timetable_data.get('semester'), timetable_id)
+        if not allocated['success']:
+            return dict(allocated, version=None, parent_id=None)
+        version = allocated['version']
+        # After a conflict the counter's latest is this timetable's own failed attempt
+        if not parent and allocated['latest_id'] != timetable_id:
+            parent_id = allocated['latest_id']
+        base = _base(parent_id, parent) if parent_id else None
+
+        data = dict(timetable_data, version=version)
+        if parent_id:
+            data['parent_id'] = parent_id
+        result = save_timetable(timetable_id, data, base=base)
+        if not result.get('conflict'):
+            break
+    result.update(version=version, parent_id=parent_id)
+    return result
+
+
+# ---------- Diff ----------
+
+def _placement(entry):
+    return tuple(entry.get(field) for field in PLACEMENT_FIELDS)
+
+
+def _slot_order(entry):
+    return (DAY_ORDER.get(entry.get('day'), len(DAY_ORDER)), str(entry.get('day')),
+            str(entry.get('time')), str(entry.get('room_number')))
+
+
+def _by_course(entries, faculty_id=None):
+    grouped = {}
+    for entry in entries:
+        if faculty_id is not None and str(entry.get('faculty_id')) != faculty_id:
+            continue
+        placements = grouped.setdefault(str(entry.get('course_id')), {})
+        placements.setdefault(_placement(entry), []).append(entry)
+    return grouped
+
+
+def diff_timetables(old_entries, new_entries, faculty_id=None):
+    """
+    Sessions moved, added and removed between two versions.
+
+    Sessions are keyed by course and placement (day, time, room) in hash
+    maps. Within a course, placements in both versions are unchanged; the
+    remaining old and new placements are paired in slot order as moves and
+    any surplus is removed or added. Runs in O(old + new). ``faculty_id``
+    limits the diff to that faculty member's sessions.
+    """
+    old, new = _by_course(old_entries, faculty_id), _by_course(new_entries, faculty_id)
+    moved, added, removed = [], [], []
+    unchanged = 0
+    for course_id in sorted(old.keys() | new.keys()):
+        before, after = old.get(course_id, {}), new.get(course_id, {})
+        gone, came = [], []
+        for placement, entries in before.items():
+            kept = min(len(entries), len(after.get(placement, ())))
+            unchanged += kept
+            gone.extend(entries[kept:])
+        for placement, entries in after.items():
+            came.extend(entries[min(len(entries), len(before.get(placement, ()))):])
+        gone.sort(key=_slot_order)
+        came.sort(key=_slot_order)
+        for source, target in zip(gone, came):
+            moved.append({
+                'course_id': target.get('course_id'),
+                'course_name': target.get('course_name'),
+                'faculty_id': target.get('faculty_id'),
+                'faculty_name': target.get('faculty_name'),
+                'from': {field: source.get(field) for field in PLACEMENT_FIELDS},
+                'to': {field: target.get(field) for field in PLACEMENT_FIELDS}
+            })
+        removed.extend(gone[len(came):])
+        added.extend(came[len(gone):])
+
+    by_faculty = {}
+    for kind, items in (('moved', moved), ('added', added), ('removed', removed)):
+        for item in items:
+            counts = by_faculty.setdefault(str(item.get('faculty_id')), {'moved': 0, 'added': 0, 'removed': 0})
+            counts[kind] += 1
+
+    return {
+        'summary': {'unchanged': unchanged, 'moved': len(moved), 'added': len(added), 'removed': len(removed)},
+        'by_faculty': by_faculty,
+        'moved': moved,
+        'added': added,
+        'removed': removed
+    }
@@ -486,9 +486,17 @@ async function viewGeneratedTimetable() {
     }
 }
 
+// Older timetables have no metadata.total_sessions; use the entries if they were fetched
+function sessionCount(tt) {
+    if (tt.metadata && tt.metadata.total_sessions != null) return tt.metadata.total_sessions;
+    return Array.isArray(tt.timetable) ? tt.timetable.length : '-';
+}
+
 async function loadTimetables() {
     try {
-        const response = await fetch(`${API_BASE_URL}/timetables`);
+        // Only the fields the history cards need, not every entry array
+        const fields = 'program,semester,created_at,validation.is_valid,metadata.total_sessions';
+        const response = await fetch(`${API_BASE_URL}/timetables?select=${fields}`);
         const result = await response.json();
 
         const container = document.getElementById('timetables-list');
@@ -498,7 +506,7 @@ async function loadTimetables() {
                 <div class="timetable-card" onclick="loadTimetableById('${tt.id}')">
                     <h3>${tt.program} - ${tt.semester}</h3>
                     <p><strong>Generated:</strong> ${new Date(tt.created_at).toLocaleString()}</p>
-                    <p><strong>Sessions:</strong> ${tt.timetable.length}</p>
+                    <p><strong>Sessions:</strong> ${sessionCount(tt)}</p>
                     <span class="badge">${tt.validation.is_valid ? 'Valid' : 'Has Conflicts'}</span>
                 </div>
             `).join('');